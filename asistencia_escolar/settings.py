@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 import os
+import tempfile
 import dj_database_url
 from pathlib import Path
 from dotenv import load_dotenv
@@ -58,6 +59,7 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',  # Add WhiteNoiseMiddleware
+    'gestion.middleware.InstrumentacionMiddleware',  # Consultas y tiempos por petición
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -113,6 +115,49 @@ else:
 # DEBUG: Esto te ayudará a ver en los logs de Render qué motor se cargó
 print(f"LOG: Motor de base de datos cargado: {DATABASES['default'].get('ENGINE')}")
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Memoria local por proceso: solo para datos de vida corta (p. ej. contadores del dashboard),
+# que se invalidan por señales y caducan solos en los demás workers.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'asistencia-escolar',
+    }
+}
+
+# Logging
+# https://docs.djangoproject.com/en/5.2/topics/logging/
+# Una línea JSON por petición con sus consultas y tiempos (ver gestion/middleware.py);
+# en desarrollo se silencia salvo que se defina LOG_RENDIMIENTO=INFO
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'gestion.rendimiento': {
+            'handlers': ['console'],
+            'level': os.environ.get('LOG_RENDIMIENTO', 'WARNING' if DEBUG else 'INFO'),
+            'propagate': False,
+        },
+    },
+}
+
+# Peticiones más lentas que cada proceso conserva para la vista de rendimiento
+INSTRUMENTACION_MAX_PETICIONES_LENTAS = 20
+INSTRUMENTACION_MAX_SQL_POR_PETICION = 100
+
+# Métricas de la aplicación (ver gestion/metricas.py): archivo SQLite local compartido por los workers
+# de la misma máquina y token para leerlas en /sistema/metricas/ (sin token, el acceso se deniega)
+METRICAS_ARCHIVO = os.environ.get('METRICAS_ARCHIVO', os.path.join(tempfile.gettempdir(), 'asistencia_escolar_metricas.sqlite3'))
+METRICAS_TOKEN = os.environ.get('METRICAS_TOKEN', '')
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -154,6 +199,10 @@ STATICFILES_DIRS = [
 ]
 STATIC_URL = '/static/'
 
+# Archivos generados por el sistema (reportes PDF de la cola de trabajos)
+MEDIA_URL = '/media/'
+MEDIA_ROOT = Path(os.environ.get('MEDIA_ROOT', BASE_DIR / 'media'))
+
 # This production code might break development mode, so we check whether we're in DEBUG mode
 if not DEBUG:
     # Tell Django to copy static assets into a path called `staticfiles` (this is specific to Render)
@@ -1,6 +1,7 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import Usuario, PerfilEstudiante, Curso, Asistencia, SolicitudPermiso, Feedback
+from .models import Usuario, PerfilEstudiante, Curso, Asistencia, SolicitudPermiso, Feedback, TrabajoReporte, ResumenAsistenciaDiaria, HorasAsistidasCurso, AlertaAusentismo, AuditoriaPermisos
+from .services import guardar_registro_asistencia, eliminar_asistencias
 
 # Personalizar la administración del modelo de Usuario
 class CustomUserAdmin(UserAdmin):
@@ -27,7 +28,53 @@ class PerfilEstudianteAdmin(admin.ModelAdmin):
     search_fields = ('nombres', 'apellidos', 'cedula', 'usuario__username')
     raw_id_fields = ('usuario',) # Para buscar usuarios más fácilmente en el admin
 
+# Los registros de asistencia se guardan y eliminan por los servicios, que mantienen
+# el resumen diario y el libro de horas
+@admin.register(Asistencia)
+class AsistenciaAdmin(admin.ModelAdmin):
+    def save_model(self, request, obj, form, change):
+        guardar_registro_asistencia(obj)
+
+    def delete_model(self, request, obj):
+        eliminar_asistencias(Asistencia.objects.filter(pk=obj.pk))
+
+    def delete_queryset(self, request, queryset):
+        eliminar_asistencias(queryset)
+
 # Registrar los otros modelos
-admin.site.register(Asistencia)
 admin.site.register(SolicitudPermiso)
-admin.site.register(Feedback)
\ No newline at end of file
+admin.site.register(Feedback)
+
+@admin.register(TrabajoReporte)
+class TrabajoReporteAdmin(admin.ModelAdmin):
+    list_display = ('curso', 'solicitado_por', 'estado', 'fecha_creacion', 'fecha_fin')
+    list_filter = ('estado',)
+
+
+@admin.register(ResumenAsistenciaDiaria)
+class ResumenAsistenciaDiariaAdmin(admin.ModelAdmin):
+    list_display = ('curso', 'dia', 'presentes', 'ausentes', 'horas_presentes')
+    list_filter = ('curso',)
+    date_hierarchy = 'dia'
+
+
+@admin.register(HorasAsistidasCurso)
+class HorasAsistidasCursoAdmin(admin.ModelAdmin):
+    list_display = ('estudiante', 'curso', 'horas')
+    list_filter = ('curso',)
+    list_select_related = ('estudiante', 'curso')
+
+
+@admin.register(AlertaAusentismo)
+class AlertaAusentismoAdmin(admin.ModelAdmin):
+    list_display = ('estudiante', 'racha_inasistencias', 'tasa_inasistencia', 'por_racha', 'por_tasa', 'fecha_calculo')
+    list_filter = ('por_racha', 'por_tasa', 'estudiante__curso')
+    list_select_related = ('estudiante',)
+
+
+@admin.register(AuditoriaPermisos)
+class AuditoriaPermisosAdmin(admin.ModelAdmin):
+    list_display = ('fecha', 'usuario', 'estado', 'cantidad')
+    list_filter = ('estado',)
+    list_select_related = ('usuario',)
+    readonly_fields = ('usuario', 'estado', 'solicitudes', 'cantidad', 'fecha')
@@ -0,0 +1,89 @@
+from .models import Curso
+
+# Clave de sesión donde se memorizan los IDs de los cursos permitidos del administrador
+CLAVE_SESION_ALCANCE = 'alcance_cursos'
+
+
+# --- Alcance de cursos por administrador ---
+
+class AlcanceCursos:
+    """
+    Cursos que un administrador puede gestionar. Los superusuarios ven todos los cursos;
+    el resto solo sus cursos asignados, cuyos IDs se resuelven una vez y se consultan como un conjunto.
+    """
+    def __init__(self, usuario, curso_ids):
+        self.usuario = usuario
+        self.todos = usuario.is_superuser
+        self.curso_ids = frozenset(curso_ids or ())
+        self._cursos = None
+
+    def permite(self, curso_id):
+        """
+        Indica si el administrador puede gestionar el curso indicado (sin consultar la base de datos).
+        """
+        if self.todos:
+            return True
+        try:
+            return int(curso_id) in self.curso_ids
+        except (ValueError, TypeError):
+            return False
+
+    @property
+    def cursos(self):
+        """
+        Lista de cursos gestionables (para los selectores de curso), evaluada una sola vez por petición.
+        """
+        if self._cursos is None:
+            cursos = Curso.objects.all()
+            if not self.todos:
+                cursos = cursos.filter(pk__in=self.curso_ids)
+            self._cursos = list(cursos)
+        return self._cursos
+
+    def obtener_curso(self, curso_id):
+        """
+        Devuelve el curso indicado. Si es gestionable se toma de `cursos` sin otra consulta;
+        si no, se busca en la base de datos. Lanza Curso.DoesNotExist si el curso no existe.
+        """
+        try:
+            curso_id = int(curso_id)
+        except (ValueError, TypeError):
+            raise Curso.DoesNotExist
+        if self.permite(curso_id):
+            for curso in self.cursos:
+                if curso.pk == curso_id:
+                    return curso
+        return Curso.objects.get(pk=curso_id)
+
+    def filtrar(self, queryset, campo_curso='curso'):
+        """
+        Restringe un queryset a los cursos gestionables usando el campo de curso indicado.
+        """
+        if self.todos:
+            return queryset
+        return queryset.filter(**{f'{campo_curso}__in': self.curso_ids})
+
+def _ids_cursos_permitidos(request):
+    """
+    IDs de los cursos asignados al usuario, memorizados en la sesión junto con la versión
+    de alcance del usuario. Si la versión cambió (cursos reasignados), se vuelven a consultar.
+    """
+    usuario = request.user
+    memorizado = request.session.get(CLAVE_SESION_ALCANCE)
+    if memorizado and memorizado.get('version') == usuario.version_alcance:
+        return memorizado['ids']
+
+    ids = list(usuario.cursos_asignados.values_list('pk', flat=True))
+    request.session[CLAVE_SESION_ALCANCE] = {'version': usuario.version_alcance, 'ids': ids}
+    return ids
+
+def obtener_alcance(request):
+    """
+    Resuelve el alcance de cursos del administrador de la petición, una sola vez por petición.
+    """
+    alcance = getattr(request, '_alcance_cursos', None)
+    if alcance is None:
+        curso_ids = None if request.user.is_superuser else _ids_cursos_permitidos(request)
+        alcance = AlcanceCursos(request.user, curso_ids)
+        request._alcance_cursos = alcance
+    return alcance
@@ -0,0 +1,58 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+import django
+from django.apps import apps
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.tokens import default_token_generator
+from django.urls import reverse
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+# Por debajo de esta cantidad de contraseñas no compensa arrancar procesos
+MINIMO_CONTRASENAS_EN_PARALELO = 16
+
+
+# --- Aprovisionamiento masivo de cuentas ---
+
+def _inicializar_proceso():
+    # Con el método "spawn" el proceso hijo arranca sin Django configurado
+    if not apps.ready:
+        django.setup()
+
+def hashear_contrasenas(contrasenas, procesos=None):
+    """
+    Devuelve el hash de cada contraseña, en el mismo orden. Las contraseñas vacías o None
+    producen una contraseña no utilizable (la cuenta se activa con un enlace de activación).
+    Con `procesos` > 1 el hashing, que es intensivo en CPU, se reparte en un pool de procesos
+    y escala con el número de núcleos; por defecto usa todos los núcleos disponibles.
+    """
+    procesos = procesos or os.cpu_count() or 1
+    hashes = [make_password(None) if not contrasena else None for contrasena in contrasenas]
+    pendientes = [(posicion, contrasena) for posicion, contrasena in enumerate(contrasenas) if contrasena]
+
+    if procesos > 1 and len(pendientes) >= MINIMO_CONTRASENAS_EN_PARALELO:
+        with ProcessPoolExecutor(max_workers=procesos, initializer=_inicializar_proceso) as pool:
+            resultados = pool.map(
+                make_password,
+                [contrasena for _, contrasena in pendientes],
+                chunksize=max(1, len(pendientes) // (procesos * 4)),
+            )
+            for (posicion, _), hash_contrasena in zip(pendientes, resultados):
+                hashes[posicion] = hash_contrasena
+    else:
+        for posicion, contrasena in pendientes:
+            hashes[posicion] = make_password(contrasena)
+    return hashes
+
+
+# --- Enlaces de activación ---
+
+def ruta_activacion(usuario):
+    """
+    Ruta de un solo uso para que el usuario defina su contraseña. Deja de ser válida
+    en cuanto la contraseña cambia o tras PASSWORD_RESET_TIMEOUT.
+    """
+    return reverse('activar_cuenta', kwargs={
+        'uidb64': urlsafe_base64_encode(force_bytes(usuario.pk)),
+        'token': default_token_generator.make_token(usuario),
+    })
@@ -1,4 +1,5 @@
 from django import forms
+from django.contrib.auth.forms import SetPasswordForm
 from .models import Usuario, PerfilEstudiante, SolicitudPermiso, Feedback, Curso
 
 # FORMULARIO DE REGISTRO DE USUARIO
@@ -44,6 +45,36 @@ class PerfilEstudianteForm(forms.ModelForm):
         if user and user.is_staff and not user.is_superuser:
             self.fields['curso'].queryset = user.cursos_asignados.all()
 
+# FORMULARIO DE IMPORTACIÓN DE ESTUDIANTES
+class ImportarEstudiantesForm(forms.Form):
+    archivo = forms.FileField(
+        label='Archivo CSV',
+        help_text='Columnas: cedula, nombres, apellidos, telefono y opcionalmente username, email, grado, grupo y curso (código).'
+    )
+    curso = forms.ModelChoiceField(
+        queryset=Curso.objects.all(),
+        required=False,
+        label='Curso por defecto',
+        help_text='Se asigna a las filas sin columna curso. Salvo para superusuarios, toda fila debe quedar con un curso.'
+    )
+
+    def __init__(self, *args, **kwargs):
+        user = kwargs.pop('user', None)
+        super().__init__(*args, **kwargs)
+        for field in self.fields:
+            self.fields[field].widget.attrs.update({'class': 'form-control'})
+
+        # Filtrar los cursos disponibles si el usuario es un admin y no superuser
+        if user and user.is_staff and not user.is_superuser:
+            self.fields['curso'].queryset = user.cursos_asignados.all()
+
+# FORMULARIO DE ACTIVACIÓN DE CUENTA
+class ActivacionCuentaForm(SetPasswordForm):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        for field in self.fields:
+            self.fields[field].widget.attrs.update({'class': 'form-control'})
+
 # FORMULARIO PARA SOLICITAR PERMISO
 class SolicitudPermisoForm(forms.ModelForm):
     class Meta:
@@ -0,0 +1,188 @@
+import csv
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import IntegrityError, transaction
+from .models import Usuario, PerfilEstudiante, Curso
+from .services import invalidar_estadisticas_dashboard
+from .cuentas import hashear_contrasenas
+from .versiones import marcar_cursos_modificados
+
+# Columnas del CSV de importación de estudiantes (las obligatorias deben venir con valor)
+COLUMNAS_OBLIGATORIAS = ['cedula', 'nombres', 'apellidos', 'telefono']
+COLUMNAS_OPCIONALES = ['username', 'email', 'password', 'grado', 'grupo', 'curso']
+
+# Filas que se validan contra la base de datos y se insertan juntas, cada bloque en su transacción
+TAMANO_LOTE_IMPORTACION = 500
+
+
+# --- Importación masiva de estudiantes ---
+
+class ResultadoImportacion:
+    """
+    Resultado de una importación: estudiantes creados, errores por número de fila del CSV
+    y contraseñas del CSV descartadas.
+    """
+    def __init__(self):
+        self.creados = 0
+        self.errores = []
+        self.contrasenas_ignoradas = 0
+
+    def agregar_error(self, numero_fila, mensaje):
+        self.errores.append((numero_fila, mensaje))
+
+# Validadores del campo username del modelo (caracteres permitidos y longitud)
+VALIDADORES_USERNAME = Usuario._meta.get_field('username').validators
+
+def _primer_error(validadores, valor):
+    for validador in validadores:
+        try:
+            validador(valor)
+        except ValidationError as error:
+            return error.messages[0]
+    return None
+
+def _validar_fila(fila, cursos_por_codigo, curso_defecto_id, vistos, curso_obligatorio=False):
+    """
+    Valida una fila del CSV sin consultar la base de datos. Devuelve (datos, None) si es válida
+    o (None, mensaje) con el primer error encontrado. Con `curso_obligatorio` la fila debe
+    quedar asignada a un curso (por su columna curso o por el curso por defecto).
+    """
+    datos = {columna: (fila.get(columna) or '').strip() for columna in COLUMNAS_OBLIGATORIAS + COLUMNAS_OPCIONALES}
+
+    faltantes = [columna for columna in COLUMNAS_OBLIGATORIAS if not datos[columna]]
+    if faltantes:
+        return None, f'Faltan datos obligatorios: {", ".join(faltantes)}.'
+
+    datos['username'] = datos['username'] or datos['cedula']
+    limites = {'cedula': 20, 'nombres': 100, 'apellidos': 100, 'telefono': 20, 'grado': 50, 'grupo': 50, 'username': 150, 'email': 254}
+    for columna, limite in limites.items():
+        if len(datos[columna]) > limite:
+            return None, f'El campo {columna} supera {limite} caracteres.'
+
+    error = _primer_error(VALIDADORES_USERNAME, datos['username'])
+    if error:
+        return None, f'El usuario "{datos["username"]}" no es válido: {error}'
+    if datos['email'] and _primer_error([validate_email], datos['email']):
+        return None, f'El correo "{datos["email"]}" no es válido.'
+
+    if datos['curso']:
+        datos['curso_id'] = cursos_por_codigo.get(datos['curso'])
+        if datos['curso_id'] is None:
+            return None, f'El curso "{datos["curso"]}" no existe o no está entre sus cursos.'
+    else:
+        datos['curso_id'] = curso_defecto_id
+    if curso_obligatorio and datos['curso_id'] is None:
+        return None, 'Falta el curso: indíquelo en la columna curso o elija un curso por defecto.'
+
+    if datos['cedula'] in vistos['cedulas']:
+        return None, f'La cédula {datos["cedula"]} está repetida en el archivo.'
+    if datos['username'] in vistos['usernames']:
+        return None, f'El usuario {datos["username"]} está repetido en el archivo.'
+    vistos['cedulas'].add(datos['cedula'])
+    vistos['usernames'].add(datos['username'])
+    return datos, None
+
+def _guardar_lote(lote, resultado, procesos):
+    """
+    Descarta las filas cuya cédula o usuario ya existen (dos consultas por lote) e inserta
+    el resto con bulk_create en una transacción. Las contraseñas del lote se hashean juntas
+    en `procesos` procesos. Si el bloque falla, se reporta en sus filas y la importación
+    continúa con el siguiente.
+    """
+    cedulas_existentes = set(
+        PerfilEstudiante.objects.filter(cedula__in=[datos['cedula'] for _, datos in lote]).values_list('cedula', flat=True)
+    )
+    usernames_existentes = set(
+        Usuario.objects.filter(username__in=[datos['username'] for _, datos in lote]).values_list('username', flat=True)
+    )
+
+    validas = []
+    for numero_fila, datos in lote:
+        if datos['cedula'] in cedulas_existentes:
+            resultado.agregar_error(numero_fila, f'Ya existe un estudiante con la cédula {datos["cedula"]}.')
+        elif datos['username'] in usernames_existentes:
+            resultado.agregar_error(numero_fila, f'Ya existe el usuario {datos["username"]}.')
+        else:
+            validas.append((numero_fila, datos))
+    if not validas:
+        return
+
+    # Sin contraseña en el CSV la cuenta queda sin contraseña utilizable, a la espera de activación
+    contrasenas = hashear_contrasenas([datos['password'] for _, datos in validas], procesos)
+    usuarios = [
+        Usuario(username=datos['username'], email=datos['email'], password=contrasena)
+        for (_, datos), contrasena in zip(validas, contrasenas)
+    ]
+    try:
+        with transaction.atomic():
+            Usuario.objects.bulk_create(usuarios)
+            PerfilEstudiante.objects.bulk_create([
+                PerfilEstudiante(
+                    usuario_id=usuario.pk,
+                    curso_id=datos['curso_id'],
+                    cedula=datos['cedula'],
+                    nombres=datos['nombres'],
+                    apellidos=datos['apellidos'],
+                    telefono=datos['telefono'],
+                    grado=datos['grado'] or None,
+                    grupo=datos['grupo'] or None,
+                )
+                for usuario, (_, datos) in zip(usuarios, validas)
+            ])
+    except IntegrityError as error:
+        for numero_fila, _ in validas:
+            resultado.agregar_error(numero_fila, f'No se pudo guardar el bloque de filas: {error}')
+        return
+    resultado.creados += len(validas)
+    # bulk_create no emite señales: los cursos con estudiantes nuevos cambian de versión aquí
+    marcar_cursos_modificados(datos['curso_id'] for _, datos in validas)
+
+def importar_estudiantes(lineas, cursos=None, curso_defecto=None, tamano_lote=TAMANO_LOTE_IMPORTACION, procesos=1, curso_obligatorio=False, aceptar_contrasenas=True):
+    """
+    Importa estudiantes desde las líneas de un CSV (con encabezado) en una sola pasada:
+    valida cada fila al leerla, detecta cédulas y usuarios duplicados por lotes y crea
+    usuarios y perfiles con bulk_create en transacciones de `tamano_lote` filas.
+    `cursos` limita los cursos aceptados (por defecto todos), `curso_obligatorio` rechaza las
+    filas que quedarían sin curso y `procesos` es el número de procesos para hashear las
+    contraseñas del CSV. Con `aceptar_contrasenas=False` la columna password se descarta y todas
+    las cuentas quedan a la espera de su enlace de activación, sin hashear nada.
+    Las filas con error se reportan en el resultado sin detener la importación.
+    """
+    resultado = ResultadoImportacion()
+    lector = csv.DictReader(lineas)
+    encabezado = [columna.strip() for columna in (lector.fieldnames or [])]
+    faltantes = [columna for columna in COLUMNAS_OBLIGATORIAS if columna not in encabezado]
+    if faltantes:
+        resultado.agregar_error(1, f'Faltan columnas en el encabezado: {", ".join(faltantes)}.')
+        return resultado
+    lector.fieldnames = encabezado
+
+    cursos = Curso.objects.all() if cursos is None else cursos
+    cursos_por_codigo = dict(cursos.values_list('codigo', 'pk'))
+    curso_defecto_id = curso_defecto.pk if curso_defecto else None
+    vistos = {'cedulas': set(), 'usernames': set()}
+
+    lote = []
+    for fila in lector:
+        # Número de línea del archivo donde termina la fila (la línea 1 es el encabezado)
+        numero_fila = lector.line_num
+        datos, error = _validar_fila(fila, cursos_por_codigo, curso_defecto_id, vistos, curso_obligatorio)
+        if error:
+            resultado.agregar_error(numero_fila, error)
+            continue
+        if datos['password'] and not aceptar_contrasenas:
+            datos['password'] = ''
+            resultado.contrasenas_ignoradas += 1
+        lote.append((numero_fila, datos))
+        if len(lote) >= tamano_lote:
+            _guardar_lote(lote, resultado, procesos)
+            lote = []
+    if lote:
+        _guardar_lote(lote, resultado, procesos)
+
+    resultado.errores.sort()
+
+    # bulk_create no emite señales: invalidar aquí los contadores del dashboard
+    if resultado.creados:
+        invalidar_estadisticas_dashboard()
+    return resultado
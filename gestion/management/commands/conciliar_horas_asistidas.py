@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from gestion.services import conciliar_horas_asistidas
+
+
+class Command(BaseCommand):
+    help = 'Verifica el libro de horas asistidas contra los registros de Asistencia y, opcionalmente, lo corrige.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--corregir', action='store_true', help='Corrige las discrepancias encontradas.')
+
+    def handle(self, *args, **options):
+        discrepancias = conciliar_horas_asistidas(corregir=options['corregir'])
+        if not discrepancias:
+            self.stdout.write(self.style.SUCCESS('El libro de horas coincide con los registros de asistencia.'))
+            return
+
+        for discrepancia in discrepancias:
+            self.stdout.write(
+                f"Estudiante {discrepancia['estudiante_id']}: registradas {discrepancia['registradas']}, "
+                f"reales {discrepancia['reales']}, por curso {discrepancia['en_cursos']}"
+            )
+        if options['corregir']:
+            self.stdout.write(self.style.SUCCESS(f'{len(discrepancias)} estudiantes corregidos.'))
+        else:
+            self.stdout.write(self.style.WARNING(f'{len(discrepancias)} discrepancias. Ejecute con --corregir para ajustarlas.'))
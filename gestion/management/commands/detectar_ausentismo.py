@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from gestion.services import detectar_ausentismo
+
+
+class Command(BaseCommand):
+    help = 'Calcula las alertas de ausentismo crónico (rachas de inasistencias y tasa en la ventana reciente).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--racha', type=int, default=3, help='Inasistencias consecutivas que generan alerta (por defecto 3).')
+        parser.add_argument('--tasa', type=float, default=25, help='Porcentaje de inasistencia en la ventana que genera alerta (por defecto 25).')
+        parser.add_argument('--ventana', type=int, default=30, help='Días de la ventana reciente (por defecto 30).')
+        parser.add_argument('--minimo-registros', type=int, default=5, help='Registros mínimos en la ventana para evaluar la tasa (por defecto 5).')
+
+    def handle(self, *args, **options):
+        total = detectar_ausentismo(
+            umbral_racha=options['racha'],
+            umbral_tasa=options['tasa'],
+            ventana_dias=options['ventana'],
+            minimo_registros=options['minimo_registros'],
+        )
+        self.stdout.write(self.style.SUCCESS(f'Alertas de ausentismo generadas: {total}.'))
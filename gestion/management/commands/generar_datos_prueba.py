@@ -0,0 +1,236 @@
+import random
+from datetime import datetime, time, timedelta
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from gestion.models import (
+    Usuario, Curso, PerfilEstudiante, Asistencia, SolicitudPermiso, Feedback, HorasAsistidasCurso, AlertaAusentismo
+)
+from gestion.reportes import invalidar_cache_reportes
+from gestion.services import reconstruir_resumen_asistencia, invalidar_estadisticas_dashboard
+
+# Prefijos de los códigos, cédulas y usuarios generados, para poder limpiarlos sin tocar datos reales
+PREFIJO = 'PRB-'
+PREFIJO_USUARIO = 'prueba_'
+
+NOMBRES = ['Ana', 'Carlos', 'María', 'Pedro', 'Sofía', 'Jorge', 'Laura', 'Diego', 'Elena', 'Pablo',
+           'Lucía', 'Andrés', 'Valentina', 'Miguel', 'Camila', 'José', 'Gabriela', 'Luis', 'Daniela', 'Rafael']
+APELLIDOS = ['González', 'Rodríguez', 'Martínez', 'Sánchez', 'Pérez', 'Gómez', 'Fernández', 'Díaz', 'Ruiz', 'Torres',
+             'Ramírez', 'Flores', 'Rivas', 'Morales', 'Castillo', 'Herrera', 'Medina', 'Rojas', 'Vargas', 'Mendoza']
+MOTIVOS = ['Cita médica', 'Viaje familiar', 'Enfermedad', 'Trámite personal', 'Actividad deportiva']
+MENSAJES = ['Todo bien.', 'Las clases están muy bien.', 'Sugiero más ejercicios prácticos.', 'El horario es complicado.']
+
+
+class Command(BaseCommand):
+    help = (
+        'Genera datos sintéticos de prueba (cursos, estudiantes, asistencia diaria, permisos y feedback) '
+        'con inserciones masivas y una semilla determinista, para pruebas de rendimiento.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cursos', type=int, default=10, help='Número de cursos (por defecto 10).')
+        parser.add_argument('--estudiantes', type=int, default=300, help='Número total de estudiantes (por defecto 300).')
+        parser.add_argument('--dias', type=int, default=365, help='Días de historial de asistencia hacia atrás; solo lunes a viernes (por defecto 365).')
+        parser.add_argument('--permisos', type=float, default=2, help='Permisos promedio por estudiante (por defecto 2).')
+        parser.add_argument('--feedback', type=float, default=1, help='Feedbacks promedio por estudiante (por defecto 1).')
+        parser.add_argument('--semilla', type=int, default=42, help='Semilla del generador aleatorio (por defecto 42).')
+        parser.add_argument('--lote', type=int, default=5000, help='Filas por inserción masiva (por defecto 5000).')
+        parser.add_argument('--contrasena', help='Contraseña común de los estudiantes; sin ella las cuentas quedan sin contraseña utilizable.')
+        parser.add_argument('--admin', help='Usuario existente al que se asignan los cursos generados.')
+        parser.add_argument('--limpiar', action='store_true', help='Elimina antes los datos generados previamente.')
+
+    def handle(self, *args, **options):
+        self.aleatorio = random.Random(options['semilla'])
+        self.lote = options['lote']
+
+        admin = None
+        if options['admin']:
+            try:
+                admin = Usuario.objects.get(username=options['admin'])
+            except Usuario.DoesNotExist:
+                raise CommandError(f'No existe el usuario {options["admin"]}.')
+
+        if options['limpiar']:
+            self.limpiar()
+        elif Curso.objects.filter(codigo__startswith=PREFIJO).exists():
+            raise CommandError('Ya existen datos de prueba generados. Use --limpiar para reemplazarlos.')
+
+        cursos = self.generar_cursos(options['cursos'])
+        estudiantes = self.generar_estudiantes(options['estudiantes'], cursos, options['contrasena'])
+        hoy = timezone.localdate()
+        dias = [
+            hoy - timedelta(days=desfase)
+            for desfase in range(options['dias'] - 1, -1, -1)
+            if (hoy - timedelta(days=desfase)).weekday() < 5
+        ]
+        total_asistencias = self.generar_asistencias(estudiantes, dias)
+        total_permisos = self.generar_permisos(estudiantes, dias, options['permisos'])
+        total_feedback = self.generar_feedback(estudiantes, options['feedback'])
+
+        if admin:
+            admin.cursos_asignados.add(*cursos)
+
+        self.stdout.write('Reconstruyendo el resumen diario de asistencia...')
+        if options['limpiar']:
+            # Los registros eliminados podían estar en cualquier día: se reconstruye todo el historial
+            reconstruir_resumen_asistencia()
+        else:
+            reconstruir_resumen_asistencia(dias[0] if dias else None, hoy)
+        invalidar_estadisticas_dashboard()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Generados {len(cursos)} cursos, {len(estudiantes)} estudiantes, {total_asistencias} asistencias, '
+            f'{total_permisos} permisos y {total_feedback} feedbacks.'
+        ))
+
+    def limpiar(self):
+        """
+        Elimina los datos generados previamente. Las tablas por estudiante se vacían con un DELETE
+        directo (_raw_delete), sin cargar las filas en memoria ni emitir señales por cada una
+        (los receptores de permisos y estudiantes las recorrerían una a una); el resumen diario
+        se reconstruye después una sola vez.
+        """
+        self.stdout.write('Eliminando datos de prueba anteriores...')
+        cursos = Curso.objects.filter(codigo__startswith=PREFIJO)
+        estudiantes = PerfilEstudiante.objects.filter(cedula__startswith=PREFIJO)
+        invalidar_cache_reportes(list(cursos.values_list('pk', flat=True)))
+        with transaction.atomic():
+            # El feedback se borra también: con el estudiante solo quedaría sin autor (SET_NULL)
+            for modelo in (Asistencia, SolicitudPermiso, Feedback, HorasAsistidasCurso, AlertaAusentismo):
+                filas = modelo.objects.filter(estudiante__in=estudiantes)
+                filas._raw_delete(filas.db)
+            estudiantes._raw_delete(estudiantes.db)
+            Usuario.objects.filter(username__startswith=PREFIJO_USUARIO).delete()
+            cursos.delete()
+
+    def insertar_por_lotes(self, modelo, objetos):
+        """
+        Inserta los objetos de un generador en bloques de `--lote` filas, cada bloque en su transacción.
+        """
+        total = 0
+        bloque = []
+        for objeto in objetos:
+            bloque.append(objeto)
+            if len(bloque) >= self.lote:
+                with transaction.atomic():
+                    modelo.objects.bulk_create(bloque)
+                total += len(bloque)
+                bloque = []
+        if bloque:
+            with transaction.atomic():
+                modelo.objects.bulk_create(bloque)
+            total += len(bloque)
+        return total
+
+    def generar_cursos(self, cantidad):
+        cursos = [
+            Curso(nombre=f'Curso de Prueba {numero:03d}', codigo=f'{PREFIJO}{numero:03d}', descripcion='Generado para pruebas de rendimiento.')
+            for numero in range(1, cantidad + 1)
+        ]
+        Curso.objects.bulk_create(cursos)
+        return list(Curso.objects.filter(codigo__startswith=PREFIJO).order_by('codigo'))
+
+    def generar_estudiantes(self, cantidad, cursos, contrasena):
+        self.stdout.write(f'Creando {cantidad} estudiantes...')
+        # Un solo hash para todas las cuentas: el hashing es lo más costoso de crear usuarios
+        hash_contrasena = make_password(contrasena or None)
+        usuarios = [
+            Usuario(
+                username=f'{PREFIJO_USUARIO}{numero:07d}',
+                email=f'{PREFIJO_USUARIO}{numero:07d}@ejemplo.com',
+                password=hash_contrasena,
+            )
+            for numero in range(1, cantidad + 1)
+        ]
+        self.insertar_por_lotes(Usuario, usuarios)
+        usuario_ids = dict(
+            Usuario.objects.filter(username__startswith=PREFIJO_USUARIO).values_list('username', 'pk')
+        )
+
+        perfiles = (
+            PerfilEstudiante(
+                usuario_id=usuario_ids[usuario.username],
+                curso=self.aleatorio.choice(cursos) if cursos else None,
+                cedula=f'{PREFIJO}{numero:07d}',
+                nombres=self.aleatorio.choice(NOMBRES),
+                apellidos=f'{self.aleatorio.choice(APELLIDOS)} {self.aleatorio.choice(APELLIDOS)}',
+                grado=self.aleatorio.choice(['1ro', '2do', '3ro']),
+                grupo=self.aleatorio.choice(['A', 'B', 'C']),
+                telefono=f'0414-{self.aleatorio.randint(0, 9999999):07d}',
+            )
+            for numero, usuario in enumerate(usuarios, start=1)
+        )
+        self.insertar_por_lotes(PerfilEstudiante, perfiles)
+        return list(
+            PerfilEstudiante.objects.filter(cedula__startswith=PREFIJO).order_by('pk').values_list('pk', 'curso_id')
+        )
+
+    def generar_asistencias(self, estudiantes, dias):
+        self.stdout.write(f'Generando asistencia de {len(estudiantes)} estudiantes en {len(dias)} días hábiles...')
+        # Cada estudiante tiene su propia probabilidad de asistir, para que haya casos de ausentismo
+        probabilidades = {pk: self.aleatorio.uniform(0.6, 0.98) for pk, _ in estudiantes}
+        horas_por_estudiante = dict.fromkeys(probabilidades, 0)
+        zona = timezone.get_current_timezone()
+
+        def asistencias():
+            for dia in dias:
+                fecha = timezone.make_aware(datetime.combine(dia, time(8, 0)), zona)
+                horas = self.aleatorio.choice([2, 3, 4])
+                for estudiante_id, _ in estudiantes:
+                    esta_presente = self.aleatorio.random() < probabilidades[estudiante_id]
+                    if esta_presente:
+                        horas_por_estudiante[estudiante_id] += horas
+                    yield Asistencia(
+                        estudiante_id=estudiante_id,
+                        fecha=fecha,
+                        dia=dia,
+                        horas_academicas=horas,
+                        esta_presente=esta_presente,
+                    )
+
+        total = self.insertar_por_lotes(Asistencia, asistencias())
+
+        # Libro de horas acumuladas, calculado al generar en lugar de sumar la asistencia después
+        PerfilEstudiante.objects.bulk_update(
+            [PerfilEstudiante(pk=pk, horas_asistidas=horas_por_estudiante[pk]) for pk, _ in estudiantes],
+            ['horas_asistidas'],
+            batch_size=self.lote,
+        )
+        self.insertar_por_lotes(HorasAsistidasCurso, (
+            HorasAsistidasCurso(estudiante_id=pk, curso_id=curso_id, horas=horas_por_estudiante[pk])
+            for pk, curso_id in estudiantes
+            if curso_id
+        ))
+        return total
+
+    def generar_permisos(self, estudiantes, dias, promedio):
+        if not dias:
+            return 0
+        estados = [SolicitudPermiso.Estado.PENDIENTE, SolicitudPermiso.Estado.APROBADO, SolicitudPermiso.Estado.RECHAZADO]
+
+        def permisos():
+            for estudiante_id, _ in estudiantes:
+                for _ in range(self._cantidad(promedio)):
+                    inicio = self.aleatorio.choice(dias)
+                    yield SolicitudPermiso(
+                        estudiante_id=estudiante_id,
+                        fecha_inicio=inicio,
+                        fecha_fin=inicio + timedelta(days=self.aleatorio.randint(0, 4)),
+                        motivo=self.aleatorio.choice(MOTIVOS),
+                        estado=self.aleatorio.choice(estados),
+                    )
+
+        return self.insertar_por_lotes(SolicitudPermiso, permisos())
+
+    def generar_feedback(self, estudiantes, promedio):
+        def feedbacks():
+            for estudiante_id, _ in estudiantes:
+                for _ in range(self._cantidad(promedio)):
+                    yield Feedback(estudiante_id=estudiante_id, mensaje=self.aleatorio.choice(MENSAJES))
+
+        return self.insertar_por_lotes(Feedback, feedbacks())
+
+    def _cantidad(self, promedio):
+        # Entre 0 y el doble del promedio, con el promedio indicado
+        return self.aleatorio.randint(0, round(2 * promedio))
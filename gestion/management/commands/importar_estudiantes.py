@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand, CommandError
+from gestion.importacion import importar_estudiantes, TAMANO_LOTE_IMPORTACION
+from gestion.models import Curso
+
+
+class Command(BaseCommand):
+    help = 'Importa estudiantes desde un archivo CSV (cedula, nombres, apellidos, telefono, ...).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help='Ruta del archivo CSV (UTF-8, con encabezado).')
+        parser.add_argument('--curso', help='Código del curso para las filas sin columna curso.')
+        parser.add_argument('--tamano-lote', type=int, default=TAMANO_LOTE_IMPORTACION, help='Filas por transacción.')
+        parser.add_argument(
+            '--procesos', type=int, default=None,
+            help='Procesos para hashear las contraseñas del CSV (por defecto, todos los núcleos).'
+        )
+
+    def handle(self, *args, **options):
+        curso_defecto = None
+        if options['curso']:
+            try:
+                curso_defecto = Curso.objects.get(codigo=options['curso'])
+            except Curso.DoesNotExist:
+                raise CommandError(f'No existe el curso {options["curso"]}.')
+
+        try:
+            with open(options['archivo'], encoding='utf-8-sig', newline='') as lineas:
+                resultado = importar_estudiantes(
+                    lineas,
+                    curso_defecto=curso_defecto,
+                    tamano_lote=options['tamano_lote'],
+                    procesos=options['procesos'],
+                )
+        except OSError as error:
+            raise CommandError(f'No se pudo leer el archivo: {error}')
+
+        for numero_fila, mensaje in resultado.errores:
+            self.stderr.write(f'Fila {numero_fila}: {mensaje}')
+        self.stdout.write(self.style.SUCCESS(
+            f'{resultado.creados} estudiantes importados, {len(resultado.errores)} filas con error.'
+        ))
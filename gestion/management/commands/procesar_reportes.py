@@ -0,0 +1,85 @@
+import time
+from datetime import timedelta
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, close_old_connections, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+from gestion.models import TrabajoReporte
+from gestion.reportes import obtener_reporte_asistencia_pdf, nombre_archivo_reporte, liberar_trabajos_abandonados, TIEMPO_MAXIMO_TRABAJO_REPORTE
+
+
+class Command(BaseCommand):
+    help = 'Procesa la cola de reportes PDF pendientes (worker en segundo plano).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--una-vez', action='store_true', help='Procesa los trabajos pendientes y termina.')
+        parser.add_argument('--intervalo', type=float, default=2.0, help='Segundos de espera cuando la cola está vacía.')
+        parser.add_argument(
+            '--tiempo-maximo', type=int, default=int(TIEMPO_MAXIMO_TRABAJO_REPORTE.total_seconds()),
+            help='Segundos tras los que un trabajo en proceso se da por abandonado y se reencola.'
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write('Worker de reportes iniciado.')
+        tiempo_maximo = timedelta(seconds=options['tiempo_maximo'])
+        while True:
+            # Descarta conexiones caídas o que superaron CONN_MAX_AGE, como al inicio de cada petición web
+            close_old_connections()
+            try:
+                reencolados, fallidos = liberar_trabajos_abandonados(tiempo_maximo)
+                if reencolados or fallidos:
+                    self.stderr.write(f'Trabajos abandonados: {reencolados} reencolados, {fallidos} con error.')
+                trabajo = self.tomar_siguiente_trabajo()
+            except DatabaseError as e:
+                self.stderr.write(f'Error de base de datos al leer la cola: {e}')
+                trabajo = None
+            if trabajo is None:
+                if options['una_vez']:
+                    break
+                time.sleep(options['intervalo'])
+                continue
+            self.procesar(trabajo)
+
+    def tomar_siguiente_trabajo(self):
+        """
+        Reserva el trabajo pendiente más antiguo y lo marca como PROCESANDO.
+        En PostgreSQL usa SKIP LOCKED para que varios workers no tomen el mismo trabajo.
+        """
+        with transaction.atomic():
+            pendientes = TrabajoReporte.objects.filter(estado=TrabajoReporte.Estado.PENDIENTE).order_by('fecha_creacion')
+            if connection.features.has_select_for_update_skip_locked:
+                pendientes = pendientes.select_for_update(skip_locked=True)
+            trabajo = pendientes.select_related('curso').first()
+            if trabajo is None:
+                return None
+            trabajo.estado = TrabajoReporte.Estado.PROCESANDO
+            trabajo.fecha_inicio = timezone.now()
+            trabajo.intentos = F('intentos') + 1
+            trabajo.save(update_fields=['estado', 'fecha_inicio', 'intentos'])
+        return trabajo
+
+    def procesar(self, trabajo):
+        """
+        Genera y guarda el PDF del trabajo. Cualquier error (generación, almacenamiento o base
+        de datos) deja el trabajo en ERROR sin detener el worker.
+        """
+        try:
+            pdf = obtener_reporte_asistencia_pdf(trabajo.curso, trabajo.facilitador_nombre, trabajo.logo_url)
+            if pdf is None:
+                raise ValueError('Hubo un error al generar el PDF.')
+            trabajo.archivo.save(nombre_archivo_reporte(trabajo.curso), ContentFile(pdf), save=False)
+            trabajo.estado = TrabajoReporte.Estado.COMPLETADO
+            trabajo.fecha_fin = timezone.now()
+            trabajo.save(update_fields=['estado', 'archivo', 'fecha_fin'])
+            self.stdout.write(f'Trabajo {trabajo.pk} completado: {trabajo.archivo.name}')
+        except Exception as e:
+            error = str(e) or 'Hubo un error al generar el PDF.'
+            self.stderr.write(f'Error en el trabajo {trabajo.pk}: {error}')
+            try:
+                TrabajoReporte.objects.filter(pk=trabajo.pk).update(
+                    estado=TrabajoReporte.Estado.ERROR, error=error, fecha_fin=timezone.now()
+                )
+            except DatabaseError as e:
+                # Queda en PROCESANDO: liberar_trabajos_abandonados lo recupera pasado el tiempo máximo
+                self.stderr.write(f'No se pudo marcar el error del trabajo {trabajo.pk}: {e}')
@@ -0,0 +1,23 @@
+import argparse
+from datetime import datetime
+from django.core.management.base import BaseCommand
+from gestion.services import reconstruir_resumen_asistencia
+
+
+def _fecha(valor):
+    try:
+        return datetime.strptime(valor, '%Y-%m-%d').date()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'Fecha inválida: {valor} (formato AAAA-MM-DD).')
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye el resumen diario de asistencia por curso a partir de los registros de Asistencia.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--desde', type=_fecha, help='Primer día a reconstruir (AAAA-MM-DD).')
+        parser.add_argument('--hasta', type=_fecha, help='Último día a reconstruir (AAAA-MM-DD).')
+
+    def handle(self, *args, **options):
+        total = reconstruir_resumen_asistencia(options['desde'], options['hasta'])
+        self.stdout.write(self.style.SUCCESS(f'Resumen reconstruido: {total} filas (curso, día).'))
@@ -0,0 +1,211 @@
+import atexit
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from django.conf import settings
+
+logger = logging.getLogger('gestion.rendimiento')
+
+# Segundos que cada proceso acumula observaciones en memoria antes de volcarlas al archivo compartido
+INTERVALO_VOLCADO = 5
+
+
+# --- Registro de métricas ---
+
+class Histograma:
+    """
+    Histograma acumulativo al estilo Prometheus: cuenta de observaciones por cubeta (`le`),
+    suma y total, por combinación de etiquetas. Las observaciones se acumulan en memoria y
+    se suman periódicamente al archivo SQLite compartido por todos los workers.
+    """
+    def __init__(self, nombre, ayuda, limites, etiquetas=()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.limites = tuple(sorted(limites))
+        self.etiquetas = tuple(etiquetas)
+
+    def observar(self, valor, **etiquetas):
+        clave_etiquetas = json.dumps([str(etiquetas.get(etiqueta, '')) for etiqueta in self.etiquetas])
+        # La cubeta se guarda sin acumular; la exposición suma las cubetas menores
+        cubeta = next((str(limite) for limite in self.limites if valor <= limite), '+Inf')
+        registro.sumar(self.nombre, clave_etiquetas, {cubeta: 1, 'sum': valor, 'count': 1})
+
+    @contextmanager
+    def medir(self, **etiquetas):
+        """
+        Observa la duración en segundos del bloque.
+        """
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observar(time.perf_counter() - inicio, **etiquetas)
+
+class RegistroMetricas:
+    def __init__(self):
+        self.histogramas = {}
+        self.pendientes = defaultdict(float)
+        self.ultimo_volcado = time.monotonic()
+        self.lock = threading.Lock()
+        self.conexion = None
+        self.clave_conexion = None
+        self.lock_conexion = threading.Lock()
+
+    def histograma(self, nombre, ayuda, limites, etiquetas=()):
+        self.histogramas[nombre] = Histograma(nombre, ayuda, limites, etiquetas)
+        return self.histogramas[nombre]
+
+    def sumar(self, nombre, etiquetas, incrementos):
+        with self.lock:
+            for clave, valor in incrementos.items():
+                self.pendientes[(nombre, etiquetas, clave)] += valor
+            vencido = time.monotonic() - self.ultimo_volcado >= INTERVALO_VOLCADO
+        if vencido:
+            self.volcar()
+
+    def _conectar(self):
+        conexion = sqlite3.connect(settings.METRICAS_ARCHIVO, timeout=5, check_same_thread=False)
+        conexion.execute('PRAGMA journal_mode=WAL')
+        conexion.execute('PRAGMA synchronous=NORMAL')
+        conexion.execute(
+            'CREATE TABLE IF NOT EXISTS metricas ('
+            'nombre TEXT NOT NULL, etiquetas TEXT NOT NULL, clave TEXT NOT NULL, valor REAL NOT NULL, '
+            'PRIMARY KEY (nombre, etiquetas, clave))'
+        )
+        return conexion
+
+    def _conexion(self):
+        """
+        Conexión de este proceso al archivo compartido (llamar con lock_conexion tomado). Se abre y
+        crea el esquema una sola vez por proceso, así cada volcado es solo el INSERT; se reabre
+        tras un fork, si cambia METRICAS_ARCHIVO o después de un error.
+        """
+        clave = (os.getpid(), settings.METRICAS_ARCHIVO)
+        if self.conexion is None or self.clave_conexion != clave:
+            # La conexión heredada de otro proceso no se cierra: sigue siendo del padre
+            self.conexion = self._conectar()
+            self.clave_conexion = clave
+        return self.conexion
+
+    def _descartar_conexion(self):
+        if self.conexion is not None and self.clave_conexion[0] == os.getpid():
+            try:
+                self.conexion.close()
+            except sqlite3.Error:
+                pass
+        self.conexion = None
+        self.clave_conexion = None
+
+    def volcar(self):
+        """
+        Suma las observaciones pendientes de este proceso al archivo compartido en una transacción.
+        Si el archivo no está disponible, se conservan para el siguiente volcado.
+        """
+        with self.lock:
+            pendientes, self.pendientes = self.pendientes, defaultdict(float)
+            self.ultimo_volcado = time.monotonic()
+        if not pendientes:
+            return
+        try:
+            with self.lock_conexion:
+                try:
+                    with self._conexion() as conexion:
+                        conexion.executemany(
+                            'INSERT INTO metricas (nombre, etiquetas, clave, valor) VALUES (?, ?, ?, ?) '
+                            'ON CONFLICT (nombre, etiquetas, clave) DO UPDATE SET valor = valor + excluded.valor',
+                            [(*clave, valor) for clave, valor in pendientes.items()],
+                        )
+                except sqlite3.Error:
+                    self._descartar_conexion()
+                    raise
+        except sqlite3.Error as error:
+            logger.warning('No se pudieron volcar las métricas: %s', error)
+            with self.lock:
+                for clave, valor in pendientes.items():
+                    self.pendientes[clave] += valor
+
+    def leer(self):
+        """
+        Valores agregados de todos los workers: {nombre: {etiquetas: {clave: valor}}}.
+        """
+        self.volcar()
+        with self.lock_conexion:
+            try:
+                filas = self._conexion().execute('SELECT nombre, etiquetas, clave, valor FROM metricas').fetchall()
+            except sqlite3.Error:
+                self._descartar_conexion()
+                raise
+        valores = defaultdict(lambda: defaultdict(dict))
+        for nombre, etiquetas, clave, valor in filas:
+            valores[nombre][etiquetas][clave] = valor
+        return valores
+
+    def exponer(self):
+        """
+        Texto en el formato de exposición de Prometheus (text/plain; version=0.0.4).
+        """
+        valores = self.leer()
+        lineas = []
+        for nombre, histograma in sorted(self.histogramas.items()):
+            lineas.append(f'# HELP {nombre} {histograma.ayuda}')
+            lineas.append(f'# TYPE {nombre} histogram')
+            for etiquetas, claves in sorted(valores.get(nombre, {}).items()):
+                pares = [
+                    f'{etiqueta}="{_escapar(valor)}"'
+                    for etiqueta, valor in zip(histograma.etiquetas, json.loads(etiquetas))
+                ]
+                acumulado = 0
+                for limite in [str(limite) for limite in histograma.limites] + ['+Inf']:
+                    acumulado += claves.get(limite, 0)
+                    cubeta = ','.join(pares + [f'le="{limite}"'])
+                    lineas.append(f'{nombre}_bucket{{{cubeta}}} {_numero(acumulado)}')
+                sufijo = f'{{{",".join(pares)}}}' if pares else ''
+                lineas.append(f'{nombre}_sum{sufijo} {_numero(claves.get("sum", 0))}')
+                lineas.append(f'{nombre}_count{sufijo} {_numero(claves.get("count", 0))}')
+        return '\n'.join(lineas) + '\n'
+
+def _escapar(valor):
+    return valor.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _numero(valor):
+    return str(int(valor)) if float(valor).is_integer() else repr(valor)
+
+registro = RegistroMetricas()
+# Lo acumulado desde el último volcado no se pierde al reiniciar el worker
+atexit.register(registro.volcar)
+
+
+# --- Métricas de la aplicación ---
+
+LIMITES_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+LIMITES_FILAS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+PETICION_SEGUNDOS = registro.histograma(
+    'gestion_peticion_segundos', 'Duración de las peticiones por vista y método.',
+    LIMITES_SEGUNDOS, etiquetas=('vista', 'metodo', 'estado'),
+)
+LOGIN_SEGUNDOS = registro.histograma(
+    'gestion_login_segundos', 'Latencia de los intentos de inicio de sesión.',
+    LIMITES_SEGUNDOS, etiquetas=('resultado',),
+)
+ASISTENCIA_LOTE_ESTUDIANTES = registro.histograma(
+    'gestion_asistencia_lote_estudiantes', 'Estudiantes escritos por cada guardado de asistencia.',
+    LIMITES_FILAS,
+)
+ASISTENCIA_GUARDADO_SEGUNDOS = registro.histograma(
+    'gestion_asistencia_guardado_segundos', 'Duración de cada guardado de asistencia.',
+    LIMITES_SEGUNDOS,
+)
+REPORTE_PDF_SEGUNDOS = registro.histograma(
+    'gestion_reporte_pdf_segundos', 'Duración del renderizado de los reportes PDF.',
+    LIMITES_SEGUNDOS + (30, 60),
+)
+REPORTE_FILAS = registro.histograma(
+    'gestion_reporte_filas', 'Filas (estudiantes) de cada reporte generado.',
+    LIMITES_FILAS, etiquetas=('reporte',),
+)
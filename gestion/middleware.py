@@ -0,0 +1,164 @@
+import functools
+import heapq
+import itertools
+import json
+import logging
+import threading
+import time
+from contextvars import ContextVar
+from django.conf import settings
+from django.db import connection
+from django.template import base as template_base
+from django.utils import timezone
+from .metricas import PETICION_SEGUNDOS
+
+logger = logging.getLogger('gestion.rendimiento')
+
+# Peticiones más lentas que se conservan por proceso y sentencias SQL guardadas de cada una
+MAX_PETICIONES_LENTAS = getattr(settings, 'INSTRUMENTACION_MAX_PETICIONES_LENTAS', 20)
+MAX_SQL_POR_PETICION = getattr(settings, 'INSTRUMENTACION_MAX_SQL_POR_PETICION', 100)
+
+# Medición de la petición en curso (una por hilo o tarea)
+_medicion_actual = ContextVar('medicion_actual', default=None)
+
+
+# --- Medición por petición ---
+
+class Medicion:
+    """
+    Consultas, tiempo de base de datos y de plantillas acumulados durante una petición.
+    """
+    def __init__(self):
+        self.consultas = 0
+        self.segundos_db = 0.0
+        self.segundos_plantillas = 0.0
+        self.profundidad_plantillas = 0
+        self.sql = []
+
+    def registrar_consulta(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duracion = time.perf_counter() - inicio
+            self.consultas += 1
+            self.segundos_db += duracion
+            if len(self.sql) < MAX_SQL_POR_PETICION:
+                self.sql.append((round(duracion * 1000, 2), sql))
+
+def _render_medido(render_original):
+    @functools.wraps(render_original)
+    def render(self, context):
+        medicion = _medicion_actual.get()
+        if medicion is None:
+            return render_original(self, context)
+        # Solo se cronometra la plantilla más externa: los {% include %} y {% extends %} ya están dentro
+        medicion.profundidad_plantillas += 1
+        inicio = time.perf_counter()
+        try:
+            return render_original(self, context)
+        finally:
+            medicion.profundidad_plantillas -= 1
+            if medicion.profundidad_plantillas == 0:
+                medicion.segundos_plantillas += time.perf_counter() - inicio
+    render._render_original = render_original
+    return render
+
+# Django no tiene un gancho de producción para el renderizado (la señal template_rendered solo se
+# emite en las pruebas), así que se envuelve Template.render una única vez por proceso
+_instalacion_lock = threading.Lock()
+
+def instalar_medicion_plantillas():
+    """
+    Envuelve Template.render para acumular el tiempo de renderizado en la medición en curso.
+    Es idempotente: varias instancias del middleware (o recargas) no anidan envoltorios.
+    """
+    with _instalacion_lock:
+        if not hasattr(template_base.Template.render, '_render_original'):
+            template_base.Template.render = _render_medido(template_base.Template.render)
+
+def desinstalar_medicion_plantillas():
+    """
+    Restaura el Template.render original.
+    """
+    with _instalacion_lock:
+        render = template_base.Template.render
+        if hasattr(render, '_render_original'):
+            template_base.Template.render = render._render_original
+
+
+# --- Peticiones más lentas ---
+
+_lentas = []
+_lentas_lock = threading.Lock()
+_secuencia = itertools.count()
+
+def _registrar_lenta(segundos, datos):
+    # Montículo de mínimos: la raíz es la más rápida de las conservadas y es la que se descarta
+    entrada = (segundos, next(_secuencia), datos)
+    with _lentas_lock:
+        if len(_lentas) < MAX_PETICIONES_LENTAS:
+            heapq.heappush(_lentas, entrada)
+        elif segundos > _lentas[0][0]:
+            heapq.heapreplace(_lentas, entrada)
+
+def peticiones_lentas():
+    """
+    Las peticiones más lentas registradas por este proceso, de la más lenta a la más rápida.
+    """
+    with _lentas_lock:
+        entradas = sorted(_lentas, reverse=True)
+    return [datos for _, _, datos in entradas]
+
+def limpiar_peticiones_lentas():
+    with _lentas_lock:
+        _lentas.clear()
+
+
+# --- Middleware ---
+
+class InstrumentacionMiddleware:
+    """
+    Registra por petición la vista, el número de consultas, el tiempo de base de datos,
+    el de plantillas y el total. Emite una línea de log en JSON (logger `gestion.rendimiento`)
+    y la cabecera Server-Timing, alimenta el histograma `gestion_peticion_segundos` y conserva
+    en memoria las peticiones más lentas con su SQL.
+    En respuestas en streaming solo se mide hasta que la vista devuelve la respuesta.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+        instalar_medicion_plantillas()
+
+    def __call__(self, request):
+        medicion = Medicion()
+        token = _medicion_actual.set(medicion)
+        inicio = time.perf_counter()
+        try:
+            with connection.execute_wrapper(medicion.registrar_consulta):
+                response = self.get_response(request)
+        finally:
+            _medicion_actual.reset(token)
+        total = time.perf_counter() - inicio
+
+        resolver_match = getattr(request, 'resolver_match', None)
+        datos = {
+            'metodo': request.method,
+            'ruta': request.path,
+            'vista': resolver_match.view_name if resolver_match else None,
+            'estado': response.status_code,
+            'consultas': medicion.consultas,
+            'db_ms': round(medicion.segundos_db * 1000, 2),
+            'plantillas_ms': round(medicion.segundos_plantillas * 1000, 2),
+            'total_ms': round(total * 1000, 2),
+        }
+        logger.info(json.dumps(datos, ensure_ascii=False))
+        PETICION_SEGUNDOS.observar(total, vista=datos['vista'] or 'sin_vista', metodo=request.method, estado=response.status_code)
+
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={datos["db_ms"]};desc="{medicion.consultas} consultas"',
+            f'tpl;dur={datos["plantillas_ms"]}',
+            f'total;dur={datos["total_ms"]}',
+        ])
+
+        _registrar_lenta(total, dict(datos, fecha=timezone.now(), sql=medicion.sql))
+        return response
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.10 on 2026-10-16 23:35
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0005_alter_perfilestudiante_telefono'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrabajoReporte',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('facilitador_nombre', models.CharField(max_length=150, verbose_name='Facilitador')),
+                ('logo_url', models.CharField(blank=True, max_length=255, verbose_name='URL del Logo')),
+                ('estado', models.CharField(choices=[('PENDIENTE', 'Pendiente'), ('PROCESANDO', 'Procesando'), ('COMPLETADO', 'Completado'), ('ERROR', 'Error')], default='PENDIENTE', max_length=10, verbose_name='Estado')),
+                ('archivo', models.FileField(blank=True, upload_to='reportes/', verbose_name='Archivo PDF')),
+                ('error', models.TextField(blank=True, verbose_name='Error')),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de Creación')),
+                ('fecha_inicio', models.DateTimeField(blank=True, null=True, verbose_name='Inicio del Proceso')),
+                ('fecha_fin', models.DateTimeField(blank=True, null=True, verbose_name='Fin del Proceso')),
+                ('curso', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trabajos_reporte', to='gestion.curso', verbose_name='Curso')),
+                ('solicitado_por', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='trabajos_reporte', to=settings.AUTH_USER_MODEL, verbose_name='Solicitado por')),
+            ],
+            options={
+                'verbose_name': 'Trabajo de Reporte',
+                'verbose_name_plural': 'Trabajos de Reporte',
+                'ordering': ['fecha_creacion'],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.10 on 2026-10-16 23:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0006_trabajoreporte'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='asistencia',
+            index=models.Index(fields=['estudiante', 'fecha'], name='asistencia_est_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='asistencia',
+            index=models.Index(fields=['fecha'], name='asistencia_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='asistencia',
+            index=models.Index(condition=models.Q(('esta_presente', True)), fields=['estudiante', 'fecha'], name='asistencia_presentes_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='solicitudpermiso',
+            index=models.Index(fields=['estado', '-fecha_creacion'], name='permiso_estado_fecha_idx'),
+        ),
+    ]
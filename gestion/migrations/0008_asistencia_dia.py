@@ -0,0 +1,77 @@
+import os
+from django.db import migrations, models
+from django.utils import timezone
+
+
+# Con esta variable de entorno en 1, los duplicados se eliminan (conservando el más reciente) en lugar de detener la migración
+VARIABLE_ELIMINAR_DUPLICADOS = 'ASISTENCIA_ELIMINAR_DUPLICADOS'
+
+
+def poblar_dia(apps, schema_editor):
+    """
+    Calcula el día local de cada asistencia. Si un estudiante tiene varios registros el mismo
+    día (que la restricción de la migración siguiente no admite), se detiene con la lista de
+    duplicados, salvo que ASISTENCIA_ELIMINAR_DUPLICADOS=1: entonces elimina los más antiguos
+    de cada día y muestra cuáles.
+    """
+    Asistencia = apps.get_model('gestion', 'Asistencia')
+    por_actualizar = []
+    duplicados = []
+    estudiante_actual = None
+    dias_vistos = set()
+
+    registros = (
+        Asistencia.objects
+        .only('pk', 'estudiante_id', 'fecha')
+        .order_by('estudiante_id', '-fecha', '-pk')
+        .iterator(chunk_size=2000)
+    )
+    for asistencia in registros:
+        if asistencia.estudiante_id != estudiante_actual:
+            estudiante_actual = asistencia.estudiante_id
+            dias_vistos = set()
+        dia = timezone.localdate(asistencia.fecha)
+        if dia in dias_vistos:
+            duplicados.append((asistencia.estudiante_id, dia, asistencia.pk))
+            continue
+        dias_vistos.add(dia)
+        asistencia.dia = dia
+        por_actualizar.append(asistencia)
+        if len(por_actualizar) >= 2000:
+            Asistencia.objects.bulk_update(por_actualizar, ['dia'])
+            por_actualizar = []
+
+    if duplicados:
+        detalle = '\n'.join(
+            f'  estudiante {estudiante_id}, día {dia}: registro {pk}' for estudiante_id, dia, pk in duplicados
+        )
+        if os.environ.get(VARIABLE_ELIMINAR_DUPLICADOS) != '1':
+            raise RuntimeError(
+                f'Hay {len(duplicados)} registros de asistencia duplicados (mismo estudiante y día) '
+                f'además del más reciente de cada día:\n{detalle}\n'
+                'Elimínelos o corríjalos y vuelva a ejecutar migrate, o ejecútelo con '
+                f'{VARIABLE_ELIMINAR_DUPLICADOS}=1 para eliminarlos conservando el registro más reciente.'
+            )
+        print(f'\n  Eliminados {len(duplicados)} registros de asistencia duplicados:\n{detalle}')
+
+    if por_actualizar:
+        Asistencia.objects.bulk_update(por_actualizar, ['dia'])
+    pks_duplicados = [pk for _, _, pk in duplicados]
+    for inicio in range(0, len(pks_duplicados), 2000):
+        Asistencia.objects.filter(pk__in=pks_duplicados[inicio:inicio + 2000]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0007_indices_asistencia_permisos'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='asistencia',
+            name='dia',
+            field=models.DateField(editable=False, null=True, verbose_name='Día'),
+        ),
+        migrations.RunPython(poblar_dia, migrations.RunPython.noop),
+    ]
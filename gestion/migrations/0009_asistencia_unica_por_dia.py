@@ -0,0 +1,24 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0008_asistencia_dia'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='asistencia',
+            name='dia',
+            field=models.DateField(editable=False, verbose_name='Día'),
+        ),
+        migrations.AddIndex(
+            model_name='asistencia',
+            index=models.Index(fields=['dia'], name='asistencia_dia_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='asistencia',
+            constraint=models.UniqueConstraint(fields=('estudiante', 'dia'), name='asistencia_unica_por_dia'),
+        ),
+    ]
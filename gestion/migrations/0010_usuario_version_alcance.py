@@ -0,0 +1,18 @@
+# Generated by Django 5.2.10 on 2026-10-16 23:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0009_asistencia_unica_por_dia'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usuario',
+            name='version_alcance',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Versión del Alcance'),
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 5.2.10 on 2026-10-16 23:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Coalesce
+
+
+def poblar_resumen(apps, schema_editor):
+    """
+    Construye el resumen diario inicial a partir de la asistencia existente.
+    """
+    Asistencia = apps.get_model('gestion', 'Asistencia')
+    ResumenAsistenciaDiaria = apps.get_model('gestion', 'ResumenAsistenciaDiaria')
+    filas = (
+        Asistencia.objects
+        .filter(estudiante__curso__isnull=False)
+        .values('estudiante__curso_id', 'dia')
+        .annotate(
+            presentes=Count('pk', filter=Q(esta_presente=True)),
+            ausentes=Count('pk', filter=Q(esta_presente=False)),
+            horas_presentes=Coalesce(Sum('horas_academicas', filter=Q(esta_presente=True)), 0),
+        )
+        .order_by()
+    )
+    ResumenAsistenciaDiaria.objects.bulk_create(
+        [
+            ResumenAsistenciaDiaria(
+                curso_id=fila['estudiante__curso_id'],
+                dia=fila['dia'],
+                presentes=fila['presentes'],
+                ausentes=fila['ausentes'],
+                horas_presentes=fila['horas_presentes'],
+            )
+            for fila in filas.iterator()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0010_usuario_version_alcance'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenAsistenciaDiaria',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dia', models.DateField(verbose_name='Día')),
+                ('presentes', models.PositiveIntegerField(default=0, verbose_name='Presentes')),
+                ('ausentes', models.PositiveIntegerField(default=0, verbose_name='Ausentes')),
+                ('horas_presentes', models.PositiveIntegerField(default=0, verbose_name='Horas Académicas Asistidas')),
+                ('curso', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resumenes_asistencia', to='gestion.curso', verbose_name='Curso')),
+            ],
+            options={
+                'verbose_name': 'Resumen Diario de Asistencia',
+                'verbose_name_plural': 'Resúmenes Diarios de Asistencia',
+                'ordering': ['-dia', 'curso'],
+                'constraints': [models.UniqueConstraint(fields=('curso', 'dia'), name='resumen_unico_por_curso_dia')],
+            },
+        ),
+        migrations.RunPython(poblar_resumen, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 5.2.10 on 2026-10-16 23:47
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def poblar_horas(apps, schema_editor):
+    """
+    Inicializa el libro de horas a partir de la asistencia existente, atribuyendo
+    las horas de cada estudiante a su curso actual.
+    """
+    Asistencia = apps.get_model('gestion', 'Asistencia')
+    PerfilEstudiante = apps.get_model('gestion', 'PerfilEstudiante')
+    HorasAsistidasCurso = apps.get_model('gestion', 'HorasAsistidasCurso')
+    totales = dict(
+        Asistencia.objects
+        .filter(esta_presente=True)
+        .values('estudiante_id')
+        .annotate(total=Sum('horas_academicas'))
+        .order_by()
+        .values_list('estudiante_id', 'total')
+    )
+    estudiantes = list(PerfilEstudiante.objects.filter(pk__in=totales).only('pk', 'curso_id'))
+    for estudiante in estudiantes:
+        estudiante.horas_asistidas = totales[estudiante.pk]
+    PerfilEstudiante.objects.bulk_update(estudiantes, ['horas_asistidas'], batch_size=500)
+    HorasAsistidasCurso.objects.bulk_create(
+        [
+            HorasAsistidasCurso(estudiante_id=estudiante.pk, curso_id=estudiante.curso_id, horas=estudiante.horas_asistidas)
+            for estudiante in estudiantes
+            if estudiante.curso_id
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0011_resumenasistenciadiaria'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='perfilestudiante',
+            name='horas_asistidas',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Horas Académicas Asistidas'),
+        ),
+        migrations.CreateModel(
+            name='HorasAsistidasCurso',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('horas', models.PositiveIntegerField(default=0, verbose_name='Horas Académicas Asistidas')),
+                ('curso', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='horas_asistidas', to='gestion.curso', verbose_name='Curso')),
+                ('estudiante', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='horas_por_curso', to='gestion.perfilestudiante', verbose_name='Estudiante')),
+            ],
+            options={
+                'verbose_name': 'Horas Asistidas por Curso',
+                'verbose_name_plural': 'Horas Asistidas por Curso',
+                'ordering': ['estudiante', 'curso'],
+                'constraints': [models.UniqueConstraint(fields=('estudiante', 'curso'), name='horas_unicas_por_estudiante_curso')],
+            },
+        ),
+        migrations.RunPython(poblar_horas, migrations.RunPython.noop),
+    ]
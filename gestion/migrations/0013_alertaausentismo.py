@@ -0,0 +1,34 @@
+# Generated by Django 5.2.10 on 2026-10-16 23:50
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0012_libro_horas_asistidas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AlertaAusentismo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('racha_inasistencias', models.PositiveIntegerField(default=0, verbose_name='Inasistencias Consecutivas')),
+                ('ausencias_ventana', models.PositiveIntegerField(default=0, verbose_name='Inasistencias en la Ventana')),
+                ('registros_ventana', models.PositiveIntegerField(default=0, verbose_name='Registros en la Ventana')),
+                ('tasa_inasistencia', models.FloatField(default=0, verbose_name='Tasa de Inasistencia (%)')),
+                ('por_racha', models.BooleanField(default=False, verbose_name='Supera la Racha Máxima')),
+                ('por_tasa', models.BooleanField(default=False, verbose_name='Supera la Tasa Máxima')),
+                ('fecha_calculo', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Fecha de Cálculo')),
+                ('estudiante', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='alerta_ausentismo', to='gestion.perfilestudiante', verbose_name='Estudiante')),
+            ],
+            options={
+                'verbose_name': 'Alerta de Ausentismo',
+                'verbose_name_plural': 'Alertas de Ausentismo',
+                'ordering': ['-racha_inasistencias', '-tasa_inasistencia'],
+            },
+        ),
+    ]
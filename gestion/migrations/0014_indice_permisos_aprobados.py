@@ -0,0 +1,17 @@
+# Generated by Django 5.2.10 on 2026-10-16 23:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0013_alertaausentismo'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='solicitudpermiso',
+            index=models.Index(condition=models.Q(('estado', 'APROBADO')), fields=['estudiante', 'fecha_inicio', 'fecha_fin'], name='permiso_aprobado_idx'),
+        ),
+    ]
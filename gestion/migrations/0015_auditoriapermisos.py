@@ -0,0 +1,31 @@
+# Generated by Django 5.2.10 on 2026-10-16 23:54
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0014_indice_permisos_aprobados'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuditoriaPermisos',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('estado', models.CharField(choices=[('PENDIENTE', 'Pendiente'), ('APROBADO', 'Aprobado'), ('RECHAZADO', 'Rechazado')], max_length=10, verbose_name='Nuevo Estado')),
+                ('solicitudes', models.JSONField(default=list, verbose_name='IDs de Solicitudes')),
+                ('cantidad', models.PositiveIntegerField(default=0, verbose_name='Solicitudes Procesadas')),
+                ('fecha', models.DateTimeField(auto_now_add=True, verbose_name='Fecha')),
+                ('usuario', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='auditorias_permisos', to=settings.AUTH_USER_MODEL, verbose_name='Realizado por')),
+            ],
+            options={
+                'verbose_name': 'Auditoría de Permisos',
+                'verbose_name_plural': 'Auditorías de Permisos',
+                'ordering': ['-fecha'],
+            },
+        ),
+    ]
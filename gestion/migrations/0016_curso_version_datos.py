@@ -0,0 +1,18 @@
+# Generated by Django 5.2.10 on 2026-10-17 00:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0015_auditoriapermisos'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='curso',
+            name='version_datos',
+            field=models.PositiveBigIntegerField(default=0, editable=False, verbose_name='Versión de los Datos'),
+        ),
+    ]
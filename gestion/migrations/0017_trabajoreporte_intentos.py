@@ -0,0 +1,18 @@
+# Generated by Django 5.2.10 on 2026-10-17 10:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0016_curso_version_datos'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trabajoreporte',
+            name='intentos',
+            field=models.PositiveSmallIntegerField(default=0, editable=False, verbose_name='Intentos'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.10 on 2026-10-17 00:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0017_trabajoreporte_intentos'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='feedback',
+            index=models.Index(fields=['-fecha_creacion', 'id'], name='feedback_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='perfilestudiante',
+            index=models.Index(fields=['apellidos', 'nombres', 'id'], name='estudiante_nombre_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='solicitudpermiso',
+            index=models.Index(fields=['-fecha_creacion', 'id'], name='permiso_fecha_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.10 on 2026-10-17 00:50
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0018_indices_paginacion'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='asistencia',
+            name='asistencia_est_fecha_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='asistencia',
+            name='asistencia_fecha_idx',
+        ),
+    ]
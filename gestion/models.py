@@ -14,6 +14,8 @@ class Usuario(AbstractUser):
         blank=True,
         verbose_name='Cursos Asignados'
     )
+    # Se incrementa cada vez que cambian los cursos asignados; invalida el alcance memorizado en la sesión
+    version_alcance = models.PositiveIntegerField('Versión del Alcance', default=0, editable=False)
 
 # MODELO DE CURSO
 class Curso(models.Model):
@@ -23,6 +25,8 @@ class Curso(models.Model):
     nombre = models.CharField('Nombre del Curso', max_length=100)
     codigo = models.CharField('Código del Curso', max_length=20, unique=True)
     descripcion = models.TextField('Descripción', blank=True, null=True)
+    # Se incrementa con cada cambio de asistencia, estudiantes o permisos del curso; forma el ETag de sus páginas
+    version_datos = models.PositiveBigIntegerField('Versión de los Datos', default=0, editable=False)
 
     def __str__(self):
         return f'{self.nombre} ({self.codigo})'
@@ -57,6 +61,8 @@ class PerfilEstudiante(models.Model):
     grupo = models.CharField('Grupo', max_length=50, blank=True, null=True)
     grado = models.CharField('Grado', max_length=50, blank=True, null=True)
     telefono = models.CharField('Número de Teléfono', max_length=20)
+    # Total acumulado de horas académicas asistidas, mantenido al guardar la asistencia
+    horas_asistidas = models.PositiveIntegerField('Horas Académicas Asistidas', default=0, editable=False)
 
     def __str__(self):
         return f'{self.nombres} {self.apellidos}'
@@ -65,6 +71,10 @@ class PerfilEstudiante(models.Model):
         verbose_name = 'Perfil de Estudiante'
         verbose_name_plural = 'Perfiles de Estudiantes'
         ordering = ['apellidos', 'nombres']
+        indexes = [
+            # Orden de la paginación por cursor de la lista de estudiantes
+            models.Index(fields=['apellidos', 'nombres', 'id'], name='estudiante_nombre_idx'),
+        ]
 
 # MODELO DE ASISTENCIA
 class Asistencia(models.Model):
@@ -78,6 +88,8 @@ class Asistencia(models.Model):
         verbose_name='Estudiante'
     )
     fecha = models.DateTimeField('Fecha y Hora', default=timezone.now)
+    # Día local de `fecha`, desnormalizado para consultas por igualdad y la restricción de un registro por día
+    dia = models.DateField('Día', editable=False)
     horas_academicas = models.PositiveIntegerField('Horas Académicas', default=2)
     esta_presente = models.BooleanField('¿Está Presente?', default=False)
 
@@ -85,10 +97,40 @@ class Asistencia(models.Model):
         estado = "Presente" if self.esta_presente else "Ausente"
         return f'{self.estudiante} - {self.fecha.strftime("%Y-%m-%d %H:%M")} ({estado})'
 
+    def save(self, *args, **kwargs):
+        # El día siempre se deriva de la fecha (bulk_create/bulk_update deben asignarlo explícitamente)
+        self.dia = timezone.localdate(self.fecha)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'fecha' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'dia'}
+        super().save(*args, **kwargs)
+
+    def validate_constraints(self, exclude=None):
+        # Los formularios excluyen `dia` por no ser editable; se deriva aquí de la fecha para que
+        # un segundo registro del mismo día sea un error de validación y no un IntegrityError
+        if self.fecha is not None and (exclude is None or 'fecha' not in exclude):
+            self.dia = timezone.localdate(self.fecha)
+            if exclude is not None:
+                exclude = set(exclude) - {'dia'}
+        super().validate_constraints(exclude)
+
     class Meta:
         verbose_name = 'Registro de Asistencia'
         verbose_name_plural = 'Registros de Asistencia'
         ordering = ['-fecha', 'estudiante']
+        constraints = [
+            models.UniqueConstraint(fields=['estudiante', 'dia'], name='asistencia_unica_por_dia'),
+        ]
+        indexes = [
+            # Búsquedas por día o rango de días; las de estudiante y día usan el índice de la restricción única
+            models.Index(fields=['dia'], name='asistencia_dia_idx'),
+            # Índice parcial para el reporte PDF, que solo lee asistencias presentes
+            models.Index(
+                fields=['estudiante', 'fecha'],
+                condition=models.Q(esta_presente=True),
+                name='asistencia_presentes_idx'
+            ),
+        ]
 
 # MODELO DE SOLICITUD DE PERMISO
 class SolicitudPermiso(models.Model):
@@ -124,6 +166,17 @@ class SolicitudPermiso(models.Model):
         verbose_name = 'Solicitud de Permiso'
         verbose_name_plural = 'Solicitudes de Permiso'
         ordering = ['-fecha_creacion']
+        indexes = [
+            models.Index(fields=['estado', '-fecha_creacion'], name='permiso_estado_fecha_idx'),
+            # Orden de la paginación por cursor de la gestión de permisos (-fecha_creacion, pk)
+            models.Index(fields=['-fecha_creacion', 'id'], name='permiso_fecha_idx'),
+            # Índice parcial para construir el índice de intervalos de permisos aprobados
+            models.Index(
+                fields=['estudiante', 'fecha_inicio', 'fecha_fin'],
+                condition=models.Q(estado='APROBADO'),
+                name='permiso_aprobado_idx'
+            ),
+        ]
 
 # MODELO DE FEEDBACK
 class Feedback(models.Model):
@@ -146,4 +199,176 @@ class Feedback(models.Model):
     class Meta:
         verbose_name = 'Feedback'
         verbose_name_plural = 'Feedbacks'
-        ordering = ['-fecha_creacion']
\ No newline at end of file
+        ordering = ['-fecha_creacion']
+        indexes = [
+            # Orden de la paginación por cursor de la lista de feedback (-fecha_creacion, pk)
+            models.Index(fields=['-fecha_creacion', 'id'], name='feedback_fecha_idx'),
+        ]
+
+# MODELO DE TRABAJO DE REPORTE
+class TrabajoReporte(models.Model):
+    """
+    Cola de generación de reportes PDF. Las vistas encolan el trabajo y el comando
+    `procesar_reportes` lo genera en segundo plano, fuera de los workers web.
+    """
+    class Estado(models.TextChoices):
+        PENDIENTE = 'PENDIENTE', 'Pendiente'
+        PROCESANDO = 'PROCESANDO', 'Procesando'
+        COMPLETADO = 'COMPLETADO', 'Completado'
+        ERROR = 'ERROR', 'Error'
+
+    curso = models.ForeignKey(
+        Curso,
+        on_delete=models.CASCADE,
+        related_name='trabajos_reporte',
+        verbose_name='Curso'
+    )
+    solicitado_por = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='trabajos_reporte',
+        verbose_name='Solicitado por'
+    )
+    facilitador_nombre = models.CharField('Facilitador', max_length=150)
+    logo_url = models.CharField('URL del Logo', max_length=255, blank=True)
+    estado = models.CharField(
+        'Estado',
+        max_length=10,
+        choices=Estado.choices,
+        default=Estado.PENDIENTE
+    )
+    archivo = models.FileField('Archivo PDF', upload_to='reportes/', blank=True)
+    error = models.TextField('Error', blank=True)
+    # Veces que un worker tomó el trabajo; limita los reintentos de trabajos abandonados
+    intentos = models.PositiveSmallIntegerField('Intentos', default=0, editable=False)
+    fecha_creacion = models.DateTimeField('Fecha de Creación', auto_now_add=True)
+    fecha_inicio = models.DateTimeField('Inicio del Proceso', null=True, blank=True)
+    fecha_fin = models.DateTimeField('Fin del Proceso', null=True, blank=True)
+
+    def __str__(self):
+        return f'Reporte de {self.curso} - {self.get_estado_display()}'
+
+    class Meta:
+        verbose_name = 'Trabajo de Reporte'
+        verbose_name_plural = 'Trabajos de Reporte'
+        ordering = ['fecha_creacion']
+
+
+# MODELO DE RESUMEN DIARIO DE ASISTENCIA
+class ResumenAsistenciaDiaria(models.Model):
+    """
+    Resumen materializado de la asistencia por curso y día (presentes, ausentes y horas).
+    Se actualiza al guardar la asistencia y se reconstruye con `reconstruir_resumen_asistencia`.
+    """
+    curso = models.ForeignKey(
+        Curso,
+        on_delete=models.CASCADE,
+        related_name='resumenes_asistencia',
+        verbose_name='Curso'
+    )
+    dia = models.DateField('Día')
+    presentes = models.PositiveIntegerField('Presentes', default=0)
+    ausentes = models.PositiveIntegerField('Ausentes', default=0)
+    horas_presentes = models.PositiveIntegerField('Horas Académicas Asistidas', default=0)
+
+    def __str__(self):
+        return f'{self.curso} - {self.dia} ({self.presentes} presentes, {self.ausentes} ausentes)'
+
+    class Meta:
+        verbose_name = 'Resumen Diario de Asistencia'
+        verbose_name_plural = 'Resúmenes Diarios de Asistencia'
+        ordering = ['-dia', 'curso']
+        constraints = [
+            models.UniqueConstraint(fields=['curso', 'dia'], name='resumen_unico_por_curso_dia'),
+        ]
+
+
+# MODELO DE HORAS ASISTIDAS POR CURSO
+class HorasAsistidasCurso(models.Model):
+    """
+    Libro acumulado de horas académicas asistidas por estudiante y curso.
+    Las horas se atribuyen al curso del estudiante en el momento de guardar la asistencia;
+    se verifica contra los registros de asistencia con `conciliar_horas_asistidas`.
+    """
+    estudiante = models.ForeignKey(
+        PerfilEstudiante,
+        on_delete=models.CASCADE,
+        related_name='horas_por_curso',
+        verbose_name='Estudiante'
+    )
+    curso = models.ForeignKey(
+        Curso,
+        on_delete=models.CASCADE,
+        related_name='horas_asistidas',
+        verbose_name='Curso'
+    )
+    horas = models.PositiveIntegerField('Horas Académicas Asistidas', default=0)
+
+    def __str__(self):
+        return f'{self.estudiante} - {self.curso} ({self.horas} horas)'
+
+    class Meta:
+        verbose_name = 'Horas Asistidas por Curso'
+        verbose_name_plural = 'Horas Asistidas por Curso'
+        ordering = ['estudiante', 'curso']
+        constraints = [
+            models.UniqueConstraint(fields=['estudiante', 'curso'], name='horas_unicas_por_estudiante_curso'),
+        ]
+
+
+# MODELO DE ALERTA DE AUSENTISMO
+class AlertaAusentismo(models.Model):
+    """
+    Alerta precalculada de ausentismo crónico de un estudiante (racha de inasistencias
+    consecutivas o tasa de inasistencia en la ventana reciente por encima del umbral).
+    La genera el comando `detectar_ausentismo`; solo existen filas para los estudiantes en riesgo.
+    """
+    estudiante = models.OneToOneField(
+        PerfilEstudiante,
+        on_delete=models.CASCADE,
+        related_name='alerta_ausentismo',
+        verbose_name='Estudiante'
+    )
+    racha_inasistencias = models.PositiveIntegerField('Inasistencias Consecutivas', default=0)
+    ausencias_ventana = models.PositiveIntegerField('Inasistencias en la Ventana', default=0)
+    registros_ventana = models.PositiveIntegerField('Registros en la Ventana', default=0)
+    tasa_inasistencia = models.FloatField('Tasa de Inasistencia (%)', default=0)
+    por_racha = models.BooleanField('Supera la Racha Máxima', default=False)
+    por_tasa = models.BooleanField('Supera la Tasa Máxima', default=False)
+    fecha_calculo = models.DateTimeField('Fecha de Cálculo', default=timezone.now)
+
+    def __str__(self):
+        return f'{self.estudiante} - {self.racha_inasistencias} seguidas, {self.tasa_inasistencia}%'
+
+    class Meta:
+        verbose_name = 'Alerta de Ausentismo'
+        verbose_name_plural = 'Alertas de Ausentismo'
+        ordering = ['-racha_inasistencias', '-tasa_inasistencia']
+
+
+# MODELO DE AUDITORÍA DE PERMISOS
+class AuditoriaPermisos(models.Model):
+    """
+    Registro de auditoría de cada aprobación o rechazo de permisos en lote:
+    quién lo hizo, cuándo, con qué estado y sobre qué solicitudes.
+    """
+    usuario = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='auditorias_permisos',
+        verbose_name='Realizado por'
+    )
+    estado = models.CharField('Nuevo Estado', max_length=10, choices=SolicitudPermiso.Estado.choices)
+    solicitudes = models.JSONField('IDs de Solicitudes', default=list)
+    cantidad = models.PositiveIntegerField('Solicitudes Procesadas', default=0)
+    fecha = models.DateTimeField('Fecha', auto_now_add=True)
+
+    def __str__(self):
+        return f'{self.get_estado_display()} ({self.cantidad}) por {self.usuario} - {self.fecha.strftime("%Y-%m-%d %H:%M")}'
+
+    class Meta:
+        verbose_name = 'Auditoría de Permisos'
+        verbose_name_plural = 'Auditorías de Permisos'
+        ordering = ['-fecha']
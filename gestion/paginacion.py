@@ -0,0 +1,134 @@
+import base64
+import datetime
+import json
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+
+# Tamaños de página ofrecidos en las listas del módulo de administración
+OPCIONES_POR_PAGINA = [25, 50, 100]
+POR_PAGINA_DEFECTO = 25
+
+
+# --- Paginación por cursor (keyset) ---
+
+class PaginaCursor:
+    """
+    Una página de resultados paginados por cursor, con los cursores para ir a la página
+    siguiente o anterior y los parámetros GET a conservar en los enlaces.
+    """
+    def __init__(self, objetos, por_pagina, cursor_siguiente, cursor_anterior, parametros):
+        self.objetos = objetos
+        self.por_pagina = por_pagina
+        self.cursor_siguiente = cursor_siguiente
+        self.cursor_anterior = cursor_anterior
+        self.parametros = parametros
+        self.opciones_por_pagina = OPCIONES_POR_PAGINA
+
+    @property
+    def tiene_siguiente(self):
+        return self.cursor_siguiente is not None
+
+    @property
+    def tiene_anterior(self):
+        return self.cursor_anterior is not None
+
+class _CodificadorCursor(DjangoJSONEncoder):
+    """
+    Conserva los microsegundos de las fechas (DjangoJSONEncoder los trunca a milisegundos),
+    para que el cursor no salte registros creados en el mismo milisegundo.
+    """
+    def default(self, o):
+        if isinstance(o, (datetime.datetime, datetime.date)):
+            return o.isoformat()
+        return super().default(o)
+
+def _codificar_cursor(valores):
+    datos = json.dumps(valores, cls=_CodificadorCursor).encode('utf-8')
+    return base64.urlsafe_b64encode(datos).decode('ascii')
+
+def _decodificar_cursor(cursor, modelo, campos):
+    """
+    Decodifica un cursor y convierte cada valor al tipo del campo del modelo.
+    Devuelve None si el cursor no es válido.
+    """
+    try:
+        valores = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except (ValueError, UnicodeError):
+        return None
+    if not isinstance(valores, list) or len(valores) != len(campos):
+        return None
+    try:
+        return [
+            modelo._meta.pk.to_python(valor) if campo == 'pk' else modelo._meta.get_field(campo).to_python(valor)
+            for campo, valor in zip(campos, valores)
+        ]
+    except (ValidationError, ValueError, TypeError):
+        return None
+
+def _filtro_keyset(orden, valores, hacia_adelante):
+    """
+    Construye el filtro (a, b, c) > (x, y, z) respetando la dirección de cada campo del orden.
+    """
+    filtro = Q()
+    igualdades = {}
+    for campo_orden, valor in zip(orden, valores):
+        descendente = campo_orden.startswith('-')
+        campo = campo_orden.lstrip('-')
+        operador = 'lt' if descendente == hacia_adelante else 'gt'
+        filtro |= Q(**igualdades, **{f'{campo}__{operador}': valor})
+        igualdades[campo] = valor
+    return filtro
+
+def _invertir_orden(orden):
+    return [campo[1:] if campo.startswith('-') else f'-{campo}' for campo in orden]
+
+def paginar_por_cursor(request, queryset, orden):
+    """
+    Pagina un queryset por cursor según `orden` (la última columna debe ser única, p. ej. 'pk').
+    Lee `despues`, `antes` y `por_pagina` de request.GET. Cada página cuesta una sola consulta
+    indexada, sin OFFSET, por lo que el tiempo de respuesta no crece con el historial.
+    """
+    campos = [campo.lstrip('-') for campo in orden]
+
+    try:
+        por_pagina = int(request.GET.get('por_pagina', POR_PAGINA_DEFECTO))
+    except (ValueError, TypeError):
+        por_pagina = POR_PAGINA_DEFECTO
+    if por_pagina not in OPCIONES_POR_PAGINA:
+        por_pagina = POR_PAGINA_DEFECTO
+
+    despues = request.GET.get('despues')
+    antes = request.GET.get('antes')
+    valores_despues = _decodificar_cursor(despues, queryset.model, campos) if despues else None
+    valores_antes = _decodificar_cursor(antes, queryset.model, campos) if antes else None
+
+    if valores_antes is not None:
+        # Página anterior: se recorre en orden inverso y luego se da la vuelta
+        filas = list(queryset.filter(_filtro_keyset(orden, valores_antes, False)).order_by(*_invertir_orden(orden))[:por_pagina + 1])
+        hay_mas_atras = len(filas) > por_pagina
+        objetos = list(reversed(filas[:por_pagina]))
+        hay_siguiente = True
+        hay_anterior = hay_mas_atras
+    else:
+        if valores_despues is not None:
+            queryset = queryset.filter(_filtro_keyset(orden, valores_despues, True))
+        filas = list(queryset.order_by(*orden)[:por_pagina + 1])
+        objetos = filas[:por_pagina]
+        hay_siguiente = len(filas) > por_pagina
+        hay_anterior = valores_despues is not None
+
+    def cursor_de(objeto):
+        return _codificar_cursor([getattr(objeto, campo) for campo in campos])
+
+    parametros = request.GET.copy()
+    for clave in ('despues', 'antes'):
+        parametros.pop(clave, None)
+
+    return PaginaCursor(
+        objetos=objetos,
+        por_pagina=por_pagina,
+        cursor_siguiente=cursor_de(objetos[-1]) if objetos and hay_siguiente else None,
+        cursor_anterior=cursor_de(objetos[0]) if objetos and hay_anterior else None,
+        parametros=parametros.urlencode(),
+    )
@@ -0,0 +1,65 @@
+import bisect
+from collections import defaultdict
+from datetime import timedelta
+from .models import SolicitudPermiso
+
+
+# --- Índice de permisos aprobados ---
+
+class IndicePermisos:
+    """
+    Intervalos de los permisos aprobados (fecha_inicio a fecha_fin) de cada estudiante.
+    Los intervalos se ordenan y fusionan al construir el índice, de modo que saber si un día
+    está cubierto por un permiso es una búsqueda binaria en memoria, sin consultas adicionales.
+    """
+    def __init__(self, intervalos):
+        por_estudiante = defaultdict(list)
+        for estudiante_id, inicio, fin in intervalos:
+            por_estudiante[estudiante_id].append((min(inicio, fin), max(inicio, fin)))
+
+        self._inicios = {}
+        self._fines = {}
+        for estudiante_id, lista in por_estudiante.items():
+            lista.sort()
+            fusionados = []
+            for inicio, fin in lista:
+                # Intervalos solapados o contiguos se unen en uno solo
+                if fusionados and inicio <= fusionados[-1][1] + timedelta(days=1):
+                    fusionados[-1][1] = max(fusionados[-1][1], fin)
+                else:
+                    fusionados.append([inicio, fin])
+            self._inicios[estudiante_id] = [inicio for inicio, _ in fusionados]
+            self._fines[estudiante_id] = [fin for _, fin in fusionados]
+
+    def intervalos(self):
+        """
+        Intervalos ya fusionados de todos los estudiantes, como tuplas (estudiante_id, inicio, fin).
+        """
+        for estudiante_id, inicios in self._inicios.items():
+            for inicio, fin in zip(inicios, self._fines[estudiante_id]):
+                yield estudiante_id, inicio, fin
+
+    def cubre(self, estudiante_id, dia):
+        """
+        Indica si el día está cubierto por un permiso aprobado del estudiante.
+        """
+        inicios = self._inicios.get(estudiante_id)
+        if not inicios:
+            return False
+        posicion = bisect.bisect_right(inicios, dia) - 1
+        return posicion >= 0 and dia <= self._fines[estudiante_id][posicion]
+
+def obtener_indice_permisos(estudiantes_queryset, desde=None, hasta=None):
+    """
+    Construye con una sola consulta el índice de permisos aprobados de los estudiantes del queryset,
+    limitado opcionalmente a los permisos que se solapan con el rango `desde`–`hasta`.
+    """
+    permisos = SolicitudPermiso.objects.filter(
+        estado=SolicitudPermiso.Estado.APROBADO,
+        estudiante__in=estudiantes_queryset,
+    )
+    if desde is not None:
+        permisos = permisos.filter(fecha_fin__gte=desde)
+    if hasta is not None:
+        permisos = permisos.filter(fecha_inicio__lte=hasta)
+    return IndicePermisos(permisos.values_list('estudiante_id', 'fecha_inicio', 'fecha_fin'))
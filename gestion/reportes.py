@@ -0,0 +1,347 @@
+import hashlib
+import numpy as np
+from collections import defaultdict
+from io import BytesIO
+from datetime import date, timedelta
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db.models import Prefetch, Count, Max, Q
+from django.utils import timezone
+from django.utils.safestring import mark_safe
+from django.template.loader import get_template
+from xhtml2pdf import pisa
+from .models import PerfilEstudiante, Asistencia, Curso, TrabajoReporte
+from .permisos import obtener_indice_permisos
+from .metricas import REPORTE_PDF_SEGUNDOS, REPORTE_FILAS
+
+# Directorio (dentro de MEDIA_ROOT) donde se guardan los PDF ya renderizados, uno por huella de datos
+CACHE_REPORTES_DIR = 'reportes/cache'
+
+# Un trabajo que sigue en PROCESANDO pasado este tiempo se da por abandonado (worker detenido)
+TIEMPO_MAXIMO_TRABAJO_REPORTE = timedelta(minutes=10)
+# Veces que se toma un trabajo abandonado antes de marcarlo con error
+MAX_INTENTOS_TRABAJO_REPORTE = 2
+
+
+# --- Capa de datos de reportes ---
+
+def _formatear_asistencia(asistencia):
+    """
+    Formatea una línea de asistencia para el reporte: fecha, hora y horas académicas.
+    """
+    horas = asistencia.horas_academicas
+    return f'{asistencia.fecha.strftime("%d/%m/%Y %H:%M")} ({horas} {"hora" if horas == 1 else "horas"})'
+
+def obtener_datos_reporte_asistencia(curso):
+    """
+    Construye los datos por estudiante del reporte de asistencia de un curso.
+    Usa una consulta de estudiantes (datos de contacto con select_related y el total de horas
+    del libro de horas) más una consulta prefetch con todas las asistencias presentes del curso,
+    sin importar el número de estudiantes. Las inasistencias se clasifican en justificadas o no
+    con el índice de permisos aprobados (dos consultas más: inasistencias y permisos).
+    """
+    asistencias_presentes = Asistencia.objects.filter(esta_presente=True).order_by('fecha')
+    perfiles_del_curso = PerfilEstudiante.objects.filter(curso=curso)
+
+    indice_permisos = obtener_indice_permisos(perfiles_del_curso)
+    inasistencias = defaultdict(lambda: [0, 0])
+    for estudiante_id, dia in Asistencia.objects.filter(estudiante__curso=curso, esta_presente=False).values_list('estudiante_id', 'dia'):
+        inasistencias[estudiante_id][indice_permisos.cubre(estudiante_id, dia)] += 1
+
+    estudiantes_del_curso = (
+        perfiles_del_curso
+        .select_related('usuario')
+        .prefetch_related(Prefetch('asistencias', queryset=asistencias_presentes, to_attr='asistencias_presentes'))
+        .order_by('apellidos', 'nombres')
+    )
+
+    datos_estudiantes_reporte = []
+    for estudiante in estudiantes_del_curso:
+        datos_estudiantes_reporte.append({
+            'nombre_completo': f"{estudiante.nombres} {estudiante.apellidos}",
+            'cedula': estudiante.cedula,
+            'telefono': estudiante.telefono,
+            'email': estudiante.usuario.email,
+            'total_horas_asistidas': estudiante.horas_asistidas,
+            'inasistencias_injustificadas': inasistencias[estudiante.pk][0],
+            'inasistencias_justificadas': inasistencias[estudiante.pk][1],
+            'fechas_y_horas_asistencia': [_formatear_asistencia(asist) for asist in estudiante.asistencias_presentes],
+        })
+    return datos_estudiantes_reporte
+
+def renderizar_reporte_asistencia_pdf(curso, facilitador_nombre, logo_path=''):
+    """
+    Renderiza el reporte de asistencia de un curso y devuelve los bytes del PDF,
+    o None si xhtml2pdf reporta un error.
+    """
+    with REPORTE_PDF_SEGUNDOS.medir():
+        estudiantes = obtener_datos_reporte_asistencia(curso)
+        context = {
+            'curso_nombre': curso.nombre,
+            'facilitador_nombre': facilitador_nombre,
+            'fecha_emision': date.today().strftime("%d/%m/%Y"),
+            'estudiantes': estudiantes,
+            'logo_path': logo_path,
+        }
+
+        template = get_template('admin/reporte_asistencia_template.html')
+        html = template.render(context)
+
+        resultado = BytesIO()
+        pisa_status = pisa.CreatePDF(
+            html,                # the HTML to convert
+            dest=resultado,      # file handle to receive result
+            encoding="UTF-8"
+        )
+    REPORTE_FILAS.observar(len(estudiantes), reporte='pdf')
+    if pisa_status.err:
+        return None
+    return resultado.getvalue()
+
+def nombre_archivo_reporte(curso):
+    """
+    Nombre de descarga del reporte de asistencia de un curso.
+    """
+    return f'reporte_asistencia_{curso.codigo}_{date.today().strftime("%Y%m%d")}.pdf'
+
+# --- Caché de reportes PDF ---
+
+def huella_asistencia_curso(curso):
+    """
+    Huella de los datos de un curso en una sola consulta agregada: versión de datos del curso
+    (cambia al editar asistencias, estudiantes o permisos), número de estudiantes y de registros,
+    última fecha y último id de asistencia. La versión se lee en la misma consulta, no del objeto
+    recibido, que puede estar desactualizado.
+    """
+    datos = Curso.objects.filter(pk=curso.pk).aggregate(
+        version_datos=Max('version_datos'),
+        total_estudiantes=Count('estudiantes', distinct=True),
+        total_asistencias=Count('estudiantes__asistencias'),
+        ultima_fecha=Max('estudiantes__asistencias__fecha'),
+        ultimo_id=Max('estudiantes__asistencias__pk'),
+    )
+    ultima_fecha = datos['ultima_fecha'].isoformat() if datos['ultima_fecha'] else ''
+    return f"{datos['version_datos']}:{datos['total_estudiantes']}:{datos['total_asistencias']}:{ultima_fecha}:{datos['ultimo_id'] or 0}"
+
+def _ruta_cache_reporte(curso, facilitador_nombre, logo_path):
+    """
+    Ruta del PDF en caché, direccionada por el contenido: curso, facilitador, logo,
+    fecha de emisión y huella de datos del curso.
+    """
+    clave = '|'.join([
+        str(curso.pk),
+        facilitador_nombre,
+        logo_path,
+        date.today().isoformat(),
+        huella_asistencia_curso(curso),
+    ])
+    digest = hashlib.sha256(clave.encode('utf-8')).hexdigest()
+    return f'{CACHE_REPORTES_DIR}/{curso.pk}/{digest}.pdf'
+
+def obtener_reporte_asistencia_pdf(curso, facilitador_nombre, logo_path=''):
+    """
+    Devuelve los bytes del PDF de asistencia de un curso, leyéndolos de la caché si los datos
+    no han cambiado desde la última generación. Devuelve None si xhtml2pdf reporta un error.
+    """
+    ruta = _ruta_cache_reporte(curso, facilitador_nombre, logo_path)
+    if default_storage.exists(ruta):
+        with default_storage.open(ruta, 'rb') as archivo:
+            return archivo.read()
+
+    pdf = renderizar_reporte_asistencia_pdf(curso, facilitador_nombre, logo_path)
+    if pdf is not None:
+        default_storage.save(ruta, ContentFile(pdf))
+    return pdf
+
+def invalidar_cache_reportes(curso_ids):
+    """
+    Elimina los PDF en caché de los cursos indicados.
+    """
+    for curso_id in curso_ids:
+        directorio = f'{CACHE_REPORTES_DIR}/{curso_id}'
+        try:
+            _, archivos = default_storage.listdir(directorio)
+        except FileNotFoundError:
+            continue
+        for nombre in archivos:
+            default_storage.delete(f'{directorio}/{nombre}')
+
+
+# --- Cola de reportes PDF ---
+
+def trabajos_reporte_en_curso():
+    """
+    Trabajos pendientes o en proceso que no han sido abandonados por un worker detenido.
+    """
+    limite = timezone.now() - TIEMPO_MAXIMO_TRABAJO_REPORTE
+    return TrabajoReporte.objects.filter(
+        Q(estado=TrabajoReporte.Estado.PENDIENTE)
+        | Q(estado=TrabajoReporte.Estado.PROCESANDO, fecha_inicio__gte=limite)
+    )
+
+def liberar_trabajos_abandonados(tiempo_maximo=TIEMPO_MAXIMO_TRABAJO_REPORTE):
+    """
+    Devuelve a la cola los trabajos que llevan más de `tiempo_maximo` en PROCESANDO (el worker
+    que los tomó se detuvo) y marca con error los que ya agotaron MAX_INTENTOS_TRABAJO_REPORTE.
+    Devuelve (reencolados, fallidos).
+    """
+    abandonados = TrabajoReporte.objects.filter(
+        estado=TrabajoReporte.Estado.PROCESANDO,
+        fecha_inicio__lt=timezone.now() - tiempo_maximo,
+    )
+    fallidos = abandonados.filter(intentos__gte=MAX_INTENTOS_TRABAJO_REPORTE).update(
+        estado=TrabajoReporte.Estado.ERROR,
+        error='El worker se detuvo mientras generaba el PDF. Vuelva a solicitar el reporte.',
+        fecha_fin=timezone.now(),
+    )
+    reencolados = abandonados.update(estado=TrabajoReporte.Estado.PENDIENTE, fecha_inicio=None)
+    return reencolados, fallidos
+
+
+# --- Exportación de asistencia ---
+
+ENCABEZADO_EXPORTACION = ['Fecha', 'Hora', 'Cédula', 'Apellidos', 'Nombres', 'Curso', 'Presente', 'Horas Académicas']
+
+def filas_exportacion_asistencia(asistencias_queryset, chunk_size=2000):
+    """
+    Genera las filas de la exportación de asistencia leyendo la base de datos por bloques
+    (.iterator), de modo que la memoria no crece con el número de registros exportados.
+    """
+    yield ENCABEZADO_EXPORTACION
+    registros = (
+        asistencias_queryset
+        .order_by('dia', 'estudiante_id')
+        .values_list(
+            'dia', 'fecha', 'estudiante__cedula', 'estudiante__apellidos', 'estudiante__nombres',
+            'estudiante__curso__codigo', 'esta_presente', 'horas_academicas'
+        )
+        .iterator(chunk_size=chunk_size)
+    )
+    for dia, fecha, cedula, apellidos, nombres, curso, esta_presente, horas in registros:
+        yield [
+            dia.strftime('%d/%m/%Y'),
+            timezone.localtime(fecha).strftime('%H:%M'),
+            cedula,
+            apellidos,
+            nombres,
+            curso or '',
+            'Sí' if esta_presente else 'No',
+            horas,
+        ]
+
+
+# --- Matriz de asistencia ---
+
+# Rango máximo de días que se puede pedir en la matriz de asistencia
+MAX_DIAS_MATRIZ = 180
+
+# Estados de las celdas de la matriz (códigos de la cuadrícula de NumPy)
+SIN_REGISTRO, PRESENTE, AUSENTE, JUSTIFICADA = range(4)
+
+# HTML de cada estado, indexado por su código; fijo, sin datos del usuario
+_CELDAS_MATRIZ = np.array([
+    '<td class="text-center text-muted">-</td>',
+    '<td class="table-success text-center">P</td>',
+    '<td class="table-danger text-center">A</td>',
+    '<td class="table-warning text-center">J</td>',
+])
+
+def _rachas_inasistencia(estados):
+    """
+    Racha más larga y racha actual de inasistencias consecutivas de cada fila de la cuadrícula.
+    Los días sin registro y las inasistencias justificadas no cortan ni alargan la racha:
+    la racha en cada celda es el total acumulado de ausencias menos el que había en la última
+    asistencia presente de la fila.
+    """
+    if not estados.shape[1]:
+        ceros = np.zeros(estados.shape[0], dtype=np.int64)
+        return ceros, ceros
+    ausencias = np.cumsum(estados == AUSENTE, axis=1)
+    en_ultima_presencia = np.maximum.accumulate(np.where(estados == PRESENTE, ausencias, 0), axis=1)
+    rachas = ausencias - en_ultima_presencia
+    return rachas.max(axis=1), rachas[:, -1]
+
+def obtener_matriz_asistencia(curso, desde, hasta):
+    """
+    Matriz estudiante × día de la asistencia de un curso entre `desde` y `hasta`, con la tasa
+    de inasistencia y las rachas de ausencias de cada estudiante. Las columnas son los días
+    en que el curso tomó asistencia. Hace tres consultas planas (estudiantes, asistencias y
+    permisos aprobados), pivota los registros con NumPy en una cuadrícula densa de códigos de
+    estado y calcula totales, tasas y rachas por fila sin recorrer las celdas en Python.
+    Las inasistencias cubiertas por un permiso aprobado se marcan como justificadas
+    y no cuentan en la tasa ni en las rachas.
+    """
+    perfiles_del_curso = PerfilEstudiante.objects.filter(curso=curso)
+    estudiantes = list(
+        perfiles_del_curso
+        .order_by('apellidos', 'nombres')
+        .values_list('pk', 'cedula', 'nombres', 'apellidos')
+    )
+    indice_permisos = obtener_indice_permisos(perfiles_del_curso, desde, hasta)
+    registros = list(
+        Asistencia.objects
+        .filter(estudiante__curso=curso, dia__range=(desde, hasta))
+        .values_list('estudiante_id', 'dia', 'esta_presente', 'horas_academicas')
+    )
+
+    if not estudiantes:
+        REPORTE_FILAS.observar(0, reporte='matriz')
+        return {'dias': [], 'filas': []}
+
+    # Registros como arreglos planos: estudiante, día (ordinal), presente y horas
+    total_registros = len(registros)
+    registro_ids = np.fromiter((registro[0] for registro in registros), dtype=np.int64, count=total_registros)
+    ordinales = np.fromiter((registro[1].toordinal() for registro in registros), dtype=np.int64, count=total_registros)
+    presentes = np.fromiter((registro[2] for registro in registros), dtype=bool, count=total_registros)
+    horas = np.fromiter((registro[3] for registro in registros), dtype=np.int64, count=total_registros)
+
+    # Fila de cada registro (posición de su estudiante en el orden por nombre) y columna de su día
+    estudiante_ids = np.array([pk for pk, _, _, _ in estudiantes], dtype=np.int64)
+    orden_ids = np.argsort(estudiante_ids)
+    posiciones = np.searchsorted(estudiante_ids, registro_ids, sorter=orden_ids).clip(max=len(estudiantes) - 1)
+    filas_registro = orden_ids[posiciones]
+    validos = estudiante_ids[filas_registro] == registro_ids
+    ordinales_dias, columnas_registro = np.unique(ordinales, return_inverse=True)
+
+    estados = np.full((len(estudiantes), len(ordinales_dias)), SIN_REGISTRO, dtype=np.int8)
+    estados[filas_registro[validos], columnas_registro[validos]] = np.where(presentes[validos], PRESENTE, AUSENTE)
+
+    # Días cubiertos por permisos aprobados: un rango de columnas por intervalo fusionado
+    fila_de_estudiante = {pk: fila for fila, (pk, _, _, _) in enumerate(estudiantes)}
+    cubiertas = np.zeros(estados.shape, dtype=bool)
+    for estudiante_id, inicio, fin in indice_permisos.intervalos():
+        fila = fila_de_estudiante.get(estudiante_id)
+        if fila is not None:
+            primera = np.searchsorted(ordinales_dias, inicio.toordinal(), side='left')
+            ultima = np.searchsorted(ordinales_dias, fin.toordinal(), side='right')
+            cubiertas[fila, primera:ultima] = True
+    estados[(estados == AUSENTE) & cubiertas] = JUSTIFICADA
+
+    horas_asistidas = np.bincount(
+        filas_registro[validos], weights=np.where(presentes, horas, 0)[validos], minlength=len(estudiantes)
+    ).astype(np.int64)
+    total_presentes = (estados == PRESENTE).sum(axis=1)
+    total_ausentes = (estados == AUSENTE).sum(axis=1)
+    total_justificadas = (estados == JUSTIFICADA).sum(axis=1)
+    registrados = total_presentes + total_ausentes + total_justificadas
+    tasas = np.round(100 * total_ausentes / np.maximum(registrados, 1), 1)
+    rachas_maximas, rachas_actuales = _rachas_inasistencia(estados)
+    celdas = _CELDAS_MATRIZ[estados]
+
+    filas = []
+    for fila, (pk, cedula, nombres, apellidos) in enumerate(estudiantes):
+        filas.append({
+            'estudiante_id': pk,
+            'cedula': cedula,
+            'nombre_completo': f'{apellidos}, {nombres}',
+            'celdas': mark_safe(''.join(celdas[fila])),
+            'presentes': int(total_presentes[fila]),
+            'ausentes': int(total_ausentes[fila]),
+            'justificadas': int(total_justificadas[fila]),
+            'horas_asistidas': int(horas_asistidas[fila]),
+            'tasa_inasistencia': float(tasas[fila]),
+            'racha_maxima': int(rachas_maximas[fila]),
+            'racha_actual': int(rachas_actuales[fila]),
+        })
+    REPORTE_FILAS.observar(len(filas), reporte='matriz')
+    return {'dias': [date.fromordinal(int(ordinal)) for ordinal in ordinales_dias], 'filas': filas}
@@ -0,0 +1,498 @@
+from collections import defaultdict
+from datetime import timedelta
+from itertools import groupby
+from operator import itemgetter
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Exists, F, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+from .models import Asistencia, PerfilEstudiante, SolicitudPermiso, ResumenAsistenciaDiaria, HorasAsistidasCurso, Curso, AlertaAusentismo, AuditoriaPermisos
+from .reportes import invalidar_cache_reportes
+from .permisos import obtener_indice_permisos
+from .metricas import ASISTENCIA_LOTE_ESTUDIANTES, ASISTENCIA_GUARDADO_SEGUNDOS
+from .versiones import marcar_cursos_modificados, marcar_estudiantes_modificados
+
+# Segundos que se reutilizan los contadores del dashboard antes de recalcularlos
+DASHBOARD_CACHE_TTL = 60
+CLAVE_VERSION_DASHBOARD = 'dashboard:version'
+
+
+# --- Servicio de Asistencia ---
+
+def guardar_asistencia_masiva(estudiantes_queryset, ids_presentes, horas_academicas):
+    """
+    Guarda la asistencia del día para todos los estudiantes del queryset en un número fijo de consultas.
+    Escribe todos los registros con un único upsert (INSERT ... ON CONFLICT sobre estudiante y día)
+    dentro de una transacción, y actualiza el libro de horas con la diferencia respecto a lo
+    ya guardado ese día. Devuelve el número de registros guardados.
+    """
+    dia = timezone.localdate()
+    ids_presentes = {str(pk) for pk in ids_presentes}
+    ahora = timezone.now()
+
+    with ASISTENCIA_GUARDADO_SEGUNDOS.medir(), transaction.atomic():
+        estudiantes = list(estudiantes_queryset.values_list('pk', 'curso_id'))
+        cursos_afectados = {curso_id for _, curso_id in estudiantes if curso_id}
+
+        # Horas ya registradas hoy, para sumar al libro solo la diferencia
+        horas_previas = {
+            estudiante_id: horas if esta_presente else 0
+            for estudiante_id, esta_presente, horas in Asistencia.objects.filter(
+                estudiante__in=estudiantes_queryset.values('pk'), dia=dia
+            ).values_list('estudiante_id', 'esta_presente', 'horas_academicas')
+        }
+
+        registros = [
+            Asistencia(
+                estudiante_id=estudiante_id,
+                esta_presente=str(estudiante_id) in ids_presentes,
+                horas_academicas=horas_academicas,
+                fecha=ahora,
+                dia=dia,
+            )
+            for estudiante_id, _ in estudiantes
+        ]
+        Asistencia.objects.bulk_create(
+            registros,
+            batch_size=500,
+            update_conflicts=True,
+            unique_fields=['estudiante', 'dia'],
+            update_fields=['esta_presente', 'fecha', 'horas_academicas'],
+        )
+
+        # Mantener el resumen diario y el libro de horas dentro de la misma transacción
+        actualizar_resumen_asistencia(cursos_afectados, [dia])
+        aplicar_diferencias_horas({
+            (registro.estudiante_id, curso_id): (
+                (horas_academicas if registro.esta_presente else 0) - horas_previas.get(registro.estudiante_id, 0)
+            )
+            for registro, (_, curso_id) in zip(registros, estudiantes)
+        })
+        # Las páginas de los cursos afectados dejan de coincidir con su ETag
+        if estudiantes:
+            marcar_cursos_modificados(curso_id for _, curso_id in estudiantes)
+
+        # Los PDF en caché y los contadores del dashboard ya no reflejan la asistencia guardada
+        transaction.on_commit(lambda: invalidar_cache_reportes(cursos_afectados))
+        transaction.on_commit(invalidar_estadisticas_dashboard)
+
+    ASISTENCIA_LOTE_ESTUDIANTES.observar(len(registros))
+    return len(registros)
+
+def guardar_cambios_asistencia(estudiantes_queryset, cambios, horas_academicas):
+    """
+    Guarda la asistencia del día solo de los estudiantes que cambiaron: `cambios` es
+    {estudiante_id: presente}. Los estudiantes que no están en el queryset se omiten.
+    Si el curso de un estudiante aún no tiene asistencia ese día, se guarda la lista completa
+    del curso (ausente salvo los marcados), para que las inasistencias del resto queden registradas.
+    Escribe las filas con un único upsert y mantiene el resumen diario y el libro de horas igual
+    que guardar_asistencia_masiva. Devuelve (registros guardados, estudiantes omitidos).
+    """
+    if not cambios:
+        return 0, 0
+    # Estudiantes del alcance y si su curso ya tiene asistencia hoy, en una sola consulta
+    curso_tomado = Asistencia.objects.filter(dia=timezone.localdate(), estudiante__curso_id=OuterRef('curso_id'))
+    en_alcance = list(
+        estudiantes_queryset.filter(pk__in=list(cambios))
+        .values_list('pk', 'curso_id', Exists(curso_tomado))
+    )
+    omitidos = len(cambios) - len(en_alcance)
+    if not en_alcance:
+        return 0, omitidos
+
+    filtro = Q(pk__in=[pk for pk, _, _ in en_alcance])
+    cursos_sin_tomar = {curso_id for _, curso_id, tomado in en_alcance if curso_id and not tomado}
+    if cursos_sin_tomar:
+        filtro |= Q(curso_id__in=cursos_sin_tomar)
+    guardados = guardar_asistencia_masiva(
+        estudiantes_queryset.filter(filtro),
+        [estudiante_id for estudiante_id, presente in cambios.items() if presente],
+        horas_academicas,
+    )
+    return guardados, omitidos
+
+
+def guardar_registro_asistencia(asistencia):
+    """
+    Guarda un registro suelto de asistencia (p. ej. desde el admin) y, en la misma transacción,
+    aplica al libro de horas la diferencia con el registro anterior y recalcula el resumen diario
+    de los cursos y días afectados (los del registro anterior también, si cambió de estudiante o de día).
+    """
+    with transaction.atomic():
+        anterior = None
+        if asistencia.pk:
+            anterior = (
+                Asistencia.objects.filter(pk=asistencia.pk)
+                .values_list('estudiante_id', 'estudiante__curso_id', 'dia', 'esta_presente', 'horas_academicas')
+                .first()
+            )
+        asistencia.save()
+        curso_id = PerfilEstudiante.objects.filter(pk=asistencia.estudiante_id).values_list('curso_id', flat=True).get()
+
+        diferencias = defaultdict(int)
+        diferencias[(asistencia.estudiante_id, curso_id)] += asistencia.horas_academicas if asistencia.esta_presente else 0
+        cursos_afectados = {curso_id}
+        dias = {asistencia.dia}
+        if anterior:
+            estudiante_anterior, curso_anterior, dia_anterior, presente_anterior, horas_anteriores = anterior
+            diferencias[(estudiante_anterior, curso_anterior)] -= horas_anteriores if presente_anterior else 0
+            cursos_afectados.add(curso_anterior)
+            dias.add(dia_anterior)
+        _asistencias_modificadas(cursos_afectados, dias, diferencias)
+
+def eliminar_asistencias(asistencias_queryset):
+    """
+    Elimina en bloque los registros de asistencia del queryset y, en la misma transacción,
+    descuenta sus horas del libro y recalcula el resumen diario de los cursos y días afectados.
+    Lee lo necesario con dos consultas agregadas antes del DELETE, sin cargar los registros.
+    Devuelve el número de registros eliminados.
+    """
+    with transaction.atomic():
+        asistencias_queryset = asistencias_queryset.order_by()
+        horas_presentes = asistencias_queryset.filter(esta_presente=True).values_list(
+            'estudiante_id', 'estudiante__curso_id'
+        ).annotate(horas=Sum('horas_academicas'))
+        diferencias = {(estudiante_id, curso_id): -horas for estudiante_id, curso_id, horas in horas_presentes}
+        cursos_y_dias = set(asistencias_queryset.values_list('estudiante__curso_id', 'dia').distinct())
+
+        eliminados, _ = asistencias_queryset.delete()
+        _asistencias_modificadas({curso_id for curso_id, _ in cursos_y_dias}, {dia for _, dia in cursos_y_dias}, diferencias)
+    return eliminados
+
+def _asistencias_modificadas(curso_ids, dias, diferencias):
+    """
+    Aplica las diferencias al libro de horas, recalcula el resumen diario e invalida las versiones
+    de datos, los PDF en caché y los contadores del dashboard de los cursos afectados.
+    """
+    aplicar_diferencias_horas(diferencias)
+    cursos_con_resumen = set(curso_ids) - {None}
+    actualizar_resumen_asistencia(cursos_con_resumen, dias)
+    marcar_cursos_modificados(curso_ids)
+    transaction.on_commit(lambda: invalidar_cache_reportes(cursos_con_resumen))
+    transaction.on_commit(invalidar_estadisticas_dashboard)
+
+
+# --- Resumen diario de asistencia ---
+
+def _agregar_asistencia_por_curso_y_dia(asistencias_queryset):
+    """
+    Agrupa asistencias por (curso, día) con presentes, ausentes y horas asistidas.
+    """
+    return (
+        asistencias_queryset
+        .filter(estudiante__curso__isnull=False)
+        .values('estudiante__curso_id', 'dia')
+        .annotate(
+            presentes=Count('pk', filter=Q(esta_presente=True)),
+            ausentes=Count('pk', filter=Q(esta_presente=False)),
+            horas_presentes=Coalesce(Sum('horas_academicas', filter=Q(esta_presente=True)), 0),
+        )
+        .order_by()
+    )
+
+def _resumen_desde_fila(fila):
+    return ResumenAsistenciaDiaria(
+        curso_id=fila['estudiante__curso_id'],
+        dia=fila['dia'],
+        presentes=fila['presentes'],
+        ausentes=fila['ausentes'],
+        horas_presentes=fila['horas_presentes'],
+    )
+
+def actualizar_resumen_asistencia(curso_ids, dias):
+    """
+    Recalcula de forma incremental el resumen diario de los cursos y días indicados:
+    una consulta agregada sobre esos días y un upsert de las filas resultantes.
+    """
+    curso_ids = set(curso_ids)
+    dias = set(dias)
+    if not curso_ids or not dias:
+        return
+
+    filas = _agregar_asistencia_por_curso_y_dia(
+        Asistencia.objects.filter(dia__in=dias, estudiante__curso_id__in=curso_ids)
+    )
+    resumenes = [_resumen_desde_fila(fila) for fila in filas]
+    ResumenAsistenciaDiaria.objects.bulk_create(
+        resumenes,
+        update_conflicts=True,
+        unique_fields=['curso', 'dia'],
+        update_fields=['presentes', 'ausentes', 'horas_presentes'],
+    )
+
+    # Quitar los resúmenes de combinaciones (curso, día) que ya no tienen registros
+    vigentes = {(resumen.curso_id, resumen.dia) for resumen in resumenes}
+    obsoletos = [
+        pk for pk, curso_id, dia in ResumenAsistenciaDiaria.objects
+        .filter(curso_id__in=curso_ids, dia__in=dias)
+        .values_list('pk', 'curso_id', 'dia')
+        if (curso_id, dia) not in vigentes
+    ]
+    if obsoletos:
+        ResumenAsistenciaDiaria.objects.filter(pk__in=obsoletos).delete()
+
+def reconstruir_resumen_asistencia(desde=None, hasta=None, batch_size=1000):
+    """
+    Reconstruye desde cero el resumen diario en el rango indicado (todo el historial por defecto).
+    Devuelve el número de filas de resumen creadas.
+    """
+    asistencias = Asistencia.objects.all()
+    resumenes_existentes = ResumenAsistenciaDiaria.objects.all()
+    if desde:
+        asistencias = asistencias.filter(dia__gte=desde)
+        resumenes_existentes = resumenes_existentes.filter(dia__gte=desde)
+    if hasta:
+        asistencias = asistencias.filter(dia__lte=hasta)
+        resumenes_existentes = resumenes_existentes.filter(dia__lte=hasta)
+
+    total = 0
+    with transaction.atomic():
+        resumenes_existentes.delete()
+        lote = []
+        for fila in _agregar_asistencia_por_curso_y_dia(asistencias).iterator(chunk_size=batch_size):
+            lote.append(_resumen_desde_fila(fila))
+            if len(lote) >= batch_size:
+                ResumenAsistenciaDiaria.objects.bulk_create(lote)
+                total += len(lote)
+                lote = []
+        if lote:
+            ResumenAsistenciaDiaria.objects.bulk_create(lote)
+            total += len(lote)
+        marcar_cursos_modificados()
+    return total
+
+
+# --- Libro de horas asistidas ---
+
+def aplicar_diferencias_horas(diferencias):
+    """
+    Suma al total de cada estudiante, y a su fila del curso, la diferencia de horas indicada
+    en `diferencias` ({(estudiante_id, curso_id): horas}). Emite una actualización por cada
+    valor distinto de diferencia, no una por estudiante.
+    """
+    diferencias = {clave: horas for clave, horas in diferencias.items() if horas}
+    if not diferencias:
+        return
+
+    HorasAsistidasCurso.objects.bulk_create(
+        [HorasAsistidasCurso(estudiante_id=estudiante_id, curso_id=curso_id) for estudiante_id, curso_id in diferencias if curso_id],
+        batch_size=500,
+        ignore_conflicts=True,
+    )
+
+    por_diferencia = defaultdict(list)
+    for clave, horas in diferencias.items():
+        por_diferencia[horas].append(clave)
+
+    for horas, claves in por_diferencia.items():
+        PerfilEstudiante.objects.filter(pk__in=[estudiante_id for estudiante_id, _ in claves]).update(
+            horas_asistidas=Greatest(F('horas_asistidas') + horas, Value(0))
+        )
+        por_curso = defaultdict(list)
+        for estudiante_id, curso_id in claves:
+            if curso_id:
+                por_curso[curso_id].append(estudiante_id)
+        for curso_id, estudiante_ids in por_curso.items():
+            HorasAsistidasCurso.objects.filter(curso_id=curso_id, estudiante_id__in=estudiante_ids).update(
+                horas=Greatest(F('horas') + horas, Value(0))
+            )
+
+def conciliar_horas_asistidas(estudiante_ids=None, corregir=False):
+    """
+    Compara el libro de horas con la suma real de las asistencias presentes de cada estudiante.
+    Devuelve las discrepancias encontradas; con `corregir=True` ajusta el total del estudiante
+    y atribuye a su curso actual la diferencia que falte o sobre en las filas por curso.
+    """
+    asistencias = Asistencia.objects.filter(esta_presente=True)
+    estudiantes = PerfilEstudiante.objects.all()
+    libro = HorasAsistidasCurso.objects.all()
+    if estudiante_ids is not None:
+        asistencias = asistencias.filter(estudiante_id__in=estudiante_ids)
+        estudiantes = estudiantes.filter(pk__in=estudiante_ids)
+        libro = libro.filter(estudiante_id__in=estudiante_ids)
+
+    horas_reales = dict(
+        asistencias.values('estudiante_id').annotate(total=Sum('horas_academicas')).order_by()
+        .values_list('estudiante_id', 'total')
+    )
+    horas_en_cursos = dict(
+        libro.values('estudiante_id').annotate(total=Sum('horas')).order_by()
+        .values_list('estudiante_id', 'total')
+    )
+
+    discrepancias = []
+    filas = estudiantes.order_by('pk').values_list('pk', 'curso_id', 'horas_asistidas').iterator(chunk_size=2000)
+    for estudiante_id, curso_id, registradas in filas:
+        reales = horas_reales.get(estudiante_id, 0)
+        en_cursos = horas_en_cursos.get(estudiante_id, 0)
+        if registradas != reales or (curso_id and en_cursos != reales):
+            discrepancias.append({
+                'estudiante_id': estudiante_id,
+                'curso_id': curso_id,
+                'registradas': registradas,
+                'reales': reales,
+                'en_cursos': en_cursos,
+            })
+
+    if corregir and discrepancias:
+        with transaction.atomic():
+            for discrepancia in discrepancias:
+                PerfilEstudiante.objects.filter(pk=discrepancia['estudiante_id']).update(horas_asistidas=discrepancia['reales'])
+                if discrepancia['curso_id'] and discrepancia['en_cursos'] != discrepancia['reales']:
+                    fila, _ = HorasAsistidasCurso.objects.get_or_create(
+                        estudiante_id=discrepancia['estudiante_id'], curso_id=discrepancia['curso_id']
+                    )
+                    fila.horas = max(0, fila.horas + discrepancia['reales'] - discrepancia['en_cursos'])
+                    fila.save(update_fields=['horas'])
+            marcar_estudiantes_modificados([discrepancia['estudiante_id'] for discrepancia in discrepancias])
+    return discrepancias
+
+
+# --- Gestión de permisos en lote ---
+
+def cambiar_estado_permisos(alcance, solicitud_ids, estado, usuario):
+    """
+    Aprueba o rechaza en lote las solicitudes pendientes indicadas que estén dentro del alcance
+    del administrador. El filtro de alcance va en la misma consulta, el cambio de estado es un único
+    UPDATE ... WHERE id IN (...) y se deja un registro de auditoría. Devuelve los IDs procesados.
+    """
+    with transaction.atomic():
+        solicitudes = alcance.filtrar(
+            SolicitudPermiso.objects.filter(pk__in=solicitud_ids, estado=SolicitudPermiso.Estado.PENDIENTE),
+            'estudiante__curso'
+        )
+        afectadas = list(solicitudes.select_for_update(of=('self',)).values_list('pk', 'estudiante__curso_id'))
+        ids = sorted(pk for pk, _ in afectadas)
+        if not ids:
+            return []
+
+        SolicitudPermiso.objects.filter(pk__in=ids, estado=SolicitudPermiso.Estado.PENDIENTE).update(estado=estado)
+        AuditoriaPermisos.objects.create(usuario=usuario, estado=estado, solicitudes=ids, cantidad=len(ids))
+        marcar_cursos_modificados(curso_id for _, curso_id in afectadas)
+
+        # update() no emite señales: invalidar aquí el dashboard y los PDF de los cursos afectados
+        cursos_afectados = {curso_id for _, curso_id in afectadas if curso_id}
+        transaction.on_commit(invalidar_estadisticas_dashboard)
+        transaction.on_commit(lambda: invalidar_cache_reportes(cursos_afectados))
+    return ids
+
+
+# --- Detección de ausentismo ---
+
+def _alerta_desde_registros(estudiante_id, registros, indice_permisos, inicio_ventana, umbral_racha, umbral_tasa, minimo_registros, ahora):
+    """
+    Recorre una vez los registros de un estudiante (ordenados por día) y devuelve su alerta,
+    o None si no supera ningún umbral. Las inasistencias justificadas por un permiso aprobado
+    no cuentan como ausencia ni cortan la racha.
+    """
+    racha = ausencias = registros_ventana = 0
+    for _, dia, esta_presente in registros:
+        justificada = not esta_presente and indice_permisos.cubre(estudiante_id, dia)
+        if esta_presente:
+            racha = 0
+        elif not justificada:
+            racha += 1
+        if dia >= inicio_ventana:
+            registros_ventana += 1
+            if not esta_presente and not justificada:
+                ausencias += 1
+
+    tasa = round(100 * ausencias / registros_ventana, 1) if registros_ventana else 0
+    por_racha = racha >= umbral_racha
+    por_tasa = registros_ventana >= minimo_registros and tasa >= umbral_tasa
+    if not (por_racha or por_tasa):
+        return None
+    return AlertaAusentismo(
+        estudiante_id=estudiante_id,
+        racha_inasistencias=racha,
+        ausencias_ventana=ausencias,
+        registros_ventana=registros_ventana,
+        tasa_inasistencia=tasa,
+        por_racha=por_racha,
+        por_tasa=por_tasa,
+        fecha_calculo=ahora,
+    )
+
+def detectar_ausentismo(umbral_racha=3, umbral_tasa=25, ventana_dias=30, minimo_registros=5):
+    """
+    Recalcula las alertas de ausentismo de todos los estudiantes: inasistencias consecutivas
+    hasta el último registro y tasa de inasistencia en los últimos `ventana_dias` días
+    (solo con al menos `minimo_registros` registros en la ventana), sin contar las inasistencias
+    justificadas por permisos aprobados. Lee la asistencia de cada curso en una sola pasada
+    ordenada por estudiante y día, y reemplaza sus alertas.
+    Devuelve el número de alertas generadas.
+    """
+    ahora = timezone.now()
+    inicio_ventana = timezone.localdate() - timedelta(days=ventana_dias - 1)
+    total = 0
+
+    for curso_id in Curso.objects.values_list('pk', flat=True):
+        indice_permisos = obtener_indice_permisos(PerfilEstudiante.objects.filter(curso_id=curso_id))
+        registros = (
+            Asistencia.objects
+            .filter(estudiante__curso_id=curso_id)
+            .order_by('estudiante_id', 'dia')
+            .values_list('estudiante_id', 'dia', 'esta_presente')
+            .iterator(chunk_size=5000)
+        )
+        alertas = []
+        for estudiante_id, registros_estudiante in groupby(registros, key=itemgetter(0)):
+            alerta = _alerta_desde_registros(
+                estudiante_id, registros_estudiante, indice_permisos, inicio_ventana,
+                umbral_racha, umbral_tasa, minimo_registros, ahora
+            )
+            if alerta is not None:
+                alertas.append(alerta)
+
+        with transaction.atomic():
+            AlertaAusentismo.objects.filter(estudiante__curso_id=curso_id).delete()
+            AlertaAusentismo.objects.bulk_create(alertas, batch_size=500)
+            marcar_cursos_modificados([curso_id])
+        total += len(alertas)
+
+    # Estudiantes que ya no tienen curso no se evalúan
+    AlertaAusentismo.objects.filter(estudiante__curso__isnull=True).delete()
+    invalidar_estadisticas_dashboard()
+    return total
+
+
+# --- Estadísticas del Dashboard ---
+
+def _version_dashboard():
+    return cache.get_or_set(CLAVE_VERSION_DASHBOARD, 1, timeout=None)
+
+def invalidar_estadisticas_dashboard():
+    """
+    Invalida todos los contadores del dashboard en caché (se llama al cambiar estudiantes o permisos).
+    """
+    try:
+        cache.incr(CLAVE_VERSION_DASHBOARD)
+    except ValueError:
+        cache.set(CLAVE_VERSION_DASHBOARD, 1, timeout=None)
+
+def obtener_estadisticas_dashboard(usuario, curso, estudiantes_queryset):
+    """
+    Contadores del dashboard para el alcance dado (estudiantes, estudiantes en riesgo de
+    ausentismo, horas asistidas y permisos pendientes), calculados con una sola consulta de agregación y guardados en caché
+    por administrador y curso durante DASHBOARD_CACHE_TTL segundos.
+    """
+    clave = f"dashboard:{_version_dashboard()}:{usuario.pk}:{curso.pk if curso else 'todos'}"
+    estadisticas = cache.get(clave)
+    if estadisticas is None:
+        # Permisos pendientes por estudiante como subconsulta, para no multiplicar las horas en un JOIN
+        pendientes = (
+            SolicitudPermiso.objects
+            .filter(estudiante=OuterRef('pk'), estado=SolicitudPermiso.Estado.PENDIENTE)
+            .values('estudiante')
+            .annotate(total=Count('pk'))
+            .values('total')
+        )
+        estadisticas = estudiantes_queryset.aggregate(
+            total_estudiantes=Count('pk'),
+            estudiantes_en_riesgo=Count('alerta_ausentismo'),
+            horas_asistidas=Coalesce(Sum('horas_asistidas'), 0),
+            permisos_pendientes=Coalesce(Sum(Subquery(pendientes)), 0),
+        )
+        cache.set(clave, estadisticas, DASHBOARD_CACHE_TTL)
+    return estadisticas
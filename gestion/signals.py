@@ -0,0 +1,105 @@
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import m2m_changed, pre_save, post_save, pre_delete, post_delete
+from django.dispatch import receiver
+from .models import Usuario, Curso, PerfilEstudiante, SolicitudPermiso
+from .services import invalidar_estadisticas_dashboard, actualizar_resumen_asistencia
+from .reportes import invalidar_cache_reportes
+from .versiones import marcar_cursos_modificados
+
+
+def _invalidar_alcance(usuario_ids):
+    """
+    Incrementa la versión de alcance de los usuarios para que su alcance memorizado se recalcule.
+    """
+    if usuario_ids:
+        Usuario.objects.filter(pk__in=usuario_ids).update(version_alcance=F('version_alcance') + 1)
+
+@receiver(m2m_changed, sender=Usuario.cursos_asignados.through)
+def cursos_asignados_cambiados(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Invalida el alcance de cursos cuando cambian las asignaciones, desde el usuario o desde el curso.
+    """
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            _invalidar_alcance([instance.pk])
+    elif action in ('post_add', 'post_remove'):
+        _invalidar_alcance(pk_set)
+    elif action == 'pre_clear':
+        _invalidar_alcance(list(instance.administradores.values_list('pk', flat=True)))
+
+@receiver([post_save, post_delete], sender=PerfilEstudiante)
+@receiver([post_save, post_delete], sender=SolicitudPermiso)
+def estudiante_o_permiso_cambiado(sender, **kwargs):
+    """
+    Invalida los contadores del dashboard cuando se crea, modifica o elimina un estudiante o permiso.
+    """
+    invalidar_estadisticas_dashboard()
+
+# --- Resumen diario al eliminar estudiantes ---
+# Los registros de asistencia se guardan y eliminan desde services.py (guardar_asistencia_masiva,
+# guardar_registro_asistencia, eliminar_asistencias), que mantienen el resumen y el libro de horas
+# en bloque. Asistencia no tiene receptores, así que su borrado en cascada es un solo DELETE.
+
+@receiver(pre_delete, sender=PerfilEstudiante)
+def estudiante_por_eliminar(sender, instance, **kwargs):
+    """
+    Recuerda los días con asistencia del estudiante, cuyos resúmenes cambian al eliminarlo.
+    """
+    instance._dias_asistencia = set(instance.asistencias.values_list('dia', flat=True).distinct())
+
+@receiver(post_delete, sender=PerfilEstudiante)
+def estudiante_eliminado(sender, instance, **kwargs):
+    """
+    Recalcula el resumen diario de los días en que el estudiante eliminado tenía asistencia.
+    """
+    if instance.curso_id:
+        actualizar_resumen_asistencia([instance.curso_id], getattr(instance, '_dias_asistencia', ()))
+
+@receiver([post_save, post_delete], sender=SolicitudPermiso)
+def permiso_cambiado(sender, instance, **kwargs):
+    """
+    Invalida los PDF en caché del curso del estudiante (un permiso aprobado justifica inasistencias)
+    e incrementa la versión de datos del curso.
+    """
+    # Vacía si el estudiante ya no existe (borrado en cascada), [None] si no tiene curso
+    curso_ids = list(PerfilEstudiante.objects.filter(pk=instance.estudiante_id).values_list('curso_id', flat=True))
+    if curso_ids and curso_ids[0]:
+        transaction.on_commit(lambda: invalidar_cache_reportes(curso_ids))
+    marcar_cursos_modificados(curso_ids)
+
+# --- Versiones de datos por curso (ETag de las páginas de admin) ---
+
+@receiver(pre_save, sender=PerfilEstudiante)
+def estudiante_por_guardar(sender, instance, **kwargs):
+    """
+    Recuerda el curso anterior del estudiante, que también cambia si lo cambian de curso.
+    """
+    instance._curso_id_anterior = (
+        PerfilEstudiante.objects.filter(pk=instance.pk).values_list('curso_id', flat=True).first()
+        if instance.pk else instance.curso_id
+    )
+
+@receiver([post_save, post_delete], sender=PerfilEstudiante)
+def estudiante_guardado_o_eliminado(sender, instance, **kwargs):
+    """
+    Incrementa la versión de datos del curso del estudiante (y del anterior, si cambió de curso).
+    """
+    marcar_cursos_modificados({instance.curso_id, getattr(instance, '_curso_id_anterior', instance.curso_id)})
+
+@receiver(post_save, sender=Usuario)
+def usuario_guardado(sender, instance, created, update_fields, **kwargs):
+    """
+    Incrementa la versión de datos del curso de un estudiante cuando cambia su cuenta
+    (el correo aparece en el reporte PDF). El inicio de sesión solo guarda last_login y se omite.
+    """
+    if created or update_fields == frozenset(['last_login']):
+        return
+    marcar_cursos_modificados(PerfilEstudiante.objects.filter(usuario=instance).values_list('curso_id', flat=True))
+
+@receiver(post_save, sender=Curso)
+def curso_guardado(sender, instance, **kwargs):
+    """
+    Incrementa la versión de datos del curso: su nombre aparece en los selectores de las páginas.
+    """
+    marcar_cursos_modificados([instance.pk])
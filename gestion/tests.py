@@ -1,3 +1,1227 @@
-from django.test import TestCase
+import copy
+import gc
+import json
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+from datetime import timedelta
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+from django.conf import settings
+from django.contrib.auth.hashers import UNUSABLE_PASSWORD_PREFIX, check_password
+from django.contrib.auth.tokens import default_token_generator
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.forms import modelform_factory
+from django.http import HttpResponse
+from django.template import Context, Template
+from django.test import RequestFactory, TestCase, override_settings, tag
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+from . import urls as gestion_urls
+from .management.commands.generar_datos_prueba import PREFIJO, Command as GenerarDatosPrueba
+from .alcance import AlcanceCursos
+from .cuentas import hashear_contrasenas, ruta_activacion, MINIMO_CONTRASENAS_EN_PARALELO
+from .metricas import RegistroMetricas
+from .middleware import InstrumentacionMiddleware, instalar_medicion_plantillas, _registrar_lenta, peticiones_lentas as obtener_peticiones_lentas, limpiar_peticiones_lentas
+from .paginacion import paginar_por_cursor, _codificar_cursor
+from .permisos import IndicePermisos, obtener_indice_permisos
+from .models import Usuario, Curso, PerfilEstudiante, SolicitudPermiso, Feedback, TrabajoReporte, Asistencia, ResumenAsistenciaDiaria, AuditoriaPermisos, AlertaAusentismo
+from .reportes import invalidar_cache_reportes, huella_asistencia_curso
+from .services import guardar_asistencia_masiva, guardar_registro_asistencia, eliminar_asistencias, conciliar_horas_asistidas, cambiar_estado_permisos
 
-# Create your tests here.
+# Imagen PNG de 1x1 píxel, para el logo de los reportes PDF en las pruebas
+PNG_1X1 = bytes.fromhex(
+    '89504e470d0a1a0a0000000d49484452000000010000000108060000001f15c489'
+    '0000000b49444154789c63f80f040009fb03fdfb5e6b2b0000000049454e44ae426082'
+)
+
+
+def crear_estudiante(curso, numero):
+    """
+    Crea un estudiante de prueba (usuario y perfil) en el curso indicado.
+    """
+    usuario = Usuario.objects.create_user(f'estudiante{numero}', f'estudiante{numero}@ejemplo.com')
+    return PerfilEstudiante.objects.create(
+        usuario=usuario,
+        curso=curso,
+        cedula=f'V{numero:08d}',
+        nombres=f'Nombre{numero}',
+        apellidos=f'Apellido{numero}',
+        telefono='0414-0000000',
+    )
+
+
+class PresupuestoConsultasTests(TestCase):
+    """
+    Verifica que las vistas de listas hacen un número fijo de consultas,
+    sin importar cuántas filas se muestren (evita regresiones N+1 en las plantillas).
+    """
+    # Máximo de consultas por página (sesión, usuario, cursos, datos, permisos y paginación)
+    PRESUPUESTO = {
+        'lista_estudiantes': 6,
+        'gestionar_permisos': 6,
+        'lista_feedback': 6,
+        'tomar_asistencia': 9,
+        'reporte_inasistencias': 7,
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.superusuario = Usuario.objects.create_superuser('admin', 'admin@ejemplo.com', 'clave-segura-123')
+        cls.curso = Curso.objects.create(nombre='Matemáticas 101', codigo='MAT101')
+        cls.otro_curso = Curso.objects.create(nombre='Historia Universal', codigo='HIS303')
+        cls.admin_curso = Usuario.objects.create_user('profesor', 'profesor@ejemplo.com', 'clave-segura-123', is_staff=True)
+        cls.admin_curso.cursos_asignados.add(cls.curso)
+
+    def crear_estudiantes(self, cantidad, curso):
+        inicio = PerfilEstudiante.objects.count()
+        for i in range(inicio, inicio + cantidad):
+            usuario = Usuario.objects.create_user(f'estudiante{i}', f'estudiante{i}@ejemplo.com')
+            perfil = PerfilEstudiante.objects.create(
+                usuario=usuario,
+                curso=curso,
+                cedula=f'V{i:08d}',
+                nombres=f'Nombre{i}',
+                apellidos=f'Apellido{i}',
+                telefono='0414-0000000',
+            )
+            SolicitudPermiso.objects.create(
+                estudiante=perfil,
+                fecha_inicio='2026-01-05',
+                fecha_fin='2026-01-06',
+                motivo='Cita médica',
+            )
+            Feedback.objects.create(estudiante=perfil, mensaje='Todo bien.')
+
+    def contar_consultas(self, url):
+        with CaptureQueriesContext(connection) as consultas:
+            respuesta = self.client.get(url)
+        self.assertEqual(respuesta.status_code, 200)
+        return len(consultas)
+
+    def comprobar_presupuesto(self, usuario, nombre_vista, parametros=''):
+        """
+        Cuenta las consultas con pocas y con muchas filas: deben coincidir y no superar el presupuesto.
+        """
+        self.client.force_login(usuario)
+        url = reverse(nombre_vista) + parametros
+
+        self.crear_estudiantes(2, self.curso)
+        # Primera visita: memoriza el alcance de cursos en la sesión, costo que no se repite
+        self.client.get(url)
+        pocas_filas = self.contar_consultas(url)
+        self.crear_estudiantes(15, self.curso)
+        self.crear_estudiantes(3, self.otro_curso)
+        muchas_filas = self.contar_consultas(url)
+
+        self.assertEqual(pocas_filas, muchas_filas, f'{nombre_vista} hace consultas por fila.')
+        self.assertLessEqual(muchas_filas, self.PRESUPUESTO[nombre_vista])
+
+    def test_lista_estudiantes(self):
+        self.comprobar_presupuesto(self.superusuario, 'lista_estudiantes')
+        self.comprobar_presupuesto(self.admin_curso, 'lista_estudiantes', f'?curso={self.curso.pk}')
+
+    def test_gestionar_permisos(self):
+        self.comprobar_presupuesto(self.superusuario, 'gestionar_permisos')
+        self.comprobar_presupuesto(self.admin_curso, 'gestionar_permisos', f'?curso={self.curso.pk}')
+
+    def test_lista_feedback(self):
+        self.comprobar_presupuesto(self.superusuario, 'lista_feedback')
+        self.comprobar_presupuesto(self.admin_curso, 'lista_feedback', f'?curso={self.curso.pk}')
+
+    def test_tomar_asistencia(self):
+        self.comprobar_presupuesto(self.superusuario, 'tomar_asistencia')
+        self.comprobar_presupuesto(self.admin_curso, 'tomar_asistencia', f'?curso={self.curso.pk}')
+
+    def test_reporte_inasistencias(self):
+        self.comprobar_presupuesto(self.superusuario, 'reporte_inasistencias')
+        self.comprobar_presupuesto(self.admin_curso, 'reporte_inasistencias', f'?curso={self.curso.pk}')
+
+
+class ColaReportesTests(TestCase):
+    """
+    El worker de reportes recupera los trabajos abandonados y no se detiene ante errores.
+    """
+    @classmethod
+    def setUpClass(cls):
+        cls.media_root = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, cls.media_root, ignore_errors=True)
+        ajustes = override_settings(MEDIA_ROOT=cls.media_root)
+        ajustes.enable()
+        cls.addClassCleanup(ajustes.disable)
+        super().setUpClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = Usuario.objects.create_superuser('admin', 'admin@ejemplo.com', 'clave-segura-123')
+        cls.curso = Curso.objects.create(nombre='Matemáticas 101', codigo='MAT101')
+
+    def crear_trabajo(self, **campos):
+        return TrabajoReporte.objects.create(curso=self.curso, solicitado_por=self.admin, facilitador_nombre='admin', **campos)
+
+    def procesar_cola(self):
+        call_command('procesar_reportes', una_vez=True, stdout=StringIO(), stderr=StringIO())
+
+    def test_trabajos_abandonados_se_reencolan_o_fallan(self):
+        hace_una_hora = timezone.now() - timedelta(hours=1)
+        reintentable = self.crear_trabajo(estado=TrabajoReporte.Estado.PROCESANDO, fecha_inicio=hace_una_hora, intentos=1)
+        agotado = self.crear_trabajo(estado=TrabajoReporte.Estado.PROCESANDO, fecha_inicio=hace_una_hora, intentos=2)
+        with mock.patch('gestion.management.commands.procesar_reportes.obtener_reporte_asistencia_pdf', return_value=b'%PDF'):
+            self.procesar_cola()
+
+        reintentable.refresh_from_db()
+        agotado.refresh_from_db()
+        self.assertEqual(reintentable.estado, TrabajoReporte.Estado.COMPLETADO)
+        self.assertEqual(reintentable.intentos, 2)
+        self.assertEqual(agotado.estado, TrabajoReporte.Estado.ERROR)
+
+    def test_solicitud_no_reutiliza_trabajo_abandonado(self):
+        abandonado = self.crear_trabajo(
+            estado=TrabajoReporte.Estado.PROCESANDO, fecha_inicio=timezone.now() - timedelta(hours=1), intentos=1
+        )
+        self.client.force_login(self.admin)
+        respuesta = self.client.post(reverse('solicitar_reporte_asistencia_pdf', args=[self.curso.pk]))
+        self.assertNotEqual(respuesta.json()['id'], abandonado.pk)
+
+    def test_enlace_directo_encola_sin_generar_el_pdf(self):
+        self.client.force_login(self.admin)
+        with mock.patch('gestion.reportes.renderizar_reporte_asistencia_pdf') as renderizar:
+            respuesta = self.client.get(reverse('generar_reporte_asistencia_pdf', args=[self.curso.pk]))
+        renderizar.assert_not_called()
+        trabajo = TrabajoReporte.objects.get()
+        self.assertEqual(trabajo.estado, TrabajoReporte.Estado.PENDIENTE)
+        self.assertRedirects(respuesta, reverse('estado_reporte', args=[trabajo.pk]))
+
+    def test_error_al_guardar_el_archivo_no_detiene_el_worker(self):
+        primero = self.crear_trabajo()
+        segundo = self.crear_trabajo()
+        with mock.patch('gestion.management.commands.procesar_reportes.obtener_reporte_asistencia_pdf', return_value=b'%PDF'), \
+                mock.patch('django.db.models.fields.files.FieldFile.save', side_effect=OSError('Disco lleno')):
+            self.procesar_cola()
+
+        for trabajo in (primero, segundo):
+            trabajo.refresh_from_db()
+            self.assertEqual(trabajo.estado, TrabajoReporte.Estado.ERROR)
+            self.assertEqual(trabajo.error, 'Disco lleno')
+
+
+class HuellaReportesTests(TestCase):
+    """
+    La huella del PDF en caché cambia con cualquier edición de los datos que muestra el reporte.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.curso = Curso.objects.create(nombre='Matemáticas 101', codigo='MAT101')
+        cls.perfil = crear_estudiante(cls.curso, 1)
+        cls.asistencia = Asistencia.objects.create(estudiante=cls.perfil, esta_presente=True)
+
+    def assertCambiaLaHuella(self, editar):
+        antes = huella_asistencia_curso(self.curso)
+        editar()
+        self.assertNotEqual(huella_asistencia_curso(self.curso), antes)
+
+    def test_editar_asistencia(self):
+        self.asistencia.esta_presente = False
+        self.assertCambiaLaHuella(lambda: guardar_registro_asistencia(self.asistencia))
+
+    def test_editar_estudiante(self):
+        self.perfil.telefono = '0424-1111111'
+        self.assertCambiaLaHuella(self.perfil.save)
+
+    def test_editar_correo_del_estudiante(self):
+        self.perfil.usuario.email = 'nuevo@ejemplo.com'
+        self.assertCambiaLaHuella(self.perfil.usuario.save)
+
+
+class AsistenciaUnicaPorDiaTests(TestCase):
+    def test_formulario_rechaza_segundo_registro_del_dia(self):
+        curso = Curso.objects.create(nombre='Matemáticas 101', codigo='MAT101')
+        perfil = crear_estudiante(curso, 1)
+        Asistencia.objects.create(estudiante=perfil, esta_presente=True)
+
+        AsistenciaForm = modelform_factory(Asistencia, fields='__all__')
+        ahora = timezone.localtime()
+        form = AsistenciaForm({
+            'estudiante': perfil.pk,
+            'fecha': ahora.strftime('%Y-%m-%d %H:%M:%S'),
+            'horas_academicas': 2,
+            'esta_presente': True,
+        })
+        self.assertFalse(form.is_valid())
+        self.assertIn('__all__', form.errors)
+
+
+class RegistroIndividualAsistenciaTests(TestCase):
+    """
+    Guardar o eliminar registros sueltos (p. ej. desde el admin) mantiene el resumen diario
+    y el libro de horas.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.superusuario = Usuario.objects.create_superuser('admin', 'admin@ejemplo.com', 'clave-segura-123')
+        cls.curso = Curso.objects.create(nombre='Matemáticas 101', codigo='MAT101')
+        cls.perfiles = [crear_estudiante(cls.curso, numero) for numero in range(2)]
+
+    def resumen(self):
+        return ResumenAsistenciaDiaria.objects.filter(curso=self.curso).values_list('presentes', 'ausentes', 'horas_presentes').first()
+
+    def test_guardar_y_eliminar_registro(self):
+        presente = Asistencia(estudiante=self.perfiles[0], esta_presente=True, horas_academicas=3)
+        guardar_registro_asistencia(presente)
+        guardar_registro_asistencia(Asistencia(estudiante=self.perfiles[1], esta_presente=False))
+        self.assertEqual(self.resumen(), (1, 1, 3))
+
+        presente.esta_presente = False
+        guardar_registro_asistencia(presente)
+        self.assertEqual(self.resumen(), (0, 2, 0))
+
+        self.assertEqual(eliminar_asistencias(Asistencia.objects.filter(pk=presente.pk)), 1)
+        self.assertEqual(self.resumen(), (0, 1, 0))
+        self.assertEqual(conciliar_horas_asistidas(), [])
+
+    def test_eliminar_registros_presentes_descuenta_horas(self):
+        guardar_asistencia_masiva(PerfilEstudiante.objects.all(), [perfil.pk for perfil in self.perfiles], 2)
+        self.perfiles[0].refresh_from_db()
+        self.assertEqual(self.perfiles[0].horas_asistidas, 2)
+
+        self.assertEqual(eliminar_asistencias(Asistencia.objects.all()), 2)
+        self.perfiles[0].refresh_from_db()
+        self.assertEqual(self.perfiles[0].horas_asistidas, 0)
+        self.assertEqual(self.perfiles[0].horas_por_curso.get().horas, 0)
+        self.assertIsNone(self.resumen())
+        self.assertEqual(conciliar_horas_asistidas(), [])
+
+    def test_eliminar_desde_el_admin(self):
+        guardar_asistencia_masiva(PerfilEstudiante.objects.all(), [perfil.pk for perfil in self.perfiles], 2)
+        self.client.force_login(self.superusuario)
+        respuesta = self.client.post(reverse('admin:gestion_asistencia_changelist'), {
+            'action': 'delete_selected',
+            '_selected_action': [Asistencia.objects.get(estudiante=self.perfiles[0]).pk],
+            'post': 'yes',
+        })
+        self.assertEqual(respuesta.status_code, 302)
+        self.assertEqual(self.resumen(), (1, 0, 2))
+        self.assertEqual(conciliar_horas_asistidas(), [])
+
+    def test_eliminar_estudiante(self):
+        guardar_asistencia_masiva(PerfilEstudiante.objects.all(), [perfil.pk for perfil in self.perfiles], 2)
+        self.perfiles[0].usuario.delete()
+        self.assertEqual(self.resumen(), (1, 0, 2))
+
+    def test_eliminar_estudiante_no_carga_sus_registros(self):
+        # Sin receptores en Asistencia, el borrado en cascada es un DELETE sin importar cuántos registros tenga
+        def consultas_al_eliminar(perfil, dias):
+            for dia in range(dias):
+                Asistencia.objects.create(estudiante=perfil, fecha=timezone.now() - timedelta(days=dia + 1))
+            with CaptureQueriesContext(connection) as consultas:
+                perfil.usuario.delete()
+            return len(consultas)
+
+        self.assertEqual(consultas_al_eliminar(self.perfiles[0], 2), consultas_al_eliminar(self.perfiles[1], 20))
+
+
+class MatrizAsistenciaTests(TestCase):
+    """
+    La matriz de asistencia pivota los registros en una cuadrícula estudiante × día
+    con totales, tasa de inasistencia y rachas por estudiante.
+    """
+    # Estados por día (5 al 10 de enero): P presente, A ausente, - sin registro
+    ESTADOS = {
+        1: 'PAA-AP',
+        2: 'AAAAPA',  # el segundo día está cubierto por un permiso aprobado
+        3: 'PPPPPP',
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.superusuario = Usuario.objects.create_superuser('admin', 'admin@ejemplo.com', 'clave-segura-123')
+        cls.curso = Curso.objects.create(nombre='Matemáticas 101', codigo='MAT101')
+        otro_curso = Curso.objects.create(nombre='Historia Universal', codigo='HIS303')
+        cls.perfiles = {numero: crear_estudiante(cls.curso, numero) for numero in cls.ESTADOS}
+        for numero, estados in cls.ESTADOS.items():
+            for dia, estado in enumerate(estados, start=5):
+                if estado != '-':
+                    Asistencia.objects.create(
+                        estudiante=cls.perfiles[numero],
+                        fecha=timezone.make_aware(timezone.datetime(2026, 1, dia, 8, 0)),
+                        esta_presente=estado == 'P',
+                    )
+        # Fuera del rango o de otro curso: no aparecen en la matriz
+        Asistencia.objects.create(estudiante=cls.perfiles[1], fecha=timezone.make_aware(timezone.datetime(2026, 1, 20, 8, 0)))
+        Asistencia.objects.create(estudiante=crear_estudiante(otro_curso, 4), fecha=timezone.make_aware(timezone.datetime(2026, 1, 11, 8, 0)))
+        SolicitudPermiso.objects.create(
+            estudiante=cls.perfiles[2], fecha_inicio='2026-01-06', fecha_fin='2026-01-06',
+            motivo='Cita médica', estado=SolicitudPermiso.Estado.APROBADO,
+        )
+
+    def test_totales_tasas_y_rachas(self):
+        self.client.force_login(self.superusuario)
+        respuesta = self.client.get(reverse('matriz_asistencia'), {
+            'curso': self.curso.pk, 'desde': '2026-01-05', 'hasta': '2026-01-11',
+        })
+        matriz = respuesta.context['matriz']
+        self.assertEqual(matriz['dias'], [timezone.datetime(2026, 1, dia).date() for dia in range(5, 11)])
+
+        claves = ('presentes', 'ausentes', 'justificadas', 'horas_asistidas', 'tasa_inasistencia', 'racha_maxima', 'racha_actual')
+        filas = {fila['estudiante_id']: tuple(fila[clave] for clave in claves) for fila in matriz['filas']}
+        self.assertEqual(filas, {
+            self.perfiles[1].pk: (2, 3, 0, 4, 60.0, 3, 0),
+            self.perfiles[2].pk: (1, 4, 1, 2, 66.7, 3, 1),
+            self.perfiles[3].pk: (6, 0, 0, 12, 0.0, 0, 0),
+        })
+        celdas = {fila['estudiante_id']: fila['celdas'] for fila in matriz['filas']}
+        self.assertEqual(celdas[self.perfiles[2].pk].count('>J</td>'), 1)
+        self.assertEqual(celdas[self.perfiles[1].pk].count('>-</td>'), 1)
+        self.assertContains(respuesta, celdas[self.perfiles[1].pk])
+
+    def test_curso_sin_asistencia_en_el_rango(self):
+        self.client.force_login(self.superusuario)
+        respuesta = self.client.get(reverse('matriz_asistencia'), {
+            'curso': self.curso.pk, 'desde': '2026-02-01', 'hasta': '2026-02-28',
+        })
+        matriz = respuesta.context['matriz']
+        self.assertEqual(matriz['dias'], [])
+        self.assertEqual([(fila['tasa_inasistencia'], fila['racha_maxima']) for fila in matriz['filas']], [(0, 0)] * 3)
+
+
+class IndicePermisosTests(TestCase):
+    def dia(self, numero):
+        return timezone.datetime(2026, 1, numero).date()
+
+    def test_intervalos_solapados_y_contiguos_se_fusionan(self):
+        indice = IndicePermisos([
+            (1, self.dia(5), self.dia(8)),
+            (1, self.dia(7), self.dia(10)),   # solapado
+            (1, self.dia(11), self.dia(12)),  # contiguo
+            (1, self.dia(20), self.dia(18)),  # fechas invertidas
+            (2, self.dia(1), self.dia(1)),
+        ])
+        self.assertEqual(sorted(indice.intervalos()), [
+            (1, self.dia(5), self.dia(12)),
+            (1, self.dia(18), self.dia(20)),
+            (2, self.dia(1), self.dia(1)),
+        ])
+        for numero in (5, 9, 11, 12, 18, 20):
+            self.assertTrue(indice.cubre(1, self.dia(numero)), numero)
+        for numero in (4, 13, 17, 21):
+            self.assertFalse(indice.cubre(1, self.dia(numero)), numero)
+
+    def test_estudiante_sin_permisos(self):
+        indice = IndicePermisos([(1, self.dia(5), self.dia(8))])
+        self.assertFalse(indice.cubre(2, self.dia(5)))
+        self.assertFalse(IndicePermisos([]).cubre(1, self.dia(5)))
+
+    def test_solo_permisos_aprobados_del_rango(self):
+        curso = Curso.objects.create(nombre='Matemáticas 101', codigo='MAT101')
+        perfil = crear_estudiante(curso, 1)
+        permiso = {'estudiante': perfil, 'motivo': 'Cita médica'}
+        SolicitudPermiso.objects.create(fecha_inicio='2026-01-05', fecha_fin='2026-01-06', estado=SolicitudPermiso.Estado.APROBADO, **permiso)
+        SolicitudPermiso.objects.create(fecha_inicio='2026-01-07', fecha_fin='2026-01-07', estado=SolicitudPermiso.Estado.PENDIENTE, **permiso)
+        SolicitudPermiso.objects.create(fecha_inicio='2026-01-08', fecha_fin='2026-01-08', estado=SolicitudPermiso.Estado.RECHAZADO, **permiso)
+        SolicitudPermiso.objects.create(fecha_inicio='2026-02-01', fecha_fin='2026-02-02', estado=SolicitudPermiso.Estado.APROBADO, **permiso)
+
+        indice = obtener_indice_permisos(PerfilEstudiante.objects.all(), self.dia(1), self.dia(31))
+        self.assertEqual(list(indice.intervalos()), [(perfil.pk, self.dia(5), self.dia(6))])
+
+
+class DeteccionAusentismoTests(TestCase):
+    """
+    detectar_ausentismo genera una alerta por racha de inasistencias, sin contar las justificadas
+    por un permiso aprobado, y reemplaza las alertas al volver a ejecutarse.
+    """
+    # Últimos cuatro días, del más antiguo a hoy: P presente, A ausente
+    ESTADOS = {
+        1: 'PAAA',
+        2: 'PAAA',  # el penúltimo día está cubierto por un permiso aprobado
+        3: 'PPPP',
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        curso = Curso.objects.create(nombre='Matemáticas 101', codigo='MAT101')
+        cls.perfiles = {numero: crear_estudiante(curso, numero) for numero in cls.ESTADOS}
+        hoy = timezone.localtime().replace(hour=8, minute=0)
+        for numero, estados in cls.ESTADOS.items():
+            for dias_atras, estado in zip(range(len(estados) - 1, -1, -1), estados):
+                Asistencia.objects.create(
+                    estudiante=cls.perfiles[numero], fecha=hoy - timedelta(days=dias_atras), esta_presente=estado == 'P'
+                )
+        permiso = (hoy - timedelta(days=1)).date()
+        SolicitudPermiso.objects.create(
+            estudiante=cls.perfiles[2], fecha_inicio=permiso, fecha_fin=permiso,
+            motivo='Cita médica', estado=SolicitudPermiso.Estado.APROBADO,
+        )
+
+    def detectar(self):
+        salida = StringIO()
+        call_command('detectar_ausentismo', racha=3, stdout=salida)
+        return salida.getvalue()
+
+    def test_racha_genera_alerta_y_la_justificada_no_cuenta(self):
+        self.assertIn('Alertas de ausentismo generadas: 1.', self.detectar())
+        alerta = AlertaAusentismo.objects.get()
+        self.assertEqual(alerta.estudiante, self.perfiles[1])
+        self.assertEqual((alerta.racha_inasistencias, alerta.por_racha, alerta.por_tasa), (3, True, False))
+
+    def test_volver_a_ejecutar_no_duplica_alertas(self):
+        self.detectar()
+        primera = AlertaAusentismo.objects.get()
+        self.detectar()
+        segunda = AlertaAusentismo.objects.get()
+        self.assertEqual(segunda.estudiante, primera.estudiante)
+        self.assertEqual(segunda.racha_inasistencias, 3)
+
+
+class AlcanceMemorizadoTests(TestCase):
+    """
+    El alcance de cursos memorizado en la sesión se recalcula al cambiar las asignaciones,
+    desde el curso o desde el usuario.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.curso = Curso.objects.create(nombre='Matemáticas 101', codigo='MAT101')
+        cls.admin_curso = Usuario.objects.create_user('profesor', 'profesor@ejemplo.com', is_staff=True)
+
+    def setUp(self):
+        self.client.force_login(self.admin_curso)
+
+    def assertAcceso(self, codigo):
+        respuesta = self.client.get(reverse('exportar_asistencia_csv'), {'curso': self.curso.pk})
+        self.assertEqual(respuesta.status_code, codigo)
+
+    def test_cambios_desde_el_curso(self):
+        self.assertAcceso(403)
+        self.curso.administradores.add(self.admin_curso)
+        self.assertAcceso(200)
+        self.curso.administradores.clear()
+        self.assertAcceso(403)
+
+    def test_cambios_desde_el_usuario(self):
+        self.assertAcceso(403)
+        self.admin_curso.cursos_asignados.add(self.curso)
+        self.assertAcceso(200)
+        self.admin_curso.cursos_asignados.remove(self.curso)
+        self.assertAcceso(403)
+        self.admin_curso.cursos_asignados.add(self.curso)
+        self.assertAcceso(200)
+        self.admin_curso.cursos_asignados.clear()
+        self.assertAcceso(403)
+
+
+class EstadisticasDashboardTests(TestCase):
+    """
+    Los contadores del dashboard se calculan sobre el alcance del administrador, sin que
+    varios permisos pendientes de un estudiante multipliquen sus horas.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.superusuario = Usuario.objects.create_superuser('admin', 'admin@ejemplo.com', 'clave-segura-123')
+        cls.curso = Curso.objects.create(nombre='Matemáticas 101', codigo='MAT101')
+        cls.otro_curso = Curso.objects.create(nombre='Historia Universal', codigo='HIS303')
+        cls.admin_curso = Usuario.objects.create_user('profesor', 'profesor@ejemplo.com', is_staff=True)
+        cls.admin_curso.cursos_asignados.add(cls.curso)
+        propios = [crear_estudiante(cls.curso, numero) for numero in range(3)]
+        ajenos = [crear_estudiante(cls.otro_curso, numero) for numero in range(3, 5)]
+
+        guardar_asistencia_masiva(PerfilEstudiante.objects.all(), [propios[0].pk, propios[1].pk, ajenos[0].pk], 3)
+        permiso = {'fecha_inicio': '2026-01-05', 'fecha_fin': '2026-01-06', 'motivo': 'Cita médica'}
+        SolicitudPermiso.objects.create(estudiante=propios[0], **permiso)
+        SolicitudPermiso.objects.create(estudiante=propios[0], **permiso)
+        SolicitudPermiso.objects.create(estudiante=propios[0], estado=SolicitudPermiso.Estado.APROBADO, **permiso)
+        SolicitudPermiso.objects.create(estudiante=ajenos[0], **permiso)
+        AlertaAusentismo.objects.create(estudiante=propios[1], por_racha=True)
+        AlertaAusentismo.objects.create(estudiante=ajenos[1], por_tasa=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def estadisticas(self, usuario, **parametros):
+        self.client.force_login(usuario)
+        contexto = self.client.get(reverse('dashboard_admin'), parametros).context
+        return {
+            clave: contexto[clave]
+            for clave in ('total_estudiantes', 'horas_asistidas', 'estudiantes_en_riesgo', 'permisos_pendientes')
+        }
+
+    def test_admin_de_curso(self):
+        self.assertEqual(self.estadisticas(self.admin_curso), {
+            'total_estudiantes': 3, 'horas_asistidas': 6, 'estudiantes_en_riesgo': 1, 'permisos_pendientes': 2,
+        })
+
+    def test_superusuario(self):
+        self.assertEqual(self.estadisticas(self.superusuario), {
+            'total_estudiantes': 5, 'horas_asistidas': 9, 'estudiantes_en_riesgo': 2, 'permisos_pendientes': 3,
+        })
+        self.assertEqual(self.estadisticas(self.superusuario, curso=self.otro_curso.pk), {
+            'total_estudiantes': 2, 'horas_asistidas': 3, 'estudiantes_en_riesgo': 1, 'permisos_pendientes': 1,
+        })
+
+
+class ExportacionAsistenciaTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.curso = Curso.objects.create(nombre='Matemáticas 101', codigo='MAT101')
+        cls.otro_curso = Curso.objects.create(nombre='Historia Universal', codigo='HIS303')
+        cls.admin_curso = Usuario.objects.create_user('profesor', 'profesor@ejemplo.com', is_staff=True)
+        cls.admin_curso.cursos_asignados.add(cls.curso)
+        perfil = crear_estudiante(cls.curso, 1)
+        ajeno = crear_estudiante(cls.otro_curso, 2)
+        for dia in (5, 6, 7):
+            fecha = timezone.make_aware(timezone.datetime(2026, 1, dia, 8, 0))
+            Asistencia.objects.create(estudiante=perfil, fecha=fecha, esta_presente=dia != 6)
+            Asistencia.objects.create(estudiante=ajeno, fecha=fecha, esta_presente=True)
+
+    def setUp(self):
+        self.client.force_login(self.admin_curso)
+
+    def exportar(self, **parametros):
+        return self.client.get(reverse('exportar_asistencia_csv'), parametros)
+
+    def filas(self, respuesta):
+        self.assertEqual(respuesta.status_code, 200)
+        contenido = b''.join(respuesta.streaming_content).decode('utf-8')
+        self.assertTrue(contenido.startswith('\ufeff'))
+        return contenido[1:].splitlines()
+
+    def test_encabezado_y_filas_del_alcance(self):
+        filas = self.filas(self.exportar())
+        self.assertEqual(filas[0], 'Fecha,Hora,Cédula,Apellidos,Nombres,Curso,Presente,Horas Académicas')
+        self.assertEqual(filas[1:], [
+            '05/01/2026,08:00,V00000001,Apellido1,Nombre1,MAT101,Sí,2',
+            '06/01/2026,08:00,V00000001,Apellido1,Nombre1,MAT101,No,2',
+            '07/01/2026,08:00,V00000001,Apellido1,Nombre1,MAT101,Sí,2',
+        ])
+
+    def test_filtra_por_rango_de_fechas(self):
+        respuesta = self.exportar(curso=self.curso.pk, desde='2026-01-06', hasta='2026-01-06')
+        self.assertIn('asistencia_MAT101_desde_2026-01-06_hasta_2026-01-06.csv', respuesta['Content-Disposition'])
+        filas = self.filas(respuesta)
+        self.assertEqual([fila.split(',')[0] for fila in filas[1:]], ['06/01/2026'])
+
+    def test_fecha_invalida(self):
+        self.assertEqual(self.exportar(desde='06/01/2026').status_code, 400)
+
+    def test_curso_fuera_del_alcance(self):
+        self.assertEqual(self.exportar(curso=self.otro_curso.pk).status_code, 403)
+
+
+class PaginacionCursorTests(TestCase):
+    """
+    La paginación por cursor recorre todas las filas sin saltar ni repetir ninguna,
+    también con fechas iguales o en el mismo milisegundo.
+    """
+    ORDEN = ['-fecha_creacion', 'pk']
+
+    @classmethod
+    def setUpTestData(cls):
+        Feedback.objects.bulk_create(Feedback(mensaje=f'Mensaje {numero}') for numero in range(60))
+        base = timezone.now().replace(microsecond=500000)
+        # Grupos de cinco filas con la misma fecha, separados por microsegundos dentro del mismo milisegundo
+        for indice, pk in enumerate(Feedback.objects.order_by('pk').values_list('pk', flat=True)):
+            Feedback.objects.filter(pk=pk).update(fecha_creacion=base + timedelta(microseconds=indice // 5))
+        cls.esperado = list(Feedback.objects.order_by(*cls.ORDEN).values_list('pk', flat=True))
+
+    def pagina(self, **parametros):
+        request = RequestFactory().get('/', parametros)
+        return paginar_por_cursor(request, Feedback.objects.all(), self.ORDEN)
+
+    def test_recorre_hacia_adelante_y_hacia_atras(self):
+        paginas = [self.pagina()]
+        while paginas[-1].tiene_siguiente:
+            paginas.append(self.pagina(despues=paginas[-1].cursor_siguiente))
+        self.assertEqual([len(pagina.objetos) for pagina in paginas], [25, 25, 10])
+        self.assertEqual([objeto.pk for pagina in paginas for objeto in pagina.objetos], self.esperado)
+        self.assertFalse(paginas[0].tiene_anterior)
+
+        atras = [paginas[-1]]
+        while atras[-1].tiene_anterior:
+            atras.append(self.pagina(antes=atras[-1].cursor_anterior))
+        self.assertEqual([objeto.pk for pagina in reversed(atras) for objeto in pagina.objetos], self.esperado)
+        self.assertEqual([len(pagina.objetos) for pagina in atras], [10, 25, 25])
+
+    def test_cursor_invalido_vuelve_a_la_primera_pagina(self):
+        for cursor in ('basura', _codificar_cursor(['no-es-fecha', 1]), _codificar_cursor([1]), _codificar_cursor({'pk': 1})):
+            with self.subTest(cursor=cursor):
+                pagina = self.pagina(despues=cursor)
+                self.assertEqual([objeto.pk for objeto in pagina.objetos], self.esperado[:25])
+                self.assertFalse(pagina.tiene_anterior)
+
+
+class PermisosEnLoteTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.curso = Curso.objects.create(nombre='Matemáticas 101', codigo='MAT101')
+        cls.otro_curso = Curso.objects.create(nombre='Historia Universal', codigo='HIS303')
+        cls.admin_curso = Usuario.objects.create_user('profesor', 'profesor@ejemplo.com', is_staff=True)
+        cls.admin_curso.cursos_asignados.add(cls.curso)
+        propio = crear_estudiante(cls.curso, 1)
+        ajeno = crear_estudiante(cls.otro_curso, 2)
+        permiso = {'fecha_inicio': '2026-01-05', 'fecha_fin': '2026-01-06', 'motivo': 'Cita médica'}
+        cls.pendiente = SolicitudPermiso.objects.create(estudiante=propio, **permiso)
+        cls.ya_aprobada = SolicitudPermiso.objects.create(estudiante=propio, estado=SolicitudPermiso.Estado.APROBADO, **permiso)
+        cls.fuera_de_alcance = SolicitudPermiso.objects.create(estudiante=ajeno, **permiso)
+
+    def test_solo_procesa_pendientes_del_alcance(self):
+        alcance = AlcanceCursos(self.admin_curso, [self.curso.pk])
+        solicitud_ids = [self.pendiente.pk, self.ya_aprobada.pk, self.fuera_de_alcance.pk]
+        procesadas = cambiar_estado_permisos(alcance, solicitud_ids, SolicitudPermiso.Estado.RECHAZADO, self.admin_curso)
+
+        self.assertEqual(procesadas, [self.pendiente.pk])
+        estados = dict(SolicitudPermiso.objects.values_list('pk', 'estado'))
+        self.assertEqual(estados, {
+            self.pendiente.pk: SolicitudPermiso.Estado.RECHAZADO,
+            self.ya_aprobada.pk: SolicitudPermiso.Estado.APROBADO,
+            self.fuera_de_alcance.pk: SolicitudPermiso.Estado.PENDIENTE,
+        })
+        auditoria = AuditoriaPermisos.objects.get()
+        self.assertEqual(
+            (auditoria.usuario, auditoria.estado, auditoria.solicitudes, auditoria.cantidad),
+            (self.admin_curso, SolicitudPermiso.Estado.RECHAZADO, [self.pendiente.pk], 1),
+        )
+
+    def test_sin_solicitudes_procesables_no_audita(self):
+        alcance = AlcanceCursos(self.admin_curso, [self.curso.pk])
+        procesadas = cambiar_estado_permisos(alcance, [self.fuera_de_alcance.pk], SolicitudPermiso.Estado.APROBADO, self.admin_curso)
+        self.assertEqual(procesadas, [])
+        self.assertFalse(AuditoriaPermisos.objects.exists())
+
+
+class ImportacionEstudiantesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.curso = Curso.objects.create(nombre='Matemáticas 101', codigo='MAT101')
+        cls.admin_curso = Usuario.objects.create_user('profesor', 'profesor@ejemplo.com', 'clave-segura-123', is_staff=True)
+        cls.admin_curso.cursos_asignados.add(cls.curso)
+
+    def importar(self, csv_texto, **datos):
+        self.client.force_login(self.admin_curso)
+        archivo = SimpleUploadedFile('estudiantes.csv', csv_texto.encode('utf-8'), content_type='text/csv')
+        respuesta = self.client.post(reverse('importar_estudiantes_csv'), {'archivo': archivo, **datos})
+        return respuesta.context['resultado']
+
+    def test_admin_de_curso_no_importa_estudiantes_sin_curso(self):
+        resultado = self.importar('cedula,nombres,apellidos,telefono\nV1,Ana,Pérez,0414-0000000\n')
+        self.assertEqual(resultado.creados, 0)
+        self.assertIn('Falta el curso', resultado.errores[0][1])
+
+        resultado = self.importar('cedula,nombres,apellidos,telefono\nV1,Ana,Pérez,0414-0000000\n', curso=self.curso.pk)
+        self.assertEqual(resultado.creados, 1)
+        self.assertEqual(PerfilEstudiante.objects.get().curso, self.curso)
+
+    def test_valida_correo_y_usuario(self):
+        resultado = self.importar(
+            'cedula,nombres,apellidos,telefono,email,username,curso\n'
+            'V1,Ana,Pérez,0414-0000000,not-an-email,,MAT101\n'
+            'V2,Luis,Gómez,0414-0000000,luis@ejemplo.com,bad user name,MAT101\n'
+            'V3,Eva,Díaz,0414-0000000,eva@ejemplo.com,eva.diaz,MAT101\n'
+        )
+        self.assertEqual(resultado.creados, 1)
+        self.assertEqual([numero_fila for numero_fila, _ in resultado.errores], [2, 3])
+        self.assertEqual(Usuario.objects.filter(perfil_estudiante__isnull=False).get().username, 'eva.diaz')
+
+    def test_ignora_contrasenas_del_csv(self):
+        resultado = self.importar(
+            'cedula,nombres,apellidos,telefono,password\nV1,Ana,Pérez,0414-0000000,clave-secreta-1\n', curso=self.curso.pk
+        )
+        self.assertEqual((resultado.creados, resultado.contrasenas_ignoradas), (1, 1))
+        self.assertFalse(PerfilEstudiante.objects.get().usuario.has_usable_password())
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class ActivacionCuentasTests(TestCase):
+    def test_hashear_contrasenas_en_paralelo(self):
+        contrasenas = [f'clave-{numero}' for numero in range(MINIMO_CONTRASENAS_EN_PARALELO)] + ['', None]
+        hashes = hashear_contrasenas(contrasenas, procesos=2)
+        self.assertEqual(len(hashes), len(contrasenas))
+        for contrasena, hash_contrasena in zip(contrasenas[:-2], hashes):
+            self.assertTrue(check_password(contrasena, hash_contrasena))
+        for hash_contrasena in hashes[-2:]:
+            self.assertFalse(check_password('', hash_contrasena))
+            self.assertTrue(hash_contrasena.startswith(UNUSABLE_PASSWORD_PREFIX))
+
+    def crear_usuario(self):
+        usuario = Usuario.objects.create_user('estudiante', 'estudiante@ejemplo.com')
+        self.assertFalse(usuario.has_usable_password())
+        return usuario
+
+    def test_activar_con_enlace_valido_una_sola_vez(self):
+        usuario = self.crear_usuario()
+        ruta = ruta_activacion(usuario)
+        self.assertTrue(self.client.get(ruta).context['enlace_valido'])
+
+        datos = {'new_password1': 'Clave-Nueva-2026', 'new_password2': 'Clave-Nueva-2026'}
+        self.assertRedirects(self.client.post(ruta, datos), reverse('login'), fetch_redirect_response=False)
+        usuario.refresh_from_db()
+        self.assertTrue(usuario.check_password('Clave-Nueva-2026'))
+
+        # El token depende de la contraseña: usado una vez, deja de ser válido
+        respuesta = self.client.post(ruta, {'new_password1': 'Otra-Clave-2026', 'new_password2': 'Otra-Clave-2026'})
+        self.assertFalse(respuesta.context['enlace_valido'])
+        usuario.refresh_from_db()
+        self.assertTrue(usuario.check_password('Clave-Nueva-2026'))
+
+    def test_enlace_vencido(self):
+        ruta = ruta_activacion(self.crear_usuario())
+        vencido = timezone.datetime.now() + timedelta(seconds=settings.PASSWORD_RESET_TIMEOUT + 60)
+        with mock.patch.object(type(default_token_generator), '_now', return_value=vencido):
+            self.assertFalse(self.client.get(ruta).context['enlace_valido'])
+
+
+class ApiAsistenciaTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.superusuario = Usuario.objects.create_superuser('admin', 'admin@ejemplo.com', 'clave-segura-123')
+        cls.curso = Curso.objects.create(nombre='Matemáticas 101', codigo='MAT101')
+        cls.otro_curso = Curso.objects.create(nombre='Historia Universal', codigo='HIS303')
+        cls.admin_curso = Usuario.objects.create_user('profesor', 'profesor@ejemplo.com', is_staff=True)
+        cls.admin_curso.cursos_asignados.add(cls.curso)
+        cls.estudiantes = [crear_estudiante(cls.curso, numero) for numero in range(3)]
+        cls.otros_estudiantes = [crear_estudiante(cls.otro_curso, numero) for numero in range(3, 8)]
+
+    def enviar(self, usuario, cambios):
+        self.client.force_login(usuario)
+        respuesta = self.client.post(reverse('api_asistencia'), json.dumps({
+            'horas_academicas': 2,
+            'cambios': [{'estudiante': perfil.pk, 'presente': presente} for perfil, presente in cambios],
+        }), content_type='application/json')
+        self.assertEqual(respuesta.status_code, 200)
+        return respuesta.json()
+
+    def test_estudiantes_fuera_del_alcance_se_omiten(self):
+        datos = self.enviar(self.admin_curso, [(self.estudiantes[0], True), (self.otros_estudiantes[0], True)])
+        self.assertEqual(datos['omitidos'], 1)
+        self.assertFalse(Asistencia.objects.filter(estudiante__curso=self.otro_curso).exists())
+
+    def test_primer_cambio_del_curso_registra_la_lista_completa(self):
+        # Con la asistencia de un curso ya tomada, el primer cambio de otro curso registra a todo ese curso
+        guardar_asistencia_masiva(PerfilEstudiante.objects.filter(curso=self.curso), [], 2)
+        datos = self.enviar(self.superusuario, [(self.otros_estudiantes[0], True)])
+
+        self.assertEqual(datos, {'guardados': 5, 'omitidos': 0})
+        registros = dict(Asistencia.objects.filter(estudiante__curso=self.otro_curso).values_list('estudiante_id', 'esta_presente'))
+        self.assertEqual(registros, {perfil.pk: perfil == self.otros_estudiantes[0] for perfil in self.otros_estudiantes})
+        self.assertEqual(ResumenAsistenciaDiaria.objects.get(curso=self.otro_curso).ausentes, 4)
+
+        # Una vez tomada, los cambios siguientes solo escriben a los estudiantes que cambiaron
+        datos = self.enviar(self.superusuario, [(self.otros_estudiantes[1], True)])
+        self.assertEqual(datos, {'guardados': 1, 'omitidos': 0})
+
+
+class GetCondicionalTests(TestCase):
+    """
+    Las páginas de admin con ETag responden 304 mientras no cambien los datos de sus cursos.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.superusuario = Usuario.objects.create_superuser('admin', 'admin@ejemplo.com', 'clave-segura-123')
+        cls.curso = Curso.objects.create(nombre='Matemáticas 101', codigo='MAT101')
+        cls.estudiante = crear_estudiante(cls.curso, 1)
+
+    def setUp(self):
+        self.client.force_login(self.superusuario)
+        # Primera visita: crea la cookie CSRF, que forma parte del ETag
+        self.client.get(reverse('reporte_inasistencias'))
+
+    def obtener(self, etag=None):
+        cabeceras = {'If-None-Match': etag} if etag else {}
+        return self.client.get(reverse('reporte_inasistencias'), headers=cabeceras)
+
+    def assertCambiaTras(self, escribir):
+        etag = self.obtener()['ETag']
+        self.assertEqual(self.obtener(etag).status_code, 304)
+        escribir()
+        respuesta = self.obtener(etag)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertNotEqual(respuesta['ETag'], etag)
+
+    def test_sin_cambios_responde_304(self):
+        etag = self.obtener()['ETag']
+        with CaptureQueriesContext(connection) as consultas:
+            respuesta = self.obtener(etag)
+        self.assertEqual(respuesta.status_code, 304)
+        self.assertLessEqual(len(consultas), 3)
+        self.assertIn('private', respuesta['Cache-Control'])
+
+    def test_cambia_tras_guardar_asistencia(self):
+        self.assertCambiaTras(lambda: guardar_asistencia_masiva(PerfilEstudiante.objects.all(), [self.estudiante.pk], 2))
+
+    def test_cambia_tras_editar_estudiante(self):
+        def editar():
+            self.estudiante.telefono = '0424-1111111'
+            self.estudiante.save()
+        self.assertCambiaTras(editar)
+
+    def test_cambia_tras_solicitar_permiso(self):
+        self.assertCambiaTras(lambda: SolicitudPermiso.objects.create(
+            estudiante=self.estudiante, fecha_inicio='2026-01-05', fecha_fin='2026-01-06', motivo='Cita médica'
+        ))
+
+
+class GenerarDatosPruebaTests(TestCase):
+    VOLUMEN = {'cursos': 2, 'estudiantes': 6, 'permisos': 2, 'feedback': 1, 'semilla': 7}
+
+    def generar(self, **opciones):
+        call_command('generar_datos_prueba', stdout=StringIO(), **self.VOLUMEN, **opciones)
+
+    def contar(self):
+        return {modelo.__name__: modelo.objects.count() for modelo in (
+            Usuario, Curso, PerfilEstudiante, Asistencia, SolicitudPermiso, Feedback, ResumenAsistenciaDiaria,
+        )}
+
+    def test_limpiar_reemplaza_los_datos_generados(self):
+        real = crear_estudiante(Curso.objects.create(nombre='Matemáticas 101', codigo='MAT101'), 1)
+        guardar_asistencia_masiva(PerfilEstudiante.objects.filter(pk=real.pk), [real.pk], 2)
+        self.generar(dias=10)
+        antes = self.contar()
+        self.generar(dias=10, limpiar=True)
+        self.assertEqual(self.contar(), antes)
+        self.assertTrue(PerfilEstudiante.objects.filter(pk=real.pk, asistencias__isnull=False).exists())
+        self.assertEqual(conciliar_horas_asistidas(), [])
+
+    def test_limpiar_no_recorre_las_filas(self):
+        def consultas_al_limpiar(dias):
+            self.generar(dias=dias, limpiar=True)
+            with CaptureQueriesContext(connection) as consultas:
+                GenerarDatosPrueba(stdout=StringIO()).limpiar()
+            self.assertFalse(Asistencia.objects.exists())
+            return len(consultas)
+
+        self.assertEqual(consultas_al_limpiar(5), consultas_al_limpiar(40))
+
+
+class MetricasTests(TestCase):
+    def test_sin_token_configurado_se_deniega(self):
+        with override_settings(METRICAS_TOKEN=''):
+            self.assertEqual(self.client.get(reverse('metricas') + '?token=').status_code, 403)
+            self.assertEqual(self.client.get(reverse('metricas')).status_code, 403)
+
+    @override_settings(METRICAS_TOKEN='token-de-prueba')
+    def test_con_token(self):
+        self.assertEqual(self.client.get(reverse('metricas') + '?token=otro').status_code, 403)
+        respuesta = self.client.get(reverse('metricas'), headers={'Authorization': 'Bearer token-de-prueba'})
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertIn(b'# TYPE gestion_peticion_segundos histogram', respuesta.content)
+
+    def test_volcado_solo_inserta(self):
+        directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directorio, ignore_errors=True)
+        with override_settings(METRICAS_ARCHIVO=os.path.join(directorio, 'metricas.sqlite3')):
+            registro = RegistroMetricas()
+            self.addCleanup(registro._descartar_conexion)
+            registro.sumar('prueba', '[]', {'count': 1})
+            registro.volcar()
+            # A partir del primer volcado se reutiliza la conexión y el esquema ya existe
+            sentencias = []
+            registro.conexion.set_trace_callback(sentencias.append)
+            registro.sumar('prueba', '[]', {'count': 2})
+            registro.volcar()
+            self.assertEqual(
+                [sentencia.split()[0] for sentencia in sentencias if sentencia not in ('BEGIN ', 'COMMIT')],
+                ['INSERT'],
+            )
+            self.assertEqual(registro.leer()['prueba']['[]']['count'], 3)
+
+
+
+class InstrumentacionTests(TestCase):
+    def setUp(self):
+        limpiar_peticiones_lentas()
+        self.addCleanup(limpiar_peticiones_lentas)
+
+    def test_instalacion_idempotente(self):
+        InstrumentacionMiddleware(lambda request: HttpResponse())
+        render = Template.render
+        instalar_medicion_plantillas()
+        InstrumentacionMiddleware(lambda request: HttpResponse())
+        self.assertIs(Template.render, render)
+        # Un solo envoltorio sobre el render de Django
+        self.assertFalse(hasattr(render._render_original, '_render_original'))
+
+    def test_registra_tiempo_de_plantillas(self):
+        def lento():
+            time.sleep(0.02)
+            return 'listo'
+
+        def vista(request):
+            return HttpResponse(Template('{{ lento }}{% if lento %}{{ lento }}{% endif %}').render(Context({'lento': lento})))
+
+        respuesta = InstrumentacionMiddleware(vista)(RequestFactory().get('/prueba/'))
+        self.assertEqual(respuesta.content, b'listolisto')
+        self.assertIn('tpl;dur=', respuesta['Server-Timing'])
+        [peticion] = obtener_peticiones_lentas()
+        self.assertGreaterEqual(peticion['plantillas_ms'], 60)
+        self.assertLessEqual(peticion['plantillas_ms'], peticion['total_ms'])
+        # Fuera de una petición medida el render no acumula nada
+        self.assertEqual(Template('{{ 1 }}').render(Context()), '1')
+
+    def test_peticiones_lentas_acotadas(self):
+        with mock.patch('gestion.middleware.MAX_PETICIONES_LENTAS', 3):
+            for segundos in [0.5, 0.1, 0.9, 0.3, 0.7, 0.2, 0.8]:
+                _registrar_lenta(segundos, {'total_ms': segundos * 1000})
+        self.assertEqual([p['total_ms'] for p in obtener_peticiones_lentas()], [900, 800, 700])
+
+@tag('benchmark')
+class BenchmarkVistasTests(TestCase):
+    """
+    Mide consultas, tiempo y memoria pico de cada URL de `gestion/urls.py` sobre un volumen
+    de datos generado con `generar_datos_prueba`, y falla si alguna vista supera la línea base
+    guardada en `linea_base_benchmarks.json`.
+
+    Las consultas deben ser iguales o menores a la línea base y se comprueban en la suite por
+    defecto (protegen contra regresiones N+1). El tiempo y la memoria admiten un margen
+    (FACTOR_TIEMPO y FACTOR_MEMORIA) por la variación entre máquinas y, como son mediciones
+    reales, solo se toman si se piden:
+
+        BENCHMARK=1 python manage.py test gestion --tag benchmark
+
+    y para regrabar la línea base tras un cambio intencional, con BENCHMARK_ACTUALIZAR=1.
+    El logo de los PDF se lee de un archivo local para no depender de la red.
+    """
+    ARCHIVO_LINEA_BASE = Path(__file__).with_name('linea_base_benchmarks.json')
+
+    # Tiempo y memoria solo con BENCHMARK=1 (o al regrabar la línea base)
+    MEDIR_RENDIMIENTO = bool(os.environ.get('BENCHMARK') or os.environ.get('BENCHMARK_ACTUALIZAR'))
+
+    # Volumen de datos: cursos, estudiantes y días de historial
+    VOLUMEN = {'cursos': 8, 'estudiantes': 200, 'dias': 30, 'permisos': 2, 'feedback': 1, 'semilla': 2026}
+
+    # Margen sobre la línea base por la variación entre máquinas
+    FACTOR_TIEMPO = float(os.environ.get('BENCHMARK_FACTOR_TIEMPO', 2))
+    MARGEN_TIEMPO = 0.05
+    REPETICIONES = 3
+    FACTOR_MEMORIA = 1.5
+    MARGEN_MEMORIA_KB = 256
+
+    CONTRASENA = 'clave-segura-123'
+
+    @classmethod
+    def setUpClass(cls):
+        # Los PDF (caché y trabajos) se escriben en un MEDIA_ROOT temporal
+        cls.media_root = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, cls.media_root, ignore_errors=True)
+        ajustes = override_settings(MEDIA_ROOT=cls.media_root, METRICAS_TOKEN='token-benchmark')
+        ajustes.enable()
+        cls.addClassCleanup(ajustes.disable)
+        # xhtml2pdf descargaría el logo de http://testserver/ (con reintentos y resolución DNS)
+        logo = Path(cls.media_root) / 'logo.png'
+        logo.write_bytes(PNG_1X1)
+        parche_logo = mock.patch('gestion.views.ruta_logo_reportes', return_value=str(logo))
+        parche_logo.start()
+        cls.addClassCleanup(parche_logo.stop)
+        super().setUpClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.superusuario = Usuario.objects.create_superuser('admin', 'admin@ejemplo.com', cls.CONTRASENA)
+        call_command('generar_datos_prueba', stdout=StringIO(), **cls.VOLUMEN)
+        # Asistencia de hoy ya tomada, para que guardar_asistencia mida lo mismo cualquier día de la semana
+        estudiantes = PerfilEstudiante.objects.all()
+        guardar_asistencia_masiva(estudiantes, {str(pk) for pk in estudiantes.values_list('pk', flat=True)[1::2]}, 2)
+
+        cls.curso = Curso.objects.filter(codigo__startswith=PREFIJO).order_by('codigo').first()
+        cls.estudiante = PerfilEstudiante.objects.filter(curso=cls.curso).select_related('usuario').order_by('pk').first()
+        cls.trabajo = TrabajoReporte.objects.create(
+            curso=cls.curso,
+            solicitado_por=cls.superusuario,
+            facilitador_nombre='admin',
+            estado=TrabajoReporte.Estado.COMPLETADO,
+        )
+        cls.trabajo.archivo.save('reporte.pdf', ContentFile(b'%PDF-1.4 benchmark'))
+
+    def setUp(self):
+        cache.clear()
+
+    def escenarios(self):
+        """
+        Petición representativa de cada URL: (nombre de la URL, método, ruta, datos, usuario).
+        Las vistas de admin se miden con el superusuario, que ve todos los cursos.
+        """
+        pendientes = list(
+            SolicitudPermiso.objects.filter(estado=SolicitudPermiso.Estado.PENDIENTE).order_by('pk').values_list('pk', flat=True)[:52]
+        )
+        estudiantes = list(PerfilEstudiante.objects.order_by('pk').values_list('pk', flat=True))
+        usuario = self.estudiante.usuario
+        csv_importacion = 'cedula,nombres,apellidos,telefono\n' + ''.join(
+            f'BEN-{numero:05d},Nombre{numero},Apellido{numero},0414-0000000\n' for numero in range(100)
+        )
+        admin = self.superusuario
+        curso = self.curso.pk
+        return [
+            ('home', 'get', reverse('home'), None, None),
+            ('registro', 'get', reverse('registro'), None, None),
+            ('login', 'post', reverse('login'), {'username': 'admin', 'password': self.CONTRASENA}, None),
+            ('logout', 'post', reverse('logout'), None, admin),
+            ('activar_cuenta', 'get', reverse('activar_cuenta', kwargs={
+                'uidb64': urlsafe_base64_encode(force_bytes(usuario.pk)),
+                'token': default_token_generator.make_token(usuario),
+            }), None, None),
+            ('solicitar_permiso', 'get', reverse('solicitar_permiso'), None, usuario),
+            ('historial_permisos', 'get', reverse('historial_permisos'), None, usuario),
+            ('enviar_feedback', 'get', reverse('enviar_feedback'), None, usuario),
+            ('dashboard_admin', 'get', reverse('dashboard_admin'), None, admin),
+            ('lista_estudiantes', 'get', reverse('lista_estudiantes'), None, admin),
+            ('crear_estudiante', 'get', reverse('crear_estudiante'), None, admin),
+            ('importar_estudiantes_csv', 'post', reverse('importar_estudiantes_csv'), {
+                'archivo': SimpleUploadedFile('estudiantes.csv', csv_importacion.encode('utf-8'), content_type='text/csv'),
+                'curso': curso,
+            }, admin),
+            ('exportar_enlaces_activacion', 'get', reverse('exportar_enlaces_activacion'), None, admin),
+            ('editar_estudiante', 'get', reverse('editar_estudiante', args=[self.estudiante.pk]), None, admin),
+            ('eliminar_estudiante', 'get', reverse('eliminar_estudiante', args=[self.estudiante.pk]), None, admin),
+            ('tomar_asistencia', 'get', reverse('tomar_asistencia'), None, admin),
+            ('guardar_asistencia', 'post', reverse('guardar_asistencia'), {
+                'presentes': estudiantes[::2],
+                'horas_academicas': 3,
+            }, admin),
+            ('api_asistencia', 'post', reverse('api_asistencia'), json.dumps({
+                'horas_academicas': 3,
+                'cambios': [{'estudiante': pk, 'presente': True} for pk in estudiantes[1:40:2]],
+            }), admin),
+            ('reporte_inasistencias', 'get', reverse('reporte_inasistencias'), None, admin),
+            ('matriz_asistencia', 'get', reverse('matriz_asistencia') + f'?curso={curso}', None, admin),
+            ('vista_reportes_cursos', 'get', reverse('vista_reportes_cursos'), None, admin),
+            ('generar_reporte_asistencia_pdf', 'get', reverse('generar_reporte_asistencia_pdf', args=[curso]), None, admin),
+            ('solicitar_reporte_asistencia_pdf', 'post', reverse('solicitar_reporte_asistencia_pdf', args=[curso]), None, admin),
+            ('exportar_asistencia_csv', 'get', reverse('exportar_asistencia_csv'), None, admin),
+            ('estado_reporte', 'get', reverse('estado_reporte', args=[self.trabajo.pk]), None, admin),
+            ('descargar_reporte', 'get', reverse('descargar_reporte', args=[self.trabajo.pk]), None, admin),
+            ('gestionar_permisos', 'get', reverse('gestionar_permisos'), None, admin),
+            ('aprobar_permiso', 'post', reverse('aprobar_permiso', args=[pendientes[0]]), None, admin),
+            ('rechazar_permiso', 'post', reverse('rechazar_permiso', args=[pendientes[1]]), None, admin),
+            ('procesar_permisos_lote', 'post', reverse('procesar_permisos_lote'), {
+                'accion': 'aprobar',
+                'solicitudes': pendientes[2:],
+            }, admin),
+            ('lista_feedback', 'get', reverse('lista_feedback'), None, admin),
+            ('peticiones_lentas', 'get', reverse('peticiones_lentas'), None, admin),
+            ('metricas', 'get', reverse('metricas') + f'?token={settings.METRICAS_TOKEN}', None, None),
+            ('keep_alive', 'get', reverse('keep_alive') + '?token=' + os.environ.get('CRON_TOKEN', 'AsistenciaEscolar2026_Secure_Key'), None, None),
+        ]
+
+    def ejecutar(self, metodo, ruta, datos):
+        """
+        Envía la petición (en JSON si los datos son un texto) consumiendo el contenido en streaming (CSV, descargas) y devuelve la respuesta.
+        """
+        if isinstance(datos, str):
+            respuesta = getattr(self.client, metodo)(ruta, datos, content_type='application/json')
+        else:
+            for valor in (datos or {}).values():
+                if hasattr(valor, 'seek'):
+                    valor.seek(0)
+            respuesta = getattr(self.client, metodo)(ruta, datos)
+        if respuesta.streaming:
+            for _ in respuesta.streaming_content:
+                pass
+        respuesta.close()
+        return respuesta
+
+    def ejecutar_y_revertir(self, metodo, ruta, datos):
+        """
+        Ejecuta la petición dentro de una transacción que se revierte, restaurando las cookies
+        del cliente, para poder repetirla sin efectos en la base de datos ni en la sesión.
+        """
+        cookies = copy.deepcopy(self.client.cookies)
+        with transaction.atomic():
+            self.ejecutar(metodo, ruta, datos)
+            transaction.set_rollback(True)
+        self.client.cookies = cookies
+
+    def reiniciar_caches(self):
+        # Sin caché de vistas ni de PDF: se mide siempre el camino en frío
+        cache.clear()
+        invalidar_cache_reportes(Curso.objects.values_list('pk', flat=True))
+        gc.collect()
+
+    def medir(self, metodo, ruta, datos):
+        """
+        Devuelve (respuesta, consultas, segundos, memoria pico en KB) de una petición.
+        tracemalloc multiplica el tiempo del código que asigna mucho (xhtml2pdf), así que la memoria
+        se mide en una ejecución aparte. El tiempo es el mejor de REPETICIONES ejecuciones,
+        todas revertidas salvo la última, que es la que cuenta las consultas.
+        Sin MEDIR_RENDIMIENTO solo se hace la última ejecución y el tiempo y la memoria son None.
+        """
+        if not self.MEDIR_RENDIMIENTO:
+            self.reiniciar_caches()
+            with CaptureQueriesContext(connection) as consultas:
+                respuesta = self.ejecutar(metodo, ruta, datos)
+            return respuesta, len(consultas), None, None
+
+        self.reiniciar_caches()
+        tracemalloc.start()
+        self.ejecutar_y_revertir(metodo, ruta, datos)
+        _, pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        tiempos = []
+        for _ in range(self.REPETICIONES - 1):
+            self.reiniciar_caches()
+            inicio = time.perf_counter()
+            self.ejecutar_y_revertir(metodo, ruta, datos)
+            tiempos.append(time.perf_counter() - inicio)
+
+        self.reiniciar_caches()
+        inicio = time.perf_counter()
+        with CaptureQueriesContext(connection) as consultas:
+            respuesta = self.ejecutar(metodo, ruta, datos)
+        tiempos.append(time.perf_counter() - inicio)
+        return respuesta, len(consultas), min(tiempos), pico // 1024
+
+    def test_escenarios_cubren_todas_las_urls(self):
+        nombres = {patron.name for patron in gestion_urls.urlpatterns if patron.name}
+        self.assertEqual(nombres, {escenario[0] for escenario in self.escenarios()})
+
+    def test_vistas_dentro_de_la_linea_base(self):
+        linea_base = {}
+        if self.ARCHIVO_LINEA_BASE.exists():
+            linea_base = json.loads(self.ARCHIVO_LINEA_BASE.read_text(encoding='utf-8'))
+        actualizar = bool(os.environ.get('BENCHMARK_ACTUALIZAR'))
+
+        mediciones = {}
+        usuario_actual = None
+        for nombre, metodo, ruta, datos, usuario in self.escenarios():
+            if usuario != usuario_actual:
+                self.client.logout()
+                if usuario is not None:
+                    self.client.force_login(usuario)
+                    # Primera visita: memoriza el alcance de cursos en la sesión, costo que no se repite
+                    self.client.get(reverse('home'))
+                usuario_actual = usuario
+
+            respuesta, consultas, segundos, memoria_kb = self.medir(metodo, ruta, datos)
+            # La medición solo vale si la vista respondió con éxito (o redirigió tras un POST)
+            self.assertLess(respuesta.status_code, 400, f'{nombre} respondió {respuesta.status_code}.')
+            mediciones[nombre] = {'consultas': consultas, 'segundos': segundos and round(segundos, 4), 'memoria_kb': memoria_kb}
+            if nombre == 'logout':
+                usuario_actual = None
+
+        if actualizar:
+            self.ARCHIVO_LINEA_BASE.write_text(
+                json.dumps(mediciones, indent=2, sort_keys=True, ensure_ascii=False) + '\n', encoding='utf-8'
+            )
+            return
+
+        for nombre, medicion in mediciones.items():
+            with self.subTest(vista=nombre):
+                base = linea_base.get(nombre)
+                self.assertIsNotNone(base, f'{nombre} no tiene línea base; regrábela con BENCHMARK_ACTUALIZAR=1.')
+                self.assertLessEqual(medicion['consultas'], base['consultas'], f'{nombre} hace más consultas que la línea base.')
+                if not self.MEDIR_RENDIMIENTO:
+                    continue
+                self.assertLessEqual(
+                    medicion['segundos'], base['segundos'] * self.FACTOR_TIEMPO + self.MARGEN_TIEMPO,
+                    f'{nombre} tardó {medicion["segundos"]} s (línea base {base["segundos"]} s).'
+                )
+                self.assertLessEqual(
+                    medicion['memoria_kb'], base['memoria_kb'] * self.FACTOR_MEMORIA + self.MARGEN_MEMORIA_KB,
+                    f'{nombre} usó {medicion["memoria_kb"]} KB (línea base {base["memoria_kb"]} KB).'
+                )
@@ -6,8 +6,9 @@ urlpatterns = [
     # URLs Generales
     path('', views.home, name='home'),
     path('registro/', views.registro, name='registro'),
-    path('login/', auth_views.LoginView.as_view(template_name='registration/login.html'), name='login'),
+    path('login/', views.LoginView.as_view(), name='login'),
     path('logout/', auth_views.LogoutView.as_view(next_page='home'), name='logout'),
+    path('cuenta/activar/<uidb64>/<token>/', views.activar_cuenta, name='activar_cuenta'),
 
     # URLs para Estudiantes
     path('permiso/solicitar/', views.solicitar_permiso, name='solicitar_permiso'),
@@ -18,19 +19,30 @@ urlpatterns = [
     path('admin/dashboard/', views.dashboard_admin, name='dashboard_admin'),
     path('admin/estudiantes/', views.lista_estudiantes, name='lista_estudiantes'),
     path('admin/estudiantes/nuevo/', views.crear_estudiante, name='crear_estudiante'),
+    path('admin/estudiantes/importar/', views.importar_estudiantes_csv, name='importar_estudiantes_csv'),
+    path('admin/estudiantes/enlaces-activacion/', views.exportar_enlaces_activacion, name='exportar_enlaces_activacion'),
     path('admin/estudiantes/editar/<int:pk>/', views.editar_estudiante, name='editar_estudiante'),
     path('admin/estudiantes/eliminar/<int:pk>/', views.eliminar_estudiante, name='eliminar_estudiante'),
     
     path('admin/asistencia/', views.tomar_asistencia, name='tomar_asistencia'),
     path('admin/asistencia/guardar/', views.guardar_asistencia, name='guardar_asistencia'),
+    path('admin/asistencia/api/', views.api_asistencia, name='api_asistencia'),
     path('admin/reporte/inasistencias/', views.reporte_inasistencias, name='reporte_inasistencias'),
+    path('admin/reporte/matriz/', views.matriz_asistencia, name='matriz_asistencia'),
     path('admin/reportes/cursos/', views.vista_reportes_cursos, name='vista_reportes_cursos'),
     path('admin/reporte/asistencia/<int:curso_id>/pdf/', views.generar_reporte_asistencia_pdf, name='generar_reporte_asistencia_pdf'),
+    path('admin/reporte/asistencia/<int:curso_id>/pdf/solicitar/', views.solicitar_reporte_asistencia_pdf, name='solicitar_reporte_asistencia_pdf'),
+    path('admin/reporte/asistencia/exportar/', views.exportar_asistencia_csv, name='exportar_asistencia_csv'),
+    path('admin/reportes/trabajos/<int:pk>/estado/', views.estado_reporte, name='estado_reporte'),
+    path('admin/reportes/trabajos/<int:pk>/descargar/', views.descargar_reporte, name='descargar_reporte'),
 
     path('admin/permisos/', views.gestionar_permisos, name='gestionar_permisos'),
     path('admin/permisos/aprobar/<int:pk>/', views.aprobar_permiso, name='aprobar_permiso'),
     path('admin/permisos/rechazar/<int:pk>/', views.rechazar_permiso, name='rechazar_permiso'),
+    path('admin/permisos/lote/', views.procesar_permisos_lote, name='procesar_permisos_lote'),
     path('admin/feedback/', views.lista_feedback, name='lista_feedback'),
+    path('admin/rendimiento/', views.peticiones_lentas, name='peticiones_lentas'),
     
     path('sistema/keep-alive/', views.despertar_db, name='keep_alive'),
+    path('sistema/metricas/', views.metricas, name='metricas'),
 ]
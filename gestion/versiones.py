@@ -0,0 +1,78 @@
+import hashlib
+from functools import wraps
+from django.contrib import messages
+from django.db.models import F
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+from .models import Curso, PerfilEstudiante
+from .alcance import obtener_alcance
+
+
+# --- Versiones de datos por curso ---
+
+def marcar_cursos_modificados(curso_ids=None):
+    """
+    Incrementa en una sola consulta la versión de datos de los cursos indicados, lo que cambia
+    el ETag de las páginas que los muestran. Sin `curso_ids`, o si incluye None (estudiantes
+    sin curso), se incrementan todos los cursos.
+    """
+    cursos = Curso.objects.all()
+    if curso_ids is not None:
+        curso_ids = set(curso_ids)
+        if not curso_ids:
+            return
+        if None not in curso_ids:
+            cursos = cursos.filter(pk__in=curso_ids)
+    cursos.update(version_datos=F('version_datos') + 1)
+
+def marcar_estudiantes_modificados(estudiante_ids):
+    """
+    Incrementa la versión de datos de los cursos de los estudiantes indicados.
+    """
+    marcar_cursos_modificados(
+        PerfilEstudiante.objects.filter(pk__in=estudiante_ids).values_list('curso_id', flat=True).distinct()
+    )
+
+
+# --- GET condicional ---
+
+def etag_por_alcance(request, *args, **kwargs):
+    """
+    ETag de una página de admin: vista y parámetros, usuario y su alcance, sesión y token CSRF
+    (la página los incluye), fecha del día y versión de datos de cada curso del alcance.
+    Reutiliza la lista de cursos del alcance, que la vista consulta de todos modos.
+    Sin ETag si hay mensajes pendientes, que solo deben mostrarse una vez.
+    """
+    if len(messages.get_messages(request)):
+        return None
+
+    alcance = obtener_alcance(request)
+    usuario = request.user
+    partes = [
+        request.resolver_match.view_name,
+        request.get_full_path(),
+        usuario.pk,
+        usuario.username,
+        usuario.version_alcance,
+        request.session.session_key,
+        request.META.get('CSRF_COOKIE', ''),
+        timezone.localdate().isoformat(),
+    ]
+    partes.extend(f'{curso.pk}:{curso.version_datos}' for curso in alcance.cursos)
+    return hashlib.sha256('|'.join(map(str, partes)).encode('utf-8')).hexdigest()[:32]
+
+def condicional_por_alcance(vista):
+    """
+    Responde 304 Not Modified sin ejecutar la vista ni renderizar la plantilla cuando el ETag
+    del navegador coincide con etag_por_alcance. La respuesta se marca como privada y a revalidar
+    en cada visita, para que el navegador no muestre una copia sin preguntar.
+    """
+    vista_condicional = condition(etag_func=etag_por_alcance)(vista)
+
+    @wraps(vista)
+    def envoltura(request, *args, **kwargs):
+        response = vista_condicional(request, *args, **kwargs)
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+    return envoltura
@@ -1,17 +1,37 @@
+import csv
+import io
+import itertools
+import json
 import os
+import time
+from datetime import timedelta
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
-from django.http import HttpResponse, HttpResponseForbidden
+from django.http import HttpResponse, HttpResponseForbidden, HttpResponseBadRequest, JsonResponse, FileResponse, StreamingHttpResponse
 from django.utils import timezone
 from django.urls import reverse
+from django.contrib.auth.hashers import UNUSABLE_PASSWORD_PREFIX
+from django.contrib.auth.tokens import default_token_generator
+from django.utils.http import urlsafe_base64_decode
+from django.utils.crypto import constant_time_compare
 from django.db.models import Sum
-from django.template.loader import get_template
-from .models import PerfilEstudiante, Asistencia, SolicitudPermiso, Feedback, Curso
-from .forms import RegistroUsuarioForm, PerfilEstudianteForm, SolicitudPermisoForm, FeedbackForm, EdicionUsuarioForm
-from datetime import date
-from xhtml2pdf import pisa
+from django.db.models.functions import Coalesce
+from .models import PerfilEstudiante, Asistencia, SolicitudPermiso, Feedback, Curso, TrabajoReporte, ResumenAsistenciaDiaria
+from .forms import RegistroUsuarioForm, PerfilEstudianteForm, SolicitudPermisoForm, FeedbackForm, EdicionUsuarioForm, ImportarEstudiantesForm, ActivacionCuentaForm
+from .services import guardar_asistencia_masiva, guardar_cambios_asistencia, obtener_estadisticas_dashboard, cambiar_estado_permisos
+from .paginacion import paginar_por_cursor
+from .alcance import obtener_alcance
+from .permisos import obtener_indice_permisos
+from .versiones import condicional_por_alcance
+from .importacion import importar_estudiantes
+from .cuentas import ruta_activacion
+from .metricas import registro as registro_metricas, LOGIN_SEGUNDOS, REPORTE_FILAS
+from .middleware import peticiones_lentas as obtener_peticiones_lentas, limpiar_peticiones_lentas
+from .reportes import nombre_archivo_reporte, trabajos_reporte_en_curso, filas_exportacion_asistencia, obtener_matriz_asistencia, MAX_DIAS_MATRIZ
 from django.contrib.auth import get_user_model
+from django.contrib.auth import views as auth_views
+from django.conf import settings
 
 # Vista de inicio
 def home(request):
@@ -57,8 +77,46 @@ def registro(request):
         'perfil_form': perfil_form
     })
 
+class LoginView(auth_views.LoginView):
+    """
+    Inicio de sesión de Django que registra la latencia de cada intento en las métricas.
+    """
+    template_name = 'registration/login.html'
+
+    def post(self, request, *args, **kwargs):
+        inicio = time.perf_counter()
+        response = super().post(request, *args, **kwargs)
+        resultado = 'exito' if response.status_code == 302 else 'fallo'
+        LOGIN_SEGUNDOS.observar(time.perf_counter() - inicio, resultado=resultado)
+        return response
+
 # --- Vistas del Módulo de Estudiante ---
 
+def activar_cuenta(request, uidb64, token):
+    """
+    Permite a un estudiante aprovisionado sin contraseña definirla con su enlace de activación.
+    El enlace deja de ser válido en cuanto se usa.
+    """
+    User = get_user_model()
+    try:
+        usuario = User.objects.get(pk=urlsafe_base64_decode(uidb64).decode())
+    except (ValueError, TypeError, OverflowError, User.DoesNotExist):
+        usuario = None
+
+    if usuario is None or not default_token_generator.check_token(usuario, token):
+        return render(request, 'registration/activar_cuenta.html', {'enlace_valido': False})
+
+    if request.method == 'POST':
+        form = ActivacionCuentaForm(usuario, request.POST)
+        if form.is_valid():
+            form.save()
+            messages.success(request, '¡Tu cuenta ha sido activada! Ya puedes iniciar sesión.')
+            return redirect('login')
+    else:
+        form = ActivacionCuentaForm(usuario)
+
+    return render(request, 'registration/activar_cuenta.html', {'enlace_valido': True, 'form': form})
+
 @login_required
 def solicitar_permiso(request):
     """
@@ -111,6 +169,11 @@ def es_admin(user):
     """
     return user.is_staff or user.is_superuser
 
+def es_superusuario(user):
+    """
+    Verifica si un usuario es superusuario.
+    """
+    return user.is_superuser
 
 
 # ... (otras vistas)
@@ -122,11 +185,9 @@ def dashboard_admin(request):
     Dashboard principal para el administrador con información más detallada y filtrada por cursos asignados.
     Permite filtrar por un curso específico.
     """
-    # Obtener cursos que el administrador puede gestionar
-    if request.user.is_superuser:
-        cursos_gestionables = Curso.objects.all()
-    else:
-        cursos_gestionables = request.user.cursos_asignados.all()
+    # Obtener cursos que el administrador puede gestionar (alcance memorizado en la sesión)
+    alcance = obtener_alcance(request)
+    cursos_gestionables = alcance.cursos
 
     # Obtener el ID del curso seleccionado del request GET
     curso_id = request.GET.get('curso', None)
@@ -137,9 +198,9 @@ def dashboard_admin(request):
 
     if curso_id:
         try:
-            curso_seleccionado = Curso.objects.get(pk=curso_id)
+            curso_seleccionado = alcance.obtener_curso(curso_id)
             # Verificar si el admin tiene permiso para ver este curso
-            if not request.user.is_superuser and curso_seleccionado not in cursos_gestionables:
+            if not alcance.permite(curso_seleccionado.pk):
                 return HttpResponseForbidden("No tienes permiso para ver este curso.")
             
             # Filtrar querysets por el curso seleccionado
@@ -151,23 +212,24 @@ def dashboard_admin(request):
             curso_id = None # Reiniciar para no intentar filtrar con un ID inválido
     
     # Si no hay curso_id y el admin no es superuser, filtrar por sus cursos asignados (todos combinados)
-    if not request.user.is_superuser and not curso_id:
-        estudiantes_queryset = estudiantes_queryset.filter(curso__in=cursos_gestionables)
-        solicitudes_queryset = solicitudes_queryset.filter(estudiante__curso__in=cursos_gestionables)
+    if not curso_id:
+        estudiantes_queryset = alcance.filtrar(estudiantes_queryset)
+        solicitudes_queryset = alcance.filtrar(solicitudes_queryset, 'estudiante__curso')
 
-    # Resumen numérico
-    total_estudiantes = estudiantes_queryset.count()
-    permisos_pendientes_count = solicitudes_queryset.filter(estado='PENDIENTE').count()
+    # Resumen numérico (una consulta agregada, en caché por administrador y curso)
+    estadisticas = obtener_estadisticas_dashboard(request.user, curso_seleccionado, estudiantes_queryset)
     
     # Listas de actividad reciente
-    ultimos_estudiantes = estudiantes_queryset.order_by('-usuario__date_joined')[:5]
-    ultimos_permisos_pendientes = solicitudes_queryset.filter(estado='PENDIENTE').order_by('-fecha_creacion')[:5]
+    ultimos_estudiantes = estudiantes_queryset.select_related('usuario').order_by('-usuario__date_joined')[:5]
+    ultimos_permisos_pendientes = solicitudes_queryset.filter(estado='PENDIENTE').select_related('estudiante').order_by('-fecha_creacion')[:5]
     
     context = {
         'cursos_disponibles': cursos_gestionables,
         'curso_seleccionado': curso_seleccionado,
-        'total_estudiantes': total_estudiantes,
-        'permisos_pendientes': permisos_pendientes_count,
+        'total_estudiantes': estadisticas['total_estudiantes'],
+        'horas_asistidas': estadisticas['horas_asistidas'],
+        'estudiantes_en_riesgo': estadisticas['estudiantes_en_riesgo'],
+        'permisos_pendientes': estadisticas['permisos_pendientes'],
         'ultimos_estudiantes': ultimos_estudiantes,
         'ultimos_permisos_pendientes': ultimos_permisos_pendientes,
     }
@@ -175,18 +237,16 @@ def dashboard_admin(request):
 
 @login_required
 @user_passes_test(es_admin)
+@condicional_por_alcance
 def lista_estudiantes(request):
     """
     Muestra una lista de todos los estudiantes para CRUD, filtrada por cursos asignados al admin.
-    Permite filtrar por un curso específico.
+    Permite filtrar por un curso específico. La lista se pagina por cursor (apellidos, nombres, pk).
     """
-    # Obtener cursos que el administrador puede gestionar
-    if request.user.is_superuser:
-        cursos_gestionables = Curso.objects.all()
-        estudiantes_queryset = PerfilEstudiante.objects.all()
-    else:
-        cursos_gestionables = request.user.cursos_asignados.all()
-        estudiantes_queryset = PerfilEstudiante.objects.filter(curso__in=cursos_gestionables)
+    # Obtener cursos que el administrador puede gestionar (alcance memorizado en la sesión)
+    alcance = obtener_alcance(request)
+    cursos_gestionables = alcance.cursos
+    estudiantes_queryset = alcance.filtrar(PerfilEstudiante.objects.all())
 
     # Obtener el ID del curso seleccionado del request GET
     curso_id = request.GET.get('curso', None)
@@ -194,9 +254,9 @@ def lista_estudiantes(request):
 
     if curso_id:
         try:
-            curso_seleccionado = Curso.objects.get(pk=curso_id)
+            curso_seleccionado = alcance.obtener_curso(curso_id)
             # Verificar si el admin tiene permiso para ver este curso
-            if not request.user.is_superuser and curso_seleccionado not in cursos_gestionables:
+            if not alcance.permite(curso_seleccionado.pk):
                 return HttpResponseForbidden("No tienes permiso para ver estudiantes de este curso.")
             
             # Filtrar queryset por el curso seleccionado
@@ -205,12 +265,14 @@ def lista_estudiantes(request):
             messages.error(request, "El curso seleccionado no es válido.")
             curso_id = None
     
-    estudiantes = estudiantes_queryset.order_by('apellidos', 'nombres')
+    # Paginación por cursor: cada página es una consulta indexada sin OFFSET
+    pagina = paginar_por_cursor(request, estudiantes_queryset.select_related('curso', 'alerta_ausentismo'), ['apellidos', 'nombres', 'pk'])
 
     context = {
         'cursos_disponibles': cursos_gestionables,
         'curso_seleccionado': curso_seleccionado,
-        'estudiantes': estudiantes,
+        'estudiantes': pagina.objetos,
+        'pagina': pagina,
     }
     return render(request, 'admin/estudiantes_lista.html', context)
 
@@ -242,6 +304,94 @@ def crear_estudiante(request):
         'titulo': 'Añadir Nuevo Estudiante'
     })
 
+@login_required
+@user_passes_test(es_admin)
+def importar_estudiantes_csv(request):
+    """
+    Importa estudiantes desde un archivo CSV, solo en los cursos del admin.
+    Las filas con error se listan sin detener la importación del resto.
+    La columna password se ignora: hashear cada contraseña cuesta del orden de 0,3 s y un ingreso
+    grande superaría el tiempo límite del worker web a mitad del archivo. Las cuentas se activan
+    con los enlaces de activación; para importar contraseñas está el comando `importar_estudiantes`.
+    """
+    resultado = None
+    if request.method == 'POST':
+        form = ImportarEstudiantesForm(request.POST, request.FILES, user=request.user)
+        if form.is_valid():
+            alcance = obtener_alcance(request)
+            lineas = io.TextIOWrapper(form.cleaned_data['archivo'].file, encoding='utf-8-sig', newline='')
+            try:
+                resultado = importar_estudiantes(
+                    lineas,
+                    cursos=alcance.filtrar(Curso.objects.all(), 'pk'),
+                    curso_defecto=form.cleaned_data['curso'],
+                    # Un estudiante sin curso quedaría fuera del alcance del admin que lo importa
+                    curso_obligatorio=not alcance.todos,
+                    aceptar_contrasenas=False,
+                )
+            except (UnicodeDecodeError, csv.Error):
+                messages.error(request, "El archivo no es un CSV válido en UTF-8.")
+            else:
+                if resultado.creados:
+                    messages.success(request, f'{resultado.creados} estudiantes importados exitosamente.')
+                if resultado.errores:
+                    messages.warning(request, f'{len(resultado.errores)} filas no se importaron.')
+                if resultado.contrasenas_ignoradas:
+                    messages.warning(
+                        request,
+                        f'Se ignoraron {resultado.contrasenas_ignoradas} contraseñas del archivo: '
+                        'esas cuentas se activan con su enlace de activación.'
+                    )
+    else:
+        form = ImportarEstudiantesForm(user=request.user)
+
+    return render(request, 'admin/importar_estudiantes.html', {
+        'form': form,
+        'resultado': resultado,
+    })
+
+@login_required
+@user_passes_test(es_admin)
+def exportar_enlaces_activacion(request):
+    """
+    Exporta en CSV los enlaces de activación de los estudiantes de los cursos del admin
+    que aún no tienen contraseña (p. ej. importados sin contraseña). Filtrable por `curso`.
+    """
+    alcance = obtener_alcance(request)
+    estudiantes = alcance.filtrar(PerfilEstudiante.objects.all()).filter(
+        usuario__password__startswith=UNUSABLE_PASSWORD_PREFIX
+    )
+    nombre_archivo = 'enlaces_activacion'
+    curso_id = request.GET.get('curso', None)
+    if curso_id:
+        try:
+            curso = alcance.obtener_curso(curso_id)
+        except Curso.DoesNotExist:
+            return HttpResponseBadRequest("El curso seleccionado no es válido.")
+        if not alcance.permite(curso.pk):
+            return HttpResponseForbidden("No tienes permiso para exportar los enlaces de este curso.")
+        estudiantes = estudiantes.filter(curso=curso)
+        nombre_archivo += f'_{curso.codigo}'
+
+    estudiantes = estudiantes.select_related('usuario').order_by('apellidos', 'nombres')
+
+    def filas():
+        yield ['Cédula', 'Apellidos', 'Nombres', 'Usuario', 'Enlace de Activación']
+        for estudiante in estudiantes.iterator(chunk_size=2000):
+            yield [
+                estudiante.cedula,
+                estudiante.apellidos,
+                estudiante.nombres,
+                estudiante.usuario.username,
+                request.build_absolute_uri(ruta_activacion(estudiante.usuario)),
+            ]
+
+    writer = csv.writer(_Eco())
+    contenido = itertools.chain(['\ufeff'], (writer.writerow(fila) for fila in filas()))
+    response = StreamingHttpResponse(contenido, content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{nombre_archivo}.csv"'
+    return response
+
 @login_required
 @user_passes_test(es_admin)
 def editar_estudiante(request, pk):
@@ -278,9 +428,8 @@ def eliminar_estudiante(request, pk):
     perfil = get_object_or_404(PerfilEstudiante, pk=pk)
 
     # Restricción por curso para administradores no superusuario
-    if not request.user.is_superuser:
-        if perfil.curso not in request.user.cursos_asignados.all():
-            return HttpResponseForbidden("No tienes permiso para eliminar estudiantes de este curso.")
+    if not obtener_alcance(request).permite(perfil.curso_id):
+        return HttpResponseForbidden("No tienes permiso para eliminar estudiantes de este curso.")
 
     if request.method == 'POST':
         # El usuario se elimina en cascada gracias a la configuración del modelo
@@ -292,6 +441,7 @@ def eliminar_estudiante(request, pk):
 
 @login_required
 @user_passes_test(es_admin)
+@condicional_por_alcance
 def tomar_asistencia(request):
     """
     Muestra la interfaz para tomar la asistencia del día, filtrada por cursos asignados al admin.
@@ -299,12 +449,10 @@ def tomar_asistencia(request):
     """
     hoy = timezone.localdate()
     
-    if request.user.is_superuser:
-        cursos_gestionables = Curso.objects.all()
-        estudiantes_base_queryset = PerfilEstudiante.objects.all()
-    else:
-        cursos_gestionables = request.user.cursos_asignados.all()
-        estudiantes_base_queryset = PerfilEstudiante.objects.filter(curso__in=cursos_gestionables)
+    # Obtener cursos que el administrador puede gestionar (alcance memorizado en la sesión)
+    alcance = obtener_alcance(request)
+    cursos_gestionables = alcance.cursos
+    estudiantes_base_queryset = alcance.filtrar(PerfilEstudiante.objects.all())
 
     curso_id = request.GET.get('curso', None)
     curso_seleccionado = None
@@ -313,8 +461,8 @@ def tomar_asistencia(request):
 
     if curso_id:
         try:
-            curso_seleccionado = Curso.objects.get(pk=curso_id)
-            if not request.user.is_superuser and curso_seleccionado not in cursos_gestionables:
+            curso_seleccionado = alcance.obtener_curso(curso_id)
+            if not alcance.permite(curso_seleccionado.pk):
                 return HttpResponseForbidden("No tienes permiso para tomar asistencia para este curso.")
             
             estudiantes_queryset = estudiantes_queryset.filter(curso=curso_seleccionado)
@@ -322,15 +470,10 @@ def tomar_asistencia(request):
             messages.error(request, "El curso seleccionado no es válido.")
             curso_id = None
     
-    estudiantes = estudiantes_queryset.order_by('apellidos', 'nombres')
-    
-    # WORKAROUND: Usar un rango de fechas para evitar el error 'user-defined function raised exception' de SQLite.
-    start_of_day = timezone.make_aware(timezone.datetime.combine(hoy, timezone.datetime.min.time()))
-    end_of_day = start_of_day + timezone.timedelta(days=1)
+    estudiantes = estudiantes_queryset.select_related('curso').order_by('apellidos', 'nombres')
     
     asistencias_hoy = Asistencia.objects.filter(
-        fecha__gte=start_of_day,
-        fecha__lt=end_of_day,
+        dia=hoy,
         estudiante__in=estudiantes_queryset
     ).select_related('estudiante')
     
@@ -360,9 +503,9 @@ def guardar_asistencia(request):
     """
     Guarda los datos de asistencia enviados desde el formulario, filtrando por cursos del admin.
     Lógica simplificada: para todos los estudiantes relevantes, si está marcado -> presente, si no -> ausente.
+    La escritura se hace en bloque (ver services.guardar_asistencia_masiva) para no hacer una consulta por estudiante.
     """
     if request.method == 'POST':
-        hoy_date = timezone.localdate()
         ids_presentes = set(request.POST.getlist('presentes'))
         horas_academicas_str = request.POST.get('horas_academicas', '2') # Default to '2'
         try:
@@ -372,17 +515,14 @@ def guardar_asistencia(request):
 
         curso_id = request.GET.get('curso', None)
         
-        if request.user.is_superuser:
-            cursos_gestionables = Curso.objects.all()
-            estudiantes_a_gestionar_queryset = PerfilEstudiante.objects.all()
-        else:
-            cursos_gestionables = request.user.cursos_asignados.all()
-            estudiantes_a_gestionar_queryset = PerfilEstudiante.objects.filter(curso__in=cursos_gestionables)
+        # Obtener cursos que el administrador puede gestionar (alcance memorizado en la sesión)
+        alcance = obtener_alcance(request)
+        estudiantes_a_gestionar_queryset = alcance.filtrar(PerfilEstudiante.objects.all())
 
         if curso_id:
             try:
-                curso_seleccionado = Curso.objects.get(pk=curso_id)
-                if not request.user.is_superuser and curso_seleccionado not in cursos_gestionables:
+                curso_seleccionado = alcance.obtener_curso(curso_id)
+                if not alcance.permite(curso_seleccionado.pk):
                     messages.error(request, "No tienes permiso para gestionar este curso.")
                     return redirect(reverse('tomar_asistencia'))
                 
@@ -391,29 +531,7 @@ def guardar_asistencia(request):
                 messages.error(request, "El curso seleccionado no es válido.")
                 return redirect(reverse('tomar_asistencia'))
             
-        for estudiante in estudiantes_a_gestionar_queryset:
-            esta_presente = str(estudiante.pk) in ids_presentes
-            
-            start_of_day = timezone.make_aware(timezone.datetime.combine(hoy_date, timezone.datetime.min.time()))
-            end_of_day = start_of_day + timezone.timedelta(days=1)
-
-            asistencia_hoy = Asistencia.objects.filter(
-                estudiante=estudiante,
-                fecha__gte=start_of_day,
-                fecha__lt=end_of_day
-            ).first()
-
-            if asistencia_hoy:
-                asistencia_hoy.esta_presente = esta_presente
-                asistencia_hoy.fecha = timezone.now()
-                asistencia_hoy.horas_academicas = horas_academicas
-                asistencia_hoy.save(update_fields=['esta_presente', 'fecha', 'horas_academicas'])
-            else:
-                Asistencia.objects.create(
-                    estudiante=estudiante,
-                    esta_presente=esta_presente,
-                    horas_academicas=horas_academicas,
-                )
+        guardar_asistencia_masiva(estudiantes_a_gestionar_queryset, ids_presentes, horas_academicas)
         
         messages.success(request, 'La asistencia ha sido guardada/actualizada correctamente.')
         
@@ -427,95 +545,229 @@ def guardar_asistencia(request):
         redirect_url += f"?curso={request.GET.get('curso')}"
     return redirect(redirect_url)
 
+# Máximo de cambios de asistencia por petición a la API (el cliente los envía en lotes pequeños)
+MAX_CAMBIOS_ASISTENCIA = 1000
+
+def _leer_cambios_asistencia(cuerpo):
+    """
+    Interpreta el JSON de la API de asistencia:
+    {"horas_academicas": 2, "cambios": [{"estudiante": 12, "presente": true}, ...]}.
+    Devuelve (horas_academicas, {estudiante_id: presente}) o lanza ValueError.
+    """
+    try:
+        datos = json.loads(cuerpo)
+        horas_academicas = int(datos.get('horas_academicas', 2))
+        cambios = {}
+        for cambio in datos['cambios']:
+            if not isinstance(cambio['presente'], bool):
+                raise ValueError
+            cambios[int(cambio['estudiante'])] = cambio['presente']
+    except (ValueError, TypeError, KeyError, AttributeError):
+        raise ValueError("El formato de los cambios no es válido.")
+    if not 1 <= horas_academicas <= 8:
+        raise ValueError("Las horas académicas deben estar entre 1 y 8.")
+    if len(cambios) > MAX_CAMBIOS_ASISTENCIA:
+        raise ValueError(f"Se admiten como máximo {MAX_CAMBIOS_ASISTENCIA} cambios por petición.")
+    return horas_academicas, cambios
+
+@login_required
+@user_passes_test(es_admin)
+def api_asistencia(request):
+    """
+    Guarda en JSON solo los cambios de asistencia del día (estudiantes marcados o desmarcados),
+    que la página de toma de asistencia envía en lotes pequeños. Los estudiantes fuera de los
+    cursos del admin se omiten. Responde con los registros guardados (incluye la lista completa
+    del curso si aún no tenía asistencia del día) y los estudiantes omitidos.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Método no permitido.'}, status=405)
+
+    try:
+        horas_academicas, cambios = _leer_cambios_asistencia(request.body)
+    except ValueError as error:
+        return JsonResponse({'error': str(error)}, status=400)
+
+    estudiantes_queryset = obtener_alcance(request).filtrar(PerfilEstudiante.objects.all())
+    guardados, omitidos = guardar_cambios_asistencia(estudiantes_queryset, cambios, horas_academicas)
+    return JsonResponse({'guardados': guardados, 'omitidos': omitidos})
+
 @login_required
 @user_passes_test(es_admin)
 def vista_reportes_cursos(request):
     """
     Muestra una lista de cursos para generar reportes.
     """
-    if request.user.is_superuser:
-        cursos_gestionables = Curso.objects.all()
-    else:
-        cursos_gestionables = request.user.cursos_asignados.all()
+    # Obtener cursos que el administrador puede gestionar (alcance memorizado en la sesión)
+    alcance = obtener_alcance(request)
+    cursos_gestionables = alcance.cursos
     
     context = {
-        'cursos': cursos_gestionables.order_by('nombre')
+        'cursos': cursos_gestionables
     }
     return render(request, 'admin/reportes_cursos.html', context)
 
 
+def ruta_logo_reportes(request):
+    """
+    URL absoluta del logo que xhtml2pdf descarga al renderizar los reportes PDF.
+    """
+    return request.build_absolute_uri('/static/img/iujo_logo.png')
+
+def _encolar_reporte(request, curso):
+    """
+    Devuelve el trabajo de reporte en curso del usuario para el curso, o encola uno nuevo.
+    """
+    # Reutilizar un trabajo en curso del mismo usuario para no duplicar la generación
+    # (no uno abandonado por un worker detenido, que el worker reencola o da por fallido)
+    trabajo = trabajos_reporte_en_curso().filter(curso=curso, solicitado_por=request.user).first()
+    if trabajo is None:
+        trabajo = TrabajoReporte.objects.create(
+            curso=curso,
+            solicitado_por=request.user,
+            facilitador_nombre=request.user.get_full_name() or request.user.username,
+            logo_url=ruta_logo_reportes(request),
+        )
+    return trabajo
+
 @login_required
 @user_passes_test(es_admin)
 def generar_reporte_asistencia_pdf(request, curso_id):
     """
-    Genera un reporte de asistencia en formato PDF para un curso dado.
+    Encola el reporte de asistencia en PDF de un curso y redirige a su estado, sin generar
+    el PDF en el worker web (enlaces antiguos o navegadores sin JavaScript).
     """
     curso = get_object_or_404(Curso, pk=curso_id)
 
     # Verificar permisos del administrador para este curso
-    if not request.user.is_superuser and curso not in request.user.cursos_asignados.all():
+    if not obtener_alcance(request).permite(curso.pk):
         messages.error(request, "No tiene permiso para generar reportes de este curso.")
         return redirect('vista_reportes_cursos') # O a donde sea apropiado
 
-    # Datos del facilitador (administrador logueado)
-    facilitador_nombre = request.user.get_full_name() or request.user.username
-    
-    # Obtener estudiantes del curso
-    estudiantes_del_curso = PerfilEstudiante.objects.filter(curso=curso).order_by('apellidos', 'nombres')
-
-    datos_estudiantes_reporte = []
-    for estudiante in estudiantes_del_curso:
-        asistencias_estudiante = Asistencia.objects.filter(
-            estudiante=estudiante,
-            # Considerar solo asistencias marcadas como presentes
-            esta_presente=True
-        ).order_by('fecha')
-
-        # Calcular total de horas académicas asistidas
-        total_horas_asistidas = asistencias_estudiante.aggregate(Sum('horas_academicas'))['horas_academicas__sum'] or 0
-
-        # Recopilar fechas y horas de asistencia, incluyendo las horas académicas de cada registro
-        fechas_y_horas_asistencia = [
-            f'{asist.fecha.strftime("%d/%m/%Y %H:%M")} ({asist.horas_academicas} {"hora" if asist.horas_academicas == 1 else "horas"})'
-            for asist in asistencias_estudiante
-        ]
-
-        datos_estudiantes_reporte.append({
-            'nombre_completo': f"{estudiante.nombres} {estudiante.apellidos}",
-            'cedula': estudiante.cedula,
-            'telefono': estudiante.telefono, # Asumiendo que el campo 'telefono' está directamente en PerfilEstudiante
-            'email': estudiante.usuario.email,
-            'total_horas_asistidas': total_horas_asistidas,
-            'fechas_y_horas_asistencia': fechas_y_horas_asistencia,
-        })
+    trabajo = _encolar_reporte(request, curso)
+    return redirect('estado_reporte', pk=trabajo.pk)
 
-    context = {
-        'curso_nombre': curso.nombre,
-        'facilitador_nombre': facilitador_nombre,
-        'fecha_emision': date.today().strftime("%d/%m/%Y"),
-        'estudiantes': datos_estudiantes_reporte,
-        'logo_path': request.build_absolute_uri('/static/img/iujo_logo.png') # Asegúrate de que el logo exista aquí
+@login_required
+@user_passes_test(es_admin)
+def solicitar_reporte_asistencia_pdf(request, curso_id):
+    """
+    Encola la generación del reporte PDF de un curso para que lo procese el comando `procesar_reportes`.
+    Responde en JSON con la URL de estado que la página de reportes consulta periódicamente.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Método no permitido.'}, status=405)
+
+    curso = get_object_or_404(Curso, pk=curso_id)
+
+    if not obtener_alcance(request).permite(curso.pk):
+        return JsonResponse({'error': 'No tiene permiso para generar reportes de este curso.'}, status=403)
+
+    trabajo = _encolar_reporte(request, curso)
+    return JsonResponse(_estado_trabajo_reporte(trabajo), status=202)
+
+def _estado_trabajo_reporte(trabajo):
+    """
+    Representación JSON del estado de un trabajo de reporte.
+    """
+    datos = {
+        'id': trabajo.pk,
+        'estado': trabajo.estado,
+        'url_estado': reverse('estado_reporte', args=[trabajo.pk]),
+        'url_descarga': None,
+        'error': trabajo.error,
     }
+    if trabajo.estado == TrabajoReporte.Estado.COMPLETADO:
+        datos['url_descarga'] = reverse('descargar_reporte', args=[trabajo.pk])
+    return datos
 
-    template_path = 'admin/reporte_asistencia_template.html'
-    template = get_template(template_path)
-    html = template.render(context)
+def _obtener_trabajo_reporte(request, pk):
+    """
+    Obtiene un trabajo de reporte visible para el usuario (el que lo solicitó o un superusuario).
+    """
+    trabajos = TrabajoReporte.objects.select_related('curso')
+    if not request.user.is_superuser:
+        trabajos = trabajos.filter(solicitado_por=request.user)
+    return get_object_or_404(trabajos, pk=pk)
 
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="reporte_asistencia_{curso.codigo}_{date.today().strftime("%Y%m%d")}.pdf"'
+@login_required
+@user_passes_test(es_admin)
+def estado_reporte(request, pk):
+    """
+    Devuelve en JSON el estado de un trabajo de reporte y, si terminó, su URL de descarga.
+    """
+    trabajo = _obtener_trabajo_reporte(request, pk)
+    return JsonResponse(_estado_trabajo_reporte(trabajo))
 
-    pisa_status = pisa.CreatePDF(
-        html,                # the HTML to convert
-        dest=response,       # file handle to receive result
-        encoding="UTF-8"
-    )
-    if pisa_status.err:
-        messages.error(request, "Hubo un error al generar el PDF.")
+@login_required
+@user_passes_test(es_admin)
+def descargar_reporte(request, pk):
+    """
+    Descarga el PDF ya generado de un trabajo de reporte completado.
+    """
+    trabajo = _obtener_trabajo_reporte(request, pk)
+    if trabajo.estado != TrabajoReporte.Estado.COMPLETADO or not trabajo.archivo:
+        messages.error(request, "El reporte todavía no está disponible.")
         return redirect('vista_reportes_cursos')
+
+    return FileResponse(
+        trabajo.archivo.open('rb'),
+        as_attachment=True,
+        filename=nombre_archivo_reporte(trabajo.curso),
+        content_type='application/pdf'
+    )
+
+class _Eco:
+    """
+    Objeto tipo archivo que devuelve lo escrito, para que csv.writer produzca líneas sin acumularlas.
+    """
+    def write(self, value):
+        return value
+
+@login_required
+@user_passes_test(es_admin)
+def exportar_asistencia_csv(request):
+    """
+    Exporta en CSV la asistencia de los cursos del admin, filtrable por curso y rango de fechas
+    (parámetros GET `curso`, `desde` y `hasta`). La respuesta se genera en streaming,
+    con memoria constante sin importar cuántos registros se exporten.
+    """
+    alcance = obtener_alcance(request)
+    asistencias = alcance.filtrar(Asistencia.objects.all(), 'estudiante__curso')
+
+    curso_id = request.GET.get('curso', None)
+    nombre_archivo = 'asistencia'
+    if curso_id:
+        try:
+            curso = alcance.obtener_curso(curso_id)
+        except Curso.DoesNotExist:
+            return HttpResponseBadRequest("El curso seleccionado no es válido.")
+        if not alcance.permite(curso.pk):
+            return HttpResponseForbidden("No tienes permiso para exportar la asistencia de este curso.")
+        asistencias = asistencias.filter(estudiante__curso=curso)
+        nombre_archivo += f'_{curso.codigo}'
+
+    try:
+        desde = request.GET.get('desde')
+        hasta = request.GET.get('hasta')
+        if desde:
+            asistencias = asistencias.filter(dia__gte=timezone.datetime.strptime(desde, '%Y-%m-%d').date())
+            nombre_archivo += f'_desde_{desde}'
+        if hasta:
+            asistencias = asistencias.filter(dia__lte=timezone.datetime.strptime(hasta, '%Y-%m-%d').date())
+            nombre_archivo += f'_hasta_{hasta}'
+    except ValueError:
+        return HttpResponseBadRequest("Las fechas deben tener el formato AAAA-MM-DD.")
+
+    writer = csv.writer(_Eco())
+    # BOM para que Excel reconozca el archivo como UTF-8 (acentos y ñ)
+    contenido = itertools.chain(['\ufeff'], (writer.writerow(fila) for fila in filas_exportacion_asistencia(asistencias)))
+
+    response = StreamingHttpResponse(contenido, content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{nombre_archivo}.csv"'
     return response
 
 @login_required
 @user_passes_test(es_admin)
+@condicional_por_alcance
 def reporte_inasistencias(request):
     """
     Muestra un reporte de asistencia filtrado por fecha y cursos asignados al admin.
@@ -528,12 +780,10 @@ def reporte_inasistencias(request):
     else:
         fecha_filtro = timezone.localdate()
     
-    if request.user.is_superuser:
-        cursos_gestionables = Curso.objects.all()
-        estudiantes_gestionables_base = PerfilEstudiante.objects.all()
-    else:
-        cursos_gestionables = request.user.cursos_asignados.all()
-        estudiantes_gestionables_base = PerfilEstudiante.objects.filter(curso__in=cursos_gestionables)
+    # Obtener cursos que el administrador puede gestionar (alcance memorizado en la sesión)
+    alcance = obtener_alcance(request)
+    cursos_gestionables = alcance.cursos
+    estudiantes_gestionables_base = alcance.filtrar(PerfilEstudiante.objects.all())
 
     curso_id = request.GET.get('curso', None)
     curso_seleccionado = None
@@ -542,8 +792,8 @@ def reporte_inasistencias(request):
 
     if curso_id:
         try:
-            curso_seleccionado = Curso.objects.get(pk=curso_id)
-            if not request.user.is_superuser and curso_seleccionado not in cursos_gestionables:
+            curso_seleccionado = alcance.obtener_curso(curso_id)
+            if not alcance.permite(curso_seleccionado.pk):
                 return HttpResponseForbidden("No tienes permiso para ver reportes de este curso.")
             
             estudiantes_gestionables_queryset = estudiantes_gestionables_queryset.filter(curso=curso_seleccionado)
@@ -551,45 +801,108 @@ def reporte_inasistencias(request):
             messages.error(request, "El curso seleccionado no es válido.")
             curso_id = None
     
-    estudiantes = estudiantes_gestionables_queryset.order_by('apellidos', 'nombres')
-
-    # WORKAROUND: Usar un rango de fechas para evitar el error 'user-defined function raised exception' de SQLite.
-    start_of_day = timezone.make_aware(timezone.datetime.combine(fecha_filtro, timezone.datetime.min.time()))
-    end_of_day = start_of_day + timezone.timedelta(days=1)
+    estudiantes = estudiantes_gestionables_queryset.select_related('curso').order_by('apellidos', 'nombres')
 
     asistencias_del_dia = Asistencia.objects.filter(
-        fecha__gte=start_of_day,
-        fecha__lt=end_of_day,
+        dia=fecha_filtro,
         estudiante__in=estudiantes_gestionables_queryset
     ).values('estudiante__pk', 'esta_presente')
 
     asistencias_map = {item['estudiante__pk']: item['esta_presente'] for item in asistencias_del_dia}
 
+    # Las inasistencias cubiertas por un permiso aprobado se muestran como justificadas
+    indice_permisos = obtener_indice_permisos(estudiantes_gestionables_queryset, fecha_filtro, fecha_filtro)
+    ausencias_justificadas = 0
+
     for estudiante in estudiantes:
         estudiante.estado_asistencia = asistencias_map.get(estudiante.pk)
+        estudiante.ausencia_justificada = (
+            estudiante.estado_asistencia is False and indice_permisos.cubre(estudiante.pk, fecha_filtro)
+        )
+        ausencias_justificadas += estudiante.ausencia_justificada
+    REPORTE_FILAS.observar(len(estudiantes), reporte='inasistencias')
+
+    # Totales del día leídos del resumen materializado (una fila por curso)
+    resumenes_del_dia = ResumenAsistenciaDiaria.objects.filter(dia=fecha_filtro)
+    if curso_seleccionado:
+        resumenes_del_dia = resumenes_del_dia.filter(curso=curso_seleccionado)
+    else:
+        resumenes_del_dia = alcance.filtrar(resumenes_del_dia)
+    resumen_dia = resumenes_del_dia.aggregate(
+        presentes=Coalesce(Sum('presentes'), 0),
+        ausentes=Coalesce(Sum('ausentes'), 0),
+        horas_presentes=Coalesce(Sum('horas_presentes'), 0),
+    )
+    resumen_dia['justificadas'] = ausencias_justificadas
 
     context = {
         'cursos_disponibles': cursos_gestionables,
         'curso_seleccionado': curso_seleccionado,
         'estudiantes': estudiantes,
-        'fecha_filtro': fecha_filtro
+        'fecha_filtro': fecha_filtro,
+        'resumen_dia': resumen_dia,
     }
     return render(request, 'admin/reporte_inasistencias.html', context)
 
+@login_required
+@user_passes_test(es_admin)
+def matriz_asistencia(request):
+    """
+    Muestra la matriz de asistencia (estudiantes × días) de un curso en un rango de fechas,
+    con la tasa de inasistencia y las rachas de ausencias de cada estudiante.
+    Por defecto muestra los últimos 30 días.
+    """
+    alcance = obtener_alcance(request)
+    cursos_gestionables = alcance.cursos
+
+    try:
+        hasta_str = request.GET.get('hasta')
+        desde_str = request.GET.get('desde')
+        hasta = timezone.datetime.strptime(hasta_str, '%Y-%m-%d').date() if hasta_str else timezone.localdate()
+        desde = timezone.datetime.strptime(desde_str, '%Y-%m-%d').date() if desde_str else hasta - timedelta(days=29)
+    except ValueError:
+        messages.error(request, "Las fechas deben tener el formato AAAA-MM-DD.")
+        hasta = timezone.localdate()
+        desde = hasta - timedelta(days=29)
+    if desde > hasta:
+        desde, hasta = hasta, desde
+    if (hasta - desde).days >= MAX_DIAS_MATRIZ:
+        messages.warning(request, f"El rango se limitó a {MAX_DIAS_MATRIZ} días.")
+        desde = hasta - timedelta(days=MAX_DIAS_MATRIZ - 1)
+
+    curso_id = request.GET.get('curso', None)
+    curso_seleccionado = None
+    matriz = None
+
+    if curso_id:
+        try:
+            curso_seleccionado = alcance.obtener_curso(curso_id)
+            if not alcance.permite(curso_seleccionado.pk):
+                return HttpResponseForbidden("No tienes permiso para ver reportes de este curso.")
+            matriz = obtener_matriz_asistencia(curso_seleccionado, desde, hasta)
+        except Curso.DoesNotExist:
+            messages.error(request, "El curso seleccionado no es válido.")
+
+    context = {
+        'cursos_disponibles': cursos_gestionables,
+        'curso_seleccionado': curso_seleccionado,
+        'desde': desde,
+        'hasta': hasta,
+        'matriz': matriz,
+    }
+    return render(request, 'admin/matriz_asistencia.html', context)
+
 @login_required
 @user_passes_test(es_admin)
 def gestionar_permisos(request):
     """
     Muestra las solicitudes de permiso para aprobarlas o rechazarlas, filtradas por cursos del admin.
-    Permite filtrar por un curso específico.
+    Permite filtrar por un curso específico. La lista se pagina por cursor (-fecha_creacion, pk).
     """
-    # Obtener cursos que el administrador puede gestionar
-    if request.user.is_superuser:
-        cursos_gestionables = Curso.objects.all()
-        solicitudes_queryset = SolicitudPermiso.objects.all()
-    else:
-        cursos_gestionables = request.user.cursos_asignados.all()
-        solicitudes_queryset = SolicitudPermiso.objects.filter(estudiante__curso__in=cursos_gestionables)
+    # Obtener cursos que el administrador puede gestionar (alcance memorizado en la sesión)
+    alcance = obtener_alcance(request)
+    cursos_gestionables = alcance.cursos
+    solicitudes_queryset = alcance.filtrar(SolicitudPermiso.objects.all(), 'estudiante__curso')
 
     # Obtener el ID del curso seleccionado del request GET
     curso_id = request.GET.get('curso', None)
@@ -597,9 +910,9 @@ def gestionar_permisos(request):
 
     if curso_id:
         try:
-            curso_seleccionado = Curso.objects.get(pk=curso_id)
+            curso_seleccionado = alcance.obtener_curso(curso_id)
             # Verificar si el admin tiene permiso para ver este curso
-            if not request.user.is_superuser and curso_seleccionado not in cursos_gestionables:
+            if not alcance.permite(curso_seleccionado.pk):
                 return HttpResponseForbidden("No tienes permiso para gestionar permisos de este curso.")
             
             # Filtrar queryset por el curso seleccionado
@@ -608,12 +921,13 @@ def gestionar_permisos(request):
             messages.error(request, "El curso seleccionado no es válido.")
             curso_id = None
     
-    solicitudes = solicitudes_queryset.order_by('-fecha_creacion')
+    pagina = paginar_por_cursor(request, solicitudes_queryset.select_related('estudiante__curso'), ['-fecha_creacion', 'pk'])
 
     context = {
         'cursos_disponibles': cursos_gestionables,
         'curso_seleccionado': curso_seleccionado,
-        'solicitudes': solicitudes,
+        'solicitudes': pagina.objetos,
+        'pagina': pagina,
     }
     return render(request, 'admin/gestionar_permisos.html', context)
 
@@ -626,9 +940,8 @@ def aprobar_permiso(request, pk):
     solicitud = get_object_or_404(SolicitudPermiso, pk=pk)
 
     # Restricción por curso para administradores no superusuario
-    if not request.user.is_superuser:
-        if solicitud.estudiante.curso not in request.user.cursos_asignados.all():
-            return HttpResponseForbidden("No tienes permiso para aprobar solicitudes de permiso de estudiantes de este curso.")
+    if not obtener_alcance(request).permite(solicitud.estudiante.curso_id):
+        return HttpResponseForbidden("No tienes permiso para aprobar solicitudes de permiso de estudiantes de este curso.")
 
     if request.method == 'POST':
         solicitud.estado = SolicitudPermiso.Estado.APROBADO
@@ -645,9 +958,8 @@ def rechazar_permiso(request, pk):
     solicitud = get_object_or_404(SolicitudPermiso, pk=pk)
 
     # Restricción por curso para administradores no superusuario
-    if not request.user.is_superuser:
-        if solicitud.estudiante.curso not in request.user.cursos_asignados.all():
-            return HttpResponseForbidden("No tienes permiso para rechazar solicitudes de permiso de estudiantes de este curso.")
+    if not obtener_alcance(request).permite(solicitud.estudiante.curso_id):
+        return HttpResponseForbidden("No tienes permiso para rechazar solicitudes de permiso de estudiantes de este curso.")
 
     if request.method == 'POST':
         solicitud.estado = SolicitudPermiso.Estado.RECHAZADO
@@ -655,20 +967,51 @@ def rechazar_permiso(request, pk):
         messages.warning(request, f'La solicitud de {solicitud.estudiante} ha sido rechazada.')
     return redirect('gestionar_permisos')
 
+@login_required
+@user_passes_test(es_admin)
+def procesar_permisos_lote(request):
+    """
+    Aprueba o rechaza en lote las solicitudes de permiso seleccionadas en `gestionar_permisos`.
+    Solo se procesan las solicitudes pendientes de los cursos del admin.
+    """
+    if request.method == 'POST':
+        acciones = {
+            'aprobar': SolicitudPermiso.Estado.APROBADO,
+            'rechazar': SolicitudPermiso.Estado.RECHAZADO,
+        }
+        estado = acciones.get(request.POST.get('accion'))
+        solicitud_ids = [pk for pk in request.POST.getlist('solicitudes') if pk.isdigit()]
+
+        if estado is None:
+            messages.error(request, "Acción no válida.")
+        elif not solicitud_ids:
+            messages.warning(request, "No se seleccionó ninguna solicitud.")
+        else:
+            procesadas = cambiar_estado_permisos(obtener_alcance(request), solicitud_ids, estado, request.user)
+            if procesadas:
+                verbo = 'aprobada' if estado == SolicitudPermiso.Estado.APROBADO else 'rechazada'
+                messages.success(request, f'{len(procesadas)} solicitud{"es" if len(procesadas) != 1 else ""} {verbo}{"s" if len(procesadas) != 1 else ""}.')
+            omitidas = len(solicitud_ids) - len(procesadas)
+            if omitidas:
+                messages.warning(request, f'{omitidas} solicitud(es) no se procesaron: ya estaban gestionadas o no pertenecen a sus cursos.')
+
+    url = reverse('gestionar_permisos')
+    curso_id = request.POST.get('curso')
+    if curso_id:
+        url += f'?curso={curso_id}'
+    return redirect(url)
+
 @login_required
 @user_passes_test(es_admin)
 def lista_feedback(request):
     """
     Muestra una lista de todos los feedbacks enviados por los estudiantes, filtrada por cursos del admin.
-    Permite filtrar por un curso específico.
+    Permite filtrar por un curso específico. La lista se pagina por cursor (-fecha_creacion, pk).
     """
-    # Obtener cursos que el administrador puede gestionar
-    if request.user.is_superuser:
-        cursos_gestionables = Curso.objects.all()
-        feedbacks_queryset = Feedback.objects.all()
-    else:
-        cursos_gestionables = request.user.cursos_asignados.all()
-        feedbacks_queryset = Feedback.objects.filter(estudiante__curso__in=cursos_gestionables)
+    # Obtener cursos que el administrador puede gestionar (alcance memorizado en la sesión)
+    alcance = obtener_alcance(request)
+    cursos_gestionables = alcance.cursos
+    feedbacks_queryset = alcance.filtrar(Feedback.objects.all(), 'estudiante__curso')
 
     # Obtener el ID del curso seleccionado del request GET
     curso_id = request.GET.get('curso', None)
@@ -676,9 +1019,9 @@ def lista_feedback(request):
 
     if curso_id:
         try:
-            curso_seleccionado = Curso.objects.get(pk=curso_id)
+            curso_seleccionado = alcance.obtener_curso(curso_id)
             # Verificar si el admin tiene permiso para ver este curso
-            if not request.user.is_superuser and curso_seleccionado not in cursos_gestionables:
+            if not alcance.permite(curso_seleccionado.pk):
                 return HttpResponseForbidden("No tienes permiso para ver feedback de este curso.")
             
             # Filtrar queryset por el curso seleccionado
@@ -687,15 +1030,33 @@ def lista_feedback(request):
             messages.error(request, "El curso seleccionado no es válido.")
             curso_id = None
     
-    feedbacks = feedbacks_queryset.order_by('-fecha_creacion')
+    pagina = paginar_por_cursor(request, feedbacks_queryset.select_related('estudiante__curso'), ['-fecha_creacion', 'pk'])
 
     context = {
         'cursos_disponibles': cursos_gestionables,
         'curso_seleccionado': curso_seleccionado,
-        'feedbacks': feedbacks,
+        'feedbacks': pagina.objetos,
+        'pagina': pagina,
     }
     return render(request, 'admin/lista_feedback.html', context)
 
+@login_required
+@user_passes_test(es_superusuario)
+def peticiones_lentas(request):
+    """
+    Muestra las peticiones más lentas registradas por InstrumentacionMiddleware, con sus consultas SQL.
+    Cada worker conserva las suyas, así que la lista corresponde al proceso que atiende la petición.
+    """
+    if request.method == 'POST':
+        limpiar_peticiones_lentas()
+        messages.success(request, 'Se vació el registro de peticiones lentas de este proceso.')
+        return redirect('peticiones_lentas')
+
+    return render(request, 'admin/peticiones_lentas.html', {
+        'peticiones': obtener_peticiones_lentas(),
+        'pid': os.getpid(),
+    })
+
 def despertar_db(request):
     # Obtenemos la llave desde la URL (ejemplo: ?token=mi_clave_secreta)
     token_recibido = request.GET.get('token')
@@ -708,4 +1069,22 @@ def despertar_db(request):
     User = get_user_model()
     User.objects.count() 
     
-    return HttpResponse("Base de datos y Render activos.", status=200)
\ No newline at end of file
+    return HttpResponse("Base de datos y Render activos.", status=200)
+
+
+def metricas(request):
+    """
+    Expone las métricas de la aplicación, agregadas de todos los workers, en el formato
+    de texto de Prometheus. Requiere el token METRICAS_TOKEN en `?token=` o como
+    `Authorization: Bearer <token>`; si METRICAS_TOKEN no está definido, nadie puede leerlas.
+    """
+    if not settings.METRICAS_TOKEN:
+        return HttpResponseForbidden("Acceso denegado: las métricas no tienen token configurado.")
+
+    autorizacion = request.headers.get('Authorization', '')
+    token_recibido = request.GET.get('token') or autorizacion.removeprefix('Bearer ').strip()
+
+    if not constant_time_compare(token_recibido, settings.METRICAS_TOKEN):
+        return HttpResponseForbidden("Acceso denegado: Token incorrecto.")
+
+    return HttpResponse(registro_metricas.exponer(), content_type='text/plain; version=0.0.4; charset=utf-8')